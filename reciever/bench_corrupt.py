@@ -0,0 +1,77 @@
+#python3 bench_corrupt.py
+#python3 bench_corrupt.py --width 1280 --height 720 --frames 200
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import numpy as np
+import pixcodec
+import pixcorrupt
+
+
+def legacy_corrupt(lines, damage_percentage):
+    # the previous PixViewer.corrupt_lines without the log and progress bar:
+    # a list lookup per character, the list rebuilt after every hit
+    total_chars = sum(len(line) for line in lines)
+    damage_positions = random.sample(range(total_chars), int(total_chars * (damage_percentage / 100)))
+    corrupted_lines = []
+    current_pos = 0
+    for line in lines:
+        new_line = []
+        for char in line:
+            if current_pos in damage_positions:
+                new_line.append(random.choice(['@', '#', '$', '%', '&']) if random.random() < 0.5 else char)
+                damage_positions = [pos - 1 for pos in damage_positions]
+            else:
+                new_line.append(char)
+            current_pos += 1
+        corrupted_lines.append(''.join(new_line))
+    return corrupted_lines
+
+
+def frame(width, height):
+    return pixcodec.format_pix(np.random.default_rng(0).integers(0, 10, (height, width), dtype=np.uint8))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PixViewer corruption, old loop vs pixcorrupt.py")
+    parser.add_argument('--small', type=int, nargs=2, default=(100, 60), help="Frame the old loop is timed on")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--frames', type=int, default=100, help="Frames written by the batch run")
+    parser.add_argument('--damage', type=float, default=10.0, help="Damage percentage, as in the viewer")
+    args = parser.parse_args()
+
+    small = frame(*args.small)
+    start = time.perf_counter()
+    legacy_corrupt(small.decode().splitlines(keepends=True), args.damage)
+    legacy_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    pixcorrupt.corrupt(small, 0, symbols=args.damage / 100)
+    new_seconds = time.perf_counter() - start
+    print(f"{args.small[0]}x{args.small[1]}, {args.damage}% damage: old loop {legacy_seconds * 1000:.0f} ms, "
+          f"pixcorrupt {new_seconds * 1000:.1f} ms")
+
+    data = frame(args.width, args.height)
+    rates = dict(symbols=args.damage / 100, bit_errors=1e-4, bursts=1e-5, dropped_newlines=0.01, row_swaps=0.01)
+    for name, kind in [(name, {name: rate}) for name, rate in rates.items()] + [("all of them", rates)]:
+        start = time.perf_counter()
+        for seed in range(5):
+            pixcorrupt.corrupt(data, seed, **kind)
+        print(f"{args.width}x{args.height} {name:18} {(time.perf_counter() - start) / 5 * 1000:7.1f} ms per frame")
+
+    folder = tempfile.mkdtemp()
+    source = os.path.join(folder, "frame.pix")
+    with open(source, 'wb') as f:
+        f.write(data)
+    output = os.path.join(folder, "out")
+    os.makedirs(output)
+    start = time.perf_counter()
+    pixcorrupt.corrupt_frames(source, output, args.frames, 0, **rates)
+    seconds = time.perf_counter() - start
+    print(f"batch: {args.frames} frames written in {seconds:.1f} s, {args.frames / seconds * 60:.0f} frames per minute")
+    first = pixcorrupt.corrupt(data, [0, 0], **rates)[0]
+    with open(os.path.join(output, "frame_{:0{}}.pix".format(0, len(str(args.frames)))), 'rb') as f:
+        print(f"same seed, same frame: {f.read() == first}")
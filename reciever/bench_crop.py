@@ -0,0 +1,87 @@
+#python3 bench_crop.py --repeat 3
+
+import argparse
+import time
+from itertools import takewhile
+import numpy as np
+from PIL import Image
+from pixwiev import PixViewer
+
+SIZES = ((320, 240), (1280, 720), (1920, 1080), (1280, 8000))
+
+
+def legacy_crop(img):
+    # the previous PixViewer.crop_image_if_needed
+    img_data = list(img.getdata())
+    width, height = img.size
+    img_data = [img_data[i * width:(i + 1) * width] for i in range(height)]
+
+    def count_trailing_zeros(row):
+        return len(list(takewhile(lambda x: x == 0, reversed(row))))
+
+    cropped_height = height
+    for y in range(height - 1, -1, -1):
+        if count_trailing_zeros(img_data[y]) > width * 0.2:
+            cropped_height = y
+            break
+
+    return img.crop((0, 0, width, cropped_height))
+
+
+class Cropper:
+    # PixViewer's crop without opening a window
+    crop_image_if_needed = PixViewer.crop_image_if_needed
+    crop_height = PixViewer.crop_height
+
+    def __init__(self):
+        self.crop_cache = None
+
+
+def frames(width, height, rng):
+    # a received frame with a zero-padded tail, a clean one, an all-black one
+    # and rows with zeros close to the 20% threshold
+    pixels = rng.integers(1, 256, (height, width), dtype=np.uint8)
+    tail = pixels.copy()
+    tail[height * 3 // 4, width // 2:] = 0
+    tail[height - 3:, width - width // 10:] = 0
+    edge = pixels.copy()
+    limit = int(width * 0.2)
+    edge[height // 3, width - limit:] = 0
+    edge[height // 2, width - limit - 1:] = 0
+    edge[height // 2 + 1, width - limit - 1:] = 1
+    sparse = np.where(rng.random((height, width)) < 0.3, 0, pixels).astype(np.uint8)
+    return [('zero tail', tail), ('clean', pixels), ('black', np.zeros_like(pixels)),
+            ('20% edge', edge), ('sparse zeros', sparse)]
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="\"Fixed\" view crop, old loop vs NumPy, same crop check")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per frame, the best one is reported")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    same = True
+    for width, height in SIZES:
+        for name, pixels in frames(width, height, rng):
+            img = Image.fromarray(pixels, 'L')
+            legacy, legacy_seconds = timed(lambda: legacy_crop(img), args.repeat)
+            cropper = Cropper()
+            vector, vector_seconds = timed(lambda: Cropper().crop_image_if_needed(img), args.repeat)
+            cropper.crop_image_if_needed(img)
+            _, cached_seconds = timed(lambda: cropper.crop_image_if_needed(img), args.repeat)
+            match = legacy.size == vector.size and legacy.tobytes() == vector.tobytes()
+            same = same and match
+            print(f"{width}x{height:<5} {name:13} crop to {vector.height:5} rows   old {legacy_seconds * 1000:8.1f} ms   "
+                  f"numpy {vector_seconds * 1000:6.2f} ms   cached {cached_seconds * 1000:6.2f} ms   same crop: {match}")
+    print(f"all crops identical: {same}")
+    raise SystemExit(0 if same else 1)
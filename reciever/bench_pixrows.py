@@ -0,0 +1,82 @@
+#python3 bench_pixrows.py --width 1280 --height 20000 --damage 0.01
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pixcodec
+import pixrows
+
+
+def legacy_load(path):
+    # the previous PixViewer.load_pix_file: every line, the regex restore, a list of lists
+    with open(path, 'r') as file:
+        lines = file.readlines()
+    cleaned_lines = [re.sub(r'[^0-9 ]', '', line) for line in lines]
+    cleaned_lines = [re.sub(r'(\d)(?=\d)', r'\1 ', line) for line in cleaned_lines]
+    max_length = max(len(re.findall(r'\d', line)) for line in cleaned_lines)
+    restored_lines = []
+    for line in cleaned_lines:
+        numbers = line.split()
+        if len(numbers) < max_length:
+            numbers.extend(['0'] * (max_length - len(numbers)))
+        elif len(numbers) > max_length:
+            numbers = numbers[:max_length]
+        restored_lines.append(' '.join(numbers) + "\n")
+    return pixcodec.parse_pix(''.join(restored_lines).encode())
+
+
+def first_screen(path, rows):
+    reader = pixrows.PixRowReader(path)
+    levels = reader.rows(0, rows)
+    reader.close()
+    return levels
+
+
+def whole_file(path):
+    reader = pixrows.PixRowReader(path)
+    levels = reader.rows(0, reader.height)
+    reader.close()
+    return levels
+
+
+def measured(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PixViewer load time and memory, old loader vs row index")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=20000, help="Rows, e.g. several stitched frames")
+    parser.add_argument('--damage', type=float, default=0.01, help="Share of damaged rows")
+    parser.add_argument('--screen', type=int, default=600, help="Rows on the first screen")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    text = bytearray(pixcodec.format_pix(rng.integers(0, 10, (args.height, args.width), dtype=np.uint8)))
+    row_size = 2 * args.width
+    for row in random.Random(0).sample(range(args.height), int(args.height * args.damage)):
+        text[row * row_size + 3] = ord('#')
+    path = os.path.join(tempfile.mkdtemp(), "stitched.pix")
+    with open(path, 'wb') as f:
+        f.write(text)
+    print(f"{args.width}x{args.height}, {len(text) / 1e6:.1f} MB, {args.damage:.1%} damaged rows")
+
+    legacy, legacy_seconds, legacy_peak = measured(lambda: legacy_load(path))
+    screen, screen_seconds, screen_peak = measured(lambda: first_screen(path, args.screen))
+    levels, whole_seconds, whole_peak = measured(lambda: whole_file(path))
+    for name, seconds, peak in (("old loader", legacy_seconds, legacy_peak),
+                                (f"row index, first {args.screen} rows", screen_seconds, screen_peak),
+                                ("row index, whole file", whole_seconds, whole_peak)):
+        print(f"{name:32} {seconds * 1000:9.1f} ms   peak {peak / 1e6:8.1f} MB")
+    print(f"identical rows: {(legacy == levels).all()}")
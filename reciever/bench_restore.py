@@ -0,0 +1,91 @@
+#python3 bench_restore.py --width 1280 --height 20000 --damage 0.05
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pixcodec
+import pixrestore
+
+
+def legacy_process_file(input_path, output_path, max_length=None):
+    # the previous fixer.process_file
+    with open(input_path, 'r') as file:
+        lines = file.readlines()
+
+    cleaned_lines = []
+    max_num_count = 0
+    for line in lines:
+        cleaned_line = ''.join(char for char in line if char.isdigit() or char.isspace())
+        cleaned_line = re.sub(r'(\d)(?=\d)', r'\1 ', cleaned_line)
+        num_count = len(cleaned_line.split())
+        if num_count > max_num_count:
+            max_num_count = num_count
+        cleaned_lines.append(cleaned_line)
+
+    max_length = max_length if max_length else max_num_count
+
+    processed_lines = []
+    for line in cleaned_lines:
+        num_count = len(line.split())
+        if num_count < max_length:
+            line = line.strip() + ' ' + '0 ' * (max_length - num_count)
+        elif num_count > max_length:
+            line = ' '.join(line.split()[:max_length])
+        processed_lines.append(line.strip())
+
+    with open(output_path, 'w') as file:
+        for line in processed_lines:
+            file.write(line + '\n')
+
+
+def measured(function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def damaged_frame(width, height, damage):
+    # dropped digits, inserted digits, junk characters and lost line breaks
+    rng = random.Random(0)
+    text = bytearray(pixcodec.format_pix(np.random.default_rng(0).integers(0, 10, (height, width), dtype=np.uint8)))
+    for row in rng.sample(range(height), int(height * damage)):
+        position = row * 2 * width + rng.randrange(2 * width - 1)
+        text[position] = rng.choice(b'@#$%&7 ')
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Restore time and memory, old fixer.py vs pixrestore.py")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=20000)
+    parser.add_argument('--damage', type=float, default=0.05, help="Share of damaged rows")
+    parser.add_argument('--skip-legacy', action='store_true', help="Only time pixrestore (the old code takes minutes on big files)")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    input_path = os.path.join(folder, "frame.pix")
+    with open(input_path, 'wb') as f:
+        f.write(damaged_frame(args.width, args.height, args.damage))
+    print(f"{args.width}x{args.height}, {os.path.getsize(input_path) / 1e6:.1f} MB, {args.damage:.0%} damaged rows")
+
+    legacy_path = os.path.join(folder, "legacy.pix")
+    stream_path = os.path.join(folder, "stream.pix")
+    results = []
+    if not args.skip_legacy:
+        results.append(("fixer.py before", measured(lambda: legacy_process_file(input_path, legacy_path, args.width))))
+    results.append(("pixrestore, width given", measured(lambda: pixrestore.restore_file(input_path, stream_path, args.width))))
+    results.append(("pixrestore, width guessed", measured(lambda: pixrestore.restore_file(input_path, stream_path))))
+    for name, (seconds, peak) in results:
+        print(f"{name:28} {seconds * 1000:9.1f} ms   peak {peak / 1e6:8.1f} MB")
+    if not args.skip_legacy:
+        same = (pixcodec.read_pix(legacy_path) == pixcodec.read_pix(stream_path)).all()
+        print(f"same pixels: {same}")
@@ -0,0 +1,74 @@
+#python3 bench_rsfec.py
+#python3 bench_rsfec.py --parity 8 16 32 --ber 1e-4 1e-3
+
+import argparse
+import os
+import time
+import numpy as np
+import rsfec
+
+PACKET_SIZE = 240  # as in transmitter.py
+SEND_SECONDS = 0.5  # one packet and its ACK in transmitter.py
+
+
+def damaged(packet, count, rng):
+    packet = bytearray(packet)
+    for position in rng.choice(len(packet), count, replace=False):
+        packet[position] ^= int(rng.integers(1, 256))
+    return bytes(packet)
+
+
+def throughput(function, packets, data_bytes):
+    start = time.perf_counter()
+    for packet in packets:
+        function(packet)
+    seconds = time.perf_counter() - start
+    return data_bytes * len(packets) / seconds / 1e6, seconds / len(packets) * 1e6
+
+
+def link_time(parity, ber, packets, rng):
+    # seconds to get the packets through: a packet with more damaged bytes
+    # than FEC corrects is sent again
+    sends = 0
+    for _ in range(packets):
+        while True:
+            sends += 1
+            errors = np.count_nonzero(rng.random(PACKET_SIZE * 8) < ber)
+            if errors * 2 <= parity:
+                break
+    return sends * SEND_SECONDS, sends
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reed-Solomon packet FEC: codec speed and time on a noisy link")
+    parser.add_argument('--parity', type=int, nargs='+', default=[8, 16, 32], help="Parity bytes per 240-byte packet")
+    parser.add_argument('--packets', type=int, default=500, help="Packets timed per case")
+    parser.add_argument('--ber', type=float, nargs='+', default=[1e-5, 1e-4, 1e-3], help="Bit error rates for the link model")
+    parser.add_argument('--file', type=int, default=100000, help="File size for the link model, bytes")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"codec, {PACKET_SIZE}-byte packets ({args.packets} per case)")
+    print(f"{'parity':>6} {'case':>18} {'MB/s':>8} {'us/packet':>10}")
+    for parity in args.parity:
+        data_size = PACKET_SIZE - parity
+        data = [os.urandom(data_size) for _ in range(args.packets)]
+        packets = [rsfec.encode(chunk, parity) for chunk in data]
+        rows = [("encode", lambda chunk: rsfec.encode(chunk, parity), data),
+                ("decode, clean", lambda packet: rsfec.decode(packet, parity), packets)]
+        for errors in sorted({1, parity // 4, parity // 2} - {0}):
+            broken = [damaged(packet, errors, rng) for packet in packets]
+            rows.append((f"decode, {errors} bad", lambda packet: rsfec.decode(packet, parity), broken))
+        for name, function, inputs in rows:
+            rate, micros = throughput(function, inputs, data_size)
+            print(f"{parity:6} {name:>18} {rate:8.2f} {micros:10.0f}")
+
+    print(f"\nlink, {args.file} bytes, {SEND_SECONDS} s per packet sent")
+    print(f"{'BER':>8} " + " ".join(f"{'parity ' + str(parity):>16}" for parity in [0] + args.parity))
+    for ber in args.ber:
+        cells = []
+        for parity in [0] + args.parity:
+            packets = -(-args.file // (PACKET_SIZE - parity - (1 if parity else 0)))  # FEC packets carry their number
+            seconds, sends = link_time(parity, ber, packets, rng)
+            cells.append(f"{seconds:8.0f} s {sends / packets:4.2f}x")
+        print(f"{ber:8.0e} " + " ".join(f"{cell:>16}" for cell in cells))
@@ -0,0 +1,79 @@
+import binascii
+
+# Binary command frames for the on-board handler (same format as
+# satcont_main/command_handler/framing.py):
+# sync word, varint body length, CRC16 of the length, body, CRC16 of the
+# length and body (CCITT, init 0xFFFF, big endian).
+# body = varint command number, then per argument a type tag and its value.
+SYNC = b'\xa5\x5a'
+MAX_BODY = 4096
+
+# Зарезервированная команда: флаг stop_on_error и тела вложенных команд,
+# борт отвечает одной строкой со статусом каждой (0 - ok, 1 - ошибка,
+# 2 - не разобрана, 3 - неизвестна, '-' - пропущена)
+BATCH_COMMAND = 100
+
+TAG_STR = 0
+TAG_INT = 1
+TAG_FALSE = 2
+TAG_TRUE = 3
+TAG_BYTES = 4
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def encode_command(command_number, args):
+    return encode_frame(encode_body(command_number, args))
+
+
+def encode_body(command_number, args):
+    body = bytearray(encode_varint(command_number))
+    for arg in args:
+        if isinstance(arg, bool):
+            body.append(TAG_TRUE if arg else TAG_FALSE)
+        elif isinstance(arg, int):
+            body.append(TAG_INT)
+            body += encode_varint((arg << 1) ^ (arg >> 63))  # zigzag
+        elif isinstance(arg, str):
+            raw = arg.encode('utf-8')
+            body.append(TAG_STR)
+            body += encode_varint(len(raw)) + raw
+        elif isinstance(arg, (bytes, bytearray)):
+            body.append(TAG_BYTES)
+            body += encode_varint(len(arg)) + arg
+        else:
+            raise ValueError("Unsupported argument type: {}".format(type(arg).__name__))
+    return bytes(body)
+
+
+def encode_frame(body):
+    header = encode_varint(len(body))
+    header_crc = binascii.crc_hqx(header, 0xffff)
+    crc = binascii.crc_hqx(header + body, 0xffff)
+    return SYNC + header + header_crc.to_bytes(2, 'big') + bytes(body) + crc.to_bytes(2, 'big')
+
+
+def encode_batch(bodies, stop_on_error=True):
+    return encode_command(BATCH_COMMAND, [stop_on_error] + list(bodies))
+
+
+def group_batches(bodies, max_commands, max_body=MAX_BODY - 64):
+    # делит тела команд на пачки не длиннее max_body байт (с запасом на заголовки)
+    batch = []
+    size = 0
+    for body in bodies:
+        if batch and (len(batch) >= max_commands or size + len(body) + 4 > max_body):
+            yield batch
+            batch = []
+            size = 0
+        batch.append(body)
+        size += len(body) + 4
+    if batch:
+        yield batch
@@ -1,4 +1,5 @@
 import hashlib
+from binframe import encode_command
 
 def get_input(prompt):
     return input(prompt).strip()
@@ -8,6 +9,10 @@ def generate_command(path, data, mode, hash_check, line_number):
     command = f"++5+{path}:str+{data}:str+{mode}:str+{hash_check}:str+{line_number}:int++"
     return command
 
+def generate_binary_command(path, data, mode, hash_check, line_number):
+    # Та же команда в бинарном формате: '+' и ':' в данных не мешают
+    return encode_command(5, [path, data, mode, hash_check, line_number])
+
 def main():
     print("Введите параметры для функции manage_file:")
     
@@ -28,6 +33,8 @@ def main():
     command = generate_command(path, data, mode, data_hash, line_number)
     
     print(f"Сформированная команда: {command}")
+    binary_command = generate_binary_command(path, data, mode, data_hash, line_number)
+    print(f"Бинарная команда ({len(binary_command)} байт вместо {len(command.encode())}): {binary_command.hex()}")
 
 if __name__ == "__main__":
     main()
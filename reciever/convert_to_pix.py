@@ -2,7 +2,9 @@
 
 import sys
 import os
+import numpy as np
 from PIL import Image
+import pixcodec
 
 def get_next_file_number(folder_path):
     max_number = 0
@@ -28,7 +30,6 @@ def main(input_image_path, output_folder_path):
 
     # Open the image and convert it to grayscale
     img = Image.open(input_image_path).convert('L')
-    width, height = img.size
 
     # Determine the next file number
     next_file_number = get_next_file_number(output_folder_path)
@@ -36,15 +37,8 @@ def main(input_image_path, output_folder_path):
     # Path to the output file
     output_file_path = os.path.join(output_folder_path, f"splash_{next_file_number}.pix")
 
-    with open(output_file_path, 'w') as output_file:
-        for y in range(height):
-            line = []
-            for x in range(width):
-                pixel = img.getpixel((x, y))
-                # Convert pixel value from 0-255 to 0-9
-                gray_value = pixel // 26  # 26 = 256 / 10, to get values from 0 to 9
-                line.append(str(gray_value))
-            output_file.write(" ".join(line) + "\n")
+    # Convert pixel values from 0-255 to 0-9 and write all rows at once
+    pixcodec.write_pix(output_file_path, pixcodec.quantize(np.asarray(img)))
 
     print(f"{output_file_path}")
 
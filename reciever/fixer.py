@@ -1,64 +1,43 @@
 import sys
 import os
 import json
-import re
+import pixrestore
 
 def read_json(json_path):
     with open(json_path, 'r') as file:
         data = json.load(file)
     return data.get('width'), data.get('height')
 
-def process_file(input_path, output_path, max_length=None):
-    with open(input_path, 'r') as file:
-        lines = file.readlines()
-
-    cleaned_lines = []
-    max_num_count = 0
-
-    for line in lines:
-        # Убираем все, кроме чисел и пробелов
-        cleaned_line = ''.join(char for char in line if char.isdigit() or char.isspace())
-
-        # Добавляем пробелы между подряд идущими цифрами
-        cleaned_line = re.sub(r'(\d)(?=\d)', r'\1 ', cleaned_line)
-
-        # Считаем количество чисел в строке
-        num_count = len(cleaned_line.split())
-        if num_count > max_num_count:
-            max_num_count = num_count
-
-        cleaned_lines.append(cleaned_line)
-
-    # Если max_length не задан, берем максимальное количество чисел из строк
-    max_length = max_length if max_length else max_num_count
-
-    processed_lines = []
-    for line in cleaned_lines:
-        num_count = len(line.split())
-
-        # Заполняем строку нулями до необходимой длины или обрезаем ее
-        if num_count < max_length:
-            line = line.strip() + ' ' + '0 ' * (max_length - num_count)
-        elif num_count > max_length:
-            line = ' '.join(line.split()[:max_length])
-        
-        processed_lines.append(line.strip())
-
-    with open(output_path, 'w') as file:
-        for line in processed_lines:
-            file.write(line + '\n')
+def process_file(input_path, output_path, max_length=None, height=None, per_line=False):
+    # Строки восстанавливаются по одной и сразу пишутся в файл (см. pixrestore.py);
+    # без max_length ширина определяется по выборке строк
+    if max_length and not per_line:
+        # Ширина известна: цифры режутся на строки по ширине, уцелевшие
+        # переводы строк служат только для синхронизации
+        rows, resynced = pixrestore.resegment_file(input_path, output_path, max_length, height)
+        print("{} rows of {} pixels written, resynchronized at {} line breaks.".format(rows, max_length, resynced))
+        return
+    width, rows, damaged = pixrestore.restore_file(input_path, output_path, max_length)
+    print("{} rows of {} pixels written, {} repaired.".format(rows, width, damaged))
 
 def main():
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    json_path = sys.argv[3] if len(sys.argv) > 3 else None
-
-    if json_path:
-        max_length, _ = read_json(json_path)
+    args = [arg for arg in sys.argv[1:] if arg != '--per-line']
+    if len(args) not in (2, 3):
+        print("Usage: python fixer.py <input .pix> <output .pix> [<sidecar .json> | <packed .pix of the frame>] [--per-line]")
+        sys.exit(1)
+    input_path = args[0]
+    output_path = args[1]
+    geometry_path = args[2] if len(args) > 2 else None
+
+    # Ширина и высота кадра: из JSON или из заголовка упакованного .pix
+    if geometry_path and geometry_path.endswith('.json'):
+        max_length, height = read_json(geometry_path)
+    elif geometry_path:
+        max_length, height = pixrestore.header_geometry(geometry_path)
     else:
-        max_length = None
+        max_length, height = None, None
 
-    process_file(input_path, output_path, max_length)
+    process_file(input_path, output_path, max_length, height, '--per-line' in sys.argv)
 
 if __name__ == "__main__":
     main()
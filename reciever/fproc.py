@@ -2,15 +2,20 @@ import argparse
 import hashlib
 import os
 import platform
+from binframe import encode_body, encode_frame, encode_batch, group_batches
 
-def generate_command(path, data, mode, line_number):
+def generate_command(path, data, mode, line_number, binary=False):
     # Вычисление хеша данных
     data_hash = hashlib.md5(data.encode()).hexdigest()[:3]
+    if binary:
+        # Тело бинарного кадра: короче и допускает '+' и ':' в данных,
+        # кадрируется в save_commands (по одному или пачками)
+        return encode_body(5, [path, data, mode, data_hash, line_number])
     # Форматирование команды
     command = f"++5+{path}:str+{data}:str+{mode}:str+{data_hash}:str+{line_number}:int++"
     return command
 
-def process_file(file_path, additional_path, algorithm, os_type, max_chars=None):
+def process_file(file_path, additional_path, algorithm, os_type, max_chars=None, binary=False):
     with open(file_path, 'r') as file:
         content = file.read()
     
@@ -24,37 +29,48 @@ def process_file(file_path, additional_path, algorithm, os_type, max_chars=None)
     if algorithm == 'upstring':
         lines = content.splitlines()
         for i, line in enumerate(lines, start=1):
-            command = generate_command(relative_path, line, 'nstring', i)
+            command = generate_command(relative_path, line, 'nstring', i, binary)
             commands.append(command)
     else:
         chunk_size = int(algorithm)
         for i in range(0, len(content), chunk_size):
             chunk = content[i:i+chunk_size]
             line_number = (i // chunk_size) + 1
-            command = generate_command(relative_path, chunk, 'nstring', line_number)
+            command = generate_command(relative_path, chunk, 'nstring', line_number, binary)
             commands.append(command)
     
     return commands
 
-def process_directory(directory_path, additional_path, algorithm, os_type, max_chars=None):
+def process_directory(directory_path, additional_path, algorithm, os_type, max_chars=None, binary=False):
     commands = []
     for root, _, files in os.walk(directory_path):
         for file in files:
             file_path = os.path.join(root, file)
-            commands.extend(process_file(file_path, additional_path, algorithm, os_type, max_chars))
+            commands.extend(process_file(file_path, additional_path, algorithm, os_type, max_chars, binary))
     return commands
 
-def save_commands(commands, output_dir):
+def save_commands(commands, output_dir, binary=False, batch=1):
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    existing_files = [f for f in os.listdir(output_dir) if f.startswith('upload_') and f.endswith('.upld')]
+    extension = '.upldb' if binary else '.upld'
+    existing_files = [f for f in os.listdir(output_dir) if f.startswith('upload_') and f.endswith(extension)]
     next_number = len(existing_files) + 1
-    output_file = os.path.join(output_dir, f'upload_{next_number}.upld')
+    output_file = os.path.join(output_dir, f'upload_{next_number}{extension}')
 
-    with open(output_file, 'w') as f:
-        for command in commands:
-            f.write(command + '\n')
+    if binary:
+        # Бинарные кадры пишутся подряд, их можно отправлять файлом как есть
+        if batch > 1:
+            # Несколько команд в одном кадре - один ответ со статусами на пачку
+            frames = [encode_batch(bodies) for bodies in group_batches(commands, batch)]
+        else:
+            frames = [encode_frame(body) for body in commands]
+        with open(output_file, 'wb') as f:
+            f.write(b''.join(frames))
+    else:
+        with open(output_file, 'w') as f:
+            for command in commands:
+                f.write(command + '\n')
     
     print(f"Commands saved to {output_file}")
 
@@ -64,18 +80,20 @@ def main():
     parser.add_argument('additional_path', type=str, help="Additional path to prepend to file paths in commands")
     parser.add_argument('algorithm', type=str, help="Algorithm to use: 'upstring' or a number for chunk size")
     parser.add_argument('os_type', type=str, help="Operating system type: 'windows' or 'linux'")
+    parser.add_argument('--binary', action='store_true', help="Write binary frames (.upldb) instead of text commands")
+    parser.add_argument('--batch', type=int, default=1, help="With --binary: pack up to N commands into one batch frame")
     
     args = parser.parse_args()
 
     if os.path.isdir(args.path):
-        commands = process_directory(args.path, args.additional_path, args.algorithm, args.os_type)
+        commands = process_directory(args.path, args.additional_path, args.algorithm, args.os_type, binary=args.binary)
     elif os.path.isfile(args.path):
-        commands = process_file(args.path, args.additional_path, args.algorithm, args.os_type)
+        commands = process_file(args.path, args.additional_path, args.algorithm, args.os_type, binary=args.binary)
     else:
         print("Invalid path specified")
         return
     
-    save_commands(commands, os.path.join(os.path.dirname(__file__), 'upload'))
+    save_commands(commands, os.path.join(os.path.dirname(__file__), 'upload'), args.binary, args.batch)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+import struct
+import zlib
+import numpy as np
+import pixcodec
+
+# Row-checked .pix stream: a header (magic, width, height, level count, rows
+# per block, CRC32 of these fields), then blocks of rows, each
+#   'RB', first row, CRC32 of the first row and the pixels, pixels
+# with every row bit-packed like the packed format and padded to whole
+# bytes, then the end marker. A damaged block fails its CRC and only its
+# rows have to be sent again (command 8 on board, rowcheck.py on the
+# ground); a resend is the same stream with only some of the blocks.
+# Same code as satcont_main/camera/capture/pixcheck.py on board.
+MAGIC = b'PIXC'
+HEADER = struct.Struct('>4sHHBBI')
+BLOCK_MARK = b'RB'
+BLOCK = struct.Struct('>2sHI')
+END = b'PIXE'
+
+BLOCK_ROWS = 1
+
+
+def row_bytes(width, level_count):
+    return (width * pixcodec.bits_for(level_count) + 7) // 8
+
+
+def header(width, height, level_count, block_rows):
+    fields = struct.pack('>HHBB', width, height, level_count, block_rows)
+    return HEADER.pack(MAGIC, width, height, level_count, block_rows, zlib.crc32(fields))
+
+
+def read_header(data):
+    # returns (width, height, level count, rows per block)
+    if len(data) < HEADER.size or data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a row-checked PIX header")
+    _, width, height, level_count, block_rows, checksum = HEADER.unpack_from(data)
+    if zlib.crc32(bytes(data[len(MAGIC):HEADER.size - 4])) != checksum or not block_rows:
+        raise ValueError("Row-checked PIX header is damaged")
+    return width, height, level_count, block_rows
+
+
+def block_of(first_row, pixels):
+    checksum = zlib.crc32(struct.pack('>H', first_row) + pixels)
+    return BLOCK.pack(BLOCK_MARK, first_row, checksum) + pixels
+
+
+def encode_stream(levels, level_count=pixcodec.LEVELS, block_rows=BLOCK_ROWS, rows=None):
+    # the whole frame, or only the blocks holding the given rows
+    height, width = levels.shape
+    bits = pixcodec.bits_for(level_count)
+    firsts = range(0, height, block_rows)
+    if rows is not None:
+        firsts = sorted({row - row % block_rows for row in rows if 0 <= row < height})
+    parts = [header(width, height, level_count, block_rows)]
+    for first in firsts:
+        pixels = b''.join(pixcodec.pack_bits(row, bits) for row in levels[first:first + block_rows])
+        parts.append(block_of(first, pixels))
+    parts.append(END)
+    return b''.join(parts)
+
+
+def format_rows(rows):
+    # [3, 17, 20, 21, 22] -> "3,17,20-22"
+    ranges = []
+    for row in sorted(set(rows)):
+        if ranges and row == ranges[-1][1] + 1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return ','.join(str(first) if first == last else '{}-{}'.format(first, last) for first, last in ranges)
+
+
+def parse_rows(text):
+    rows = []
+    for part in str(text).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        rows.extend(range(int(first), int(last or first) + 1))
+    return rows
+
+
+class CheckedFrame:
+    # Ground side: feed() the stream, and later the resends, in any pieces;
+    # levels holds the frame (zeros where nothing good arrived yet) and good
+    # marks the rows whose block passed its CRC.
+    def __init__(self):
+        self.buffer = bytearray()
+        self.geometry = None
+        self.levels = None
+        self.good = None
+        self.ended = 0
+        self.damaged = 0
+
+    def start(self, geometry):
+        width, height, level_count, block_rows = geometry
+        self.geometry = geometry
+        self.level_count = level_count
+        self.block_rows = block_rows
+        self.row_size = row_bytes(width, level_count)
+        self.levels = np.zeros((height, width), dtype=np.uint8)
+        self.good = np.zeros(height, dtype=bool)
+
+    def feed(self, data):
+        # returns the number of blocks that passed their CRC
+        self.buffer += data
+        applied = 0
+        position = 0
+        while True:
+            position, mark = self.next_mark(position)
+            if mark is None:
+                # keep a tail that may be the start of a marker
+                position = max(position, len(self.buffer) - len(MAGIC) + 1)
+                break
+            if mark == END:
+                position += len(END)
+                self.ended += 1
+                continue
+            if mark == MAGIC:
+                if len(self.buffer) - position < HEADER.size:
+                    break
+                try:
+                    geometry = read_header(self.buffer[position:position + HEADER.size])
+                except ValueError:
+                    position += 1
+                    continue
+                if self.geometry is None:
+                    self.start(geometry)
+                elif geometry != self.geometry:
+                    raise ValueError("The stream is for another frame ({}x{})".format(*geometry[:2]))
+                position += HEADER.size
+                continue
+            if len(self.buffer) - position < BLOCK.size:
+                break
+            size = self.block_size(self.buffer, position)
+            if size is None:
+                position += 1  # no header yet, or a damaged row number
+                self.damaged += 1
+                continue
+            if len(self.buffer) - position < size:
+                if self.buffer.find(END, position + BLOCK.size) == -1:
+                    break
+                position += 1  # cut short by the end of the stream: a false or damaged mark
+                self.damaged += 1
+                continue
+            if self.apply(bytes(self.buffer[position:position + size])):
+                position += size
+                applied += 1
+            else:
+                position += 1
+                self.damaged += 1
+        del self.buffer[:max(position, 0)]
+        return applied
+
+    def next_mark(self, position):
+        # (position, mark) of the nearest marker; in a clean stream a block
+        # mark is right at position, so nothing further is searched
+        nearest, found = len(self.buffer), None
+        for mark in (BLOCK_MARK, MAGIC, END):
+            index = self.buffer.find(mark, position, nearest + len(mark) - 1)
+            if index != -1:
+                nearest, found = index, mark
+        return (nearest, found) if found else (position, None)
+
+    def block_size(self, data, offset=0):
+        if self.geometry is None:
+            return None
+        _, first_row, _ = BLOCK.unpack_from(data, offset)
+        height = self.levels.shape[0]
+        if first_row >= height or first_row % self.block_rows:
+            return None
+        return BLOCK.size + min(self.block_rows, height - first_row) * self.row_size
+
+    def apply(self, block):
+        _, first_row, checksum = BLOCK.unpack_from(block)
+        pixels = block[BLOCK.size:]
+        if zlib.crc32(block[2:4] + pixels) != checksum:
+            return False
+        bits = pixcodec.bits_for(self.level_count)
+        width = self.levels.shape[1]
+        for index in range(len(pixels) // self.row_size):
+            row = pixels[index * self.row_size:(index + 1) * self.row_size]
+            self.levels[first_row + index] = pixcodec.unpack_bits(row, width, bits)
+            self.good[first_row + index] = True
+        return True
+
+    def bad_rows(self):
+        return [] if self.good is None else np.flatnonzero(~self.good).tolist()
@@ -0,0 +1,136 @@
+#python3 pixcorrupt.py splash_1.pix corrupted --frames 1000 --seed 7 --ber 1e-4 --bursts 1e-5 --dropped-newlines 0.01
+
+import argparse
+import os
+import time
+import numpy as np
+
+# Seeded corruption of .pix data (text or binary) for testing the restore
+# and transfer tools: the same seed and rates always give the same damage.
+# Every kind of damage is a rate:
+#   symbols          share of characters hit the way PixViewer always did it
+#                    (half of them become one of SYMBOLS)
+#   bit_errors       chance of each bit flipping (bit error rate)
+#   byte_errors      chance of each byte being replaced by another value
+#   bursts           chance of a burst starting at each byte; a burst replaces
+#                    burst_length bytes
+#   dropped_newlines chance of each line break being lost (with its '\r')
+#   row_swaps        share of rows swapped in pairs
+# Positions are drawn all at once with NumPy, so a frame takes milliseconds.
+# Used by PixViewer (Corrupt menu) and from the command line.
+SYMBOLS = b'@#$%&'
+NEWLINE = ord('\n')
+RETURN = ord('\r')
+BURST_LENGTH = 8
+
+
+def swap_rows(data, share, rng):
+    rows = data.split(b'\n')
+    height = len(rows) - (rows[-1] == b'')  # not the empty piece after the last line break
+    count = int(height * share) // 2 * 2
+    if count < 2:
+        return data, 0
+    chosen = rng.choice(height, count, replace=False)
+    for first, second in zip(chosen[0::2].tolist(), chosen[1::2].tolist()):
+        rows[first], rows[second] = rows[second], rows[first]
+    return b'\n'.join(rows), count // 2
+
+
+def positions(size, rate, rng):
+    # each of size places is hit with probability rate; duplicates are rare and harmless
+    count = rng.binomial(size, min(rate, 1.0)) if size else 0
+    return rng.integers(0, size, count) if count else np.zeros(0, dtype=np.int64)
+
+
+def corrupt(data, seed=None, symbols=0.0, bit_errors=0.0, byte_errors=0.0, bursts=0.0,
+            burst_length=BURST_LENGTH, dropped_newlines=0.0, row_swaps=0.0):
+    # returns (damaged bytes, {kind of damage: how many})
+    rng = np.random.default_rng(seed)
+    counts = {}
+    data = bytes(data)
+    if row_swaps:
+        data, counts['row_swaps'] = swap_rows(data, row_swaps, rng)
+    buffer = np.frombuffer(data, dtype=np.uint8).copy()
+    size = buffer.size
+    if symbols and size:
+        hit = rng.choice(size, int(size * symbols), replace=False)
+        hit = hit[rng.random(hit.size) < 0.5]  # the other half keep their character
+        buffer[hit] = np.frombuffer(SYMBOLS, dtype=np.uint8)[rng.integers(0, len(SYMBOLS), hit.size)]
+        counts['symbols'] = int(hit.size)
+    if byte_errors:
+        hit = positions(size, byte_errors, rng)
+        buffer[hit] ^= rng.integers(1, 256, hit.size, dtype=np.uint8)
+        counts['byte_errors'] = int(hit.size)
+    if bursts:
+        starts = positions(size, bursts, rng)
+        hit = (starts[:, None] + np.arange(burst_length)).reshape(-1)
+        hit = hit[hit < size]
+        buffer[hit] = rng.integers(0, 256, hit.size, dtype=np.uint8)
+        counts['bursts'] = int(starts.size)
+    if bit_errors:
+        hit = positions(size * 8, bit_errors, rng)
+        np.bitwise_xor.at(buffer, hit // 8, (1 << (hit % 8)).astype(np.uint8))
+        counts['bit_errors'] = int(hit.size)
+    if dropped_newlines:
+        breaks = np.flatnonzero(buffer == NEWLINE)
+        lost = breaks[rng.random(breaks.size) < dropped_newlines]
+        returns = lost[lost > 0] - 1
+        returns = returns[buffer[returns] == RETURN]
+        buffer = np.delete(buffer, np.concatenate((lost, returns)))
+        counts['dropped_newlines'] = int(lost.size)
+    return buffer.tobytes(), counts
+
+
+def corrupt_file(input_path, output_path, seed=None, **rates):
+    with open(input_path, 'rb') as f:
+        data, counts = corrupt(f.read(), seed, **rates)
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return counts
+
+
+def corrupt_frames(input_path, output_folder, frames, seed=0, **rates):
+    # frames damaged copies; copy i always gets the seed (seed, i)
+    with open(input_path, 'rb') as f:
+        data = f.read()
+    name, extension = os.path.splitext(os.path.basename(input_path))
+    width = len(str(frames))
+    totals = {}
+    for index in range(frames):
+        damaged, counts = corrupt(data, [seed, index], **rates)
+        with open(os.path.join(output_folder, "{}_{:0{}}{}".format(name, index, width, extension)), 'wb') as f:
+            f.write(damaged)
+        for kind, count in counts.items():
+            totals[kind] = totals.get(kind, 0) + count
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write seeded, damaged copies of a .pix file")
+    parser.add_argument('input', type=str, help="Source .pix (text or binary)")
+    parser.add_argument('output', type=str, help="Output file, or a folder with --frames")
+    parser.add_argument('--frames', type=int, default=0, help="Write this many copies into the output folder")
+    parser.add_argument('--seed', type=int, default=None, help="Same seed, same damage")
+    parser.add_argument('--symbols', type=float, default=0.0, help="Share of characters hit as in PixViewer")
+    parser.add_argument('--ber', type=float, default=0.0, help="Bit error rate")
+    parser.add_argument('--byte-errors', type=float, default=0.0, help="Chance of each byte being replaced")
+    parser.add_argument('--bursts', type=float, default=0.0, help="Chance of a burst starting at each byte")
+    parser.add_argument('--burst-length', type=int, default=BURST_LENGTH, help="Bytes per burst")
+    parser.add_argument('--dropped-newlines', type=float, default=0.0, help="Chance of each line break being lost")
+    parser.add_argument('--row-swaps', type=float, default=0.0, help="Share of rows swapped in pairs")
+    args = parser.parse_args()
+
+    rates = dict(symbols=args.symbols, bit_errors=args.ber, byte_errors=args.byte_errors, bursts=args.bursts,
+                 burst_length=args.burst_length, dropped_newlines=args.dropped_newlines, row_swaps=args.row_swaps)
+    start = time.perf_counter()
+    if args.frames:
+        os.makedirs(args.output, exist_ok=True)
+        counts = corrupt_frames(args.input, args.output, args.frames, args.seed or 0, **rates)
+        seconds = time.perf_counter() - start
+        print("{} frames written to {} in {:.1f} s ({:.0f} frames per minute).".format(
+            args.frames, args.output, seconds, args.frames / seconds * 60))
+    else:
+        counts = corrupt_file(args.input, args.output, args.seed, **rates)
+        print("Written to {}.".format(args.output))
+    for kind, count in counts.items():
+        print("{}: {}".format(kind, count))
@@ -0,0 +1,239 @@
+import heapq
+import struct
+import zlib
+import numpy as np
+import pixcodec
+
+# Entropy-coded .pix: header (magic, width, height, level count, mode, CRC32
+# of the decoded pixels, payload length), then the payload in one of the
+# modes below. encode_best() tries them all and keeps the smallest.
+# Same code as satcont_main/camera/capture/pixentropy.py on board.
+MAGIC = pixcodec.CODED_MAGIC
+HEADER = struct.Struct('>4sHHBBII')
+
+MODE_PACKED = 0   # bit-packed pixels, as in the packed format
+MODE_RLE = 1      # runs of equal pixels
+MODE_HUFFMAN = 2  # static Huffman code built for the frame
+MODE_ZLIB = 3     # zlib over the packed pixels
+MODE_NAMES = {MODE_PACKED: 'packed', MODE_RLE: 'rle', MODE_HUFFMAN: 'huffman', MODE_ZLIB: 'zlib'}
+
+# RLE payload: run count, then one byte per run (value << 4 | length - 1 for
+# runs up to 15 pixels, length nibble 15 for longer ones), then a big endian
+# uint16 of length - 16 for every long run, in the same order
+RLE_COUNT = struct.Struct('>I')
+RLE_SHORT = 15
+RLE_LONGEST = 16 + 0xffff
+
+MAX_CODE_LENGTH = 15
+ZLIB_LEVEL = 6  # level 9 is several times slower for about 2% less
+
+
+def encode_packed(flat, level_count):
+    return pixcodec.pack_bits(flat, pixcodec.bits_for(level_count))
+
+
+def decode_packed(payload, count, level_count):
+    return pixcodec.unpack_bits(payload, count, pixcodec.bits_for(level_count))
+
+
+def encode_rle(flat):
+    if not flat.size:
+        return RLE_COUNT.pack(0)
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    lengths = np.diff(np.append(starts, flat.size))
+    values = flat[starts]
+    # runs longer than one uint16 can hold are split into several
+    pieces = (lengths + RLE_LONGEST - 1) // RLE_LONGEST
+    if (pieces > 1).any():
+        values = np.repeat(values, pieces)
+        last = np.cumsum(pieces) - 1
+        lengths = np.repeat(lengths, pieces)
+        offsets = np.arange(lengths.size) - np.repeat(last - pieces + 1, pieces)
+        lengths = np.minimum(lengths - offsets * RLE_LONGEST, RLE_LONGEST)
+    long_runs = lengths > RLE_SHORT
+    heads = (values.astype(np.uint8) << 4) | np.where(long_runs, RLE_SHORT, lengths - 1).astype(np.uint8)
+    extra = (lengths[long_runs] - 16).astype('>u2')
+    return RLE_COUNT.pack(lengths.size) + heads.tobytes() + extra.tobytes()
+
+
+def decode_rle(payload, count):
+    runs, = RLE_COUNT.unpack_from(payload)
+    heads = np.frombuffer(payload, dtype=np.uint8, count=runs, offset=RLE_COUNT.size)
+    lengths = (heads & 0x0f).astype(np.int64) + 1
+    long_runs = lengths > RLE_SHORT
+    extra = np.frombuffer(payload, dtype='>u2', count=int(long_runs.sum()), offset=RLE_COUNT.size + runs)
+    lengths[long_runs] = extra.astype(np.int64) + 16
+    if lengths.sum() != count:
+        raise ValueError("RLE runs do not add up to the frame size")
+    return np.repeat(heads >> 4, lengths)
+
+
+def code_lengths(histogram):
+    # Huffman code length per symbol (0 for unused symbols)
+    lengths = [0] * len(histogram)
+    heap = [(int(count), symbol, [symbol]) for symbol, count in enumerate(histogram) if count]
+    if len(heap) == 1:
+        lengths[heap[0][1]] = 1
+        return lengths
+    heapq.heapify(heap)
+    while len(heap) > 1:
+        count_a, key_a, symbols_a = heapq.heappop(heap)
+        count_b, key_b, symbols_b = heapq.heappop(heap)
+        for symbol in symbols_a + symbols_b:
+            lengths[symbol] += 1
+        heapq.heappush(heap, (count_a + count_b, min(key_a, key_b), symbols_a + symbols_b))
+    return lengths
+
+
+def canonical_codes(lengths):
+    codes = [0] * len(lengths)
+    code = 0
+    previous = 0
+    for length, symbol in sorted((length, symbol) for symbol, length in enumerate(lengths) if length):
+        code <<= length - previous
+        codes[symbol] = code
+        code += 1
+        previous = length
+    return codes
+
+
+def encode_huffman(flat, level_count):
+    # payload: one code length byte per level, then the bit stream
+    histogram = np.bincount(flat, minlength=level_count)
+    lengths = code_lengths(histogram)
+    if max(lengths) > MAX_CODE_LENGTH:
+        return None  # only for extreme histograms, another mode wins anyway
+    codes = canonical_codes(lengths)
+    longest = max(lengths)
+    # every pixel becomes a row of `longest` bits, of which the first
+    # length bits are kept
+    shifts = np.arange(longest - 1, -1, -1)
+    table = ((np.array(codes)[:, None] << (longest - np.array(lengths))[:, None]) >> shifts) & 1
+    keep = np.arange(longest) < np.array(lengths)[:, None]
+    bits = table[flat][keep[flat]].astype(np.uint8)
+    return bytes(lengths) + np.packbits(bits).tobytes()
+
+
+def decode_huffman(payload, count, level_count):
+    lengths = list(payload[:level_count])
+    codes = canonical_codes(lengths)
+    longest = max(lengths)
+    # symbol and code length for every possible `longest`-bit window
+    window_symbol = np.zeros(1 << longest, dtype=np.uint8)
+    window_length = np.zeros(1 << longest, dtype=np.int32)
+    for symbol, length in enumerate(lengths):
+        if length:
+            first = codes[symbol] << (longest - length)
+            window_symbol[first:first + (1 << (longest - length))] = symbol
+            window_length[first:first + (1 << (longest - length))] = length
+    bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8, offset=level_count))
+    bits = np.concatenate((bits, np.zeros(longest, dtype=np.uint8)))
+    positions = bits.size - longest
+    windows = np.zeros(positions, dtype=np.int32)
+    for offset in range(longest):
+        windows = (windows << 1) | bits[offset:offset + positions]
+    # position of the next code after a code starting at each position;
+    # `positions` is the end of the stream and points to itself
+    lengths_at = window_length[windows]
+    following = np.arange(1, positions + 1, dtype=np.int32) - 1 + lengths_at
+    following[lengths_at == 0] = positions
+    following = np.append(np.minimum(following, positions), np.int32(positions))
+    # which positions start a code can only be found by walking from the
+    # first one; the walk jumps 64 codes per step and is then filled in
+    ahead = following
+    for _ in range(6):
+        ahead = ahead[ahead]
+    blocks = (count + 63) // 64
+    block_starts = np.empty(blocks, dtype=np.int32)
+    position = 0
+    for block in range(blocks):
+        block_starts[block] = position
+        position = ahead[position]
+    starts = np.empty((blocks, 64), dtype=np.int32)
+    current = block_starts
+    for step in range(64):
+        starts[:, step] = current
+        current = following[current]
+    starts = starts.reshape(-1)[:count]
+    if starts.size and starts[-1] >= positions:
+        raise ValueError("Huffman stream is truncated")
+    return window_symbol[windows[starts]]
+
+
+def encode_zlib(flat, level_count):
+    return zlib.compress(encode_packed(flat, level_count), ZLIB_LEVEL)
+
+
+def decode_zlib(payload, count, level_count):
+    packed = zlib.decompress(payload)
+    if len(packed) != (count * pixcodec.bits_for(level_count) + 7) // 8:
+        raise ValueError("zlib payload does not match the frame size")
+    return decode_packed(packed, count, level_count)
+
+
+def encode(levels, mode, level_count=pixcodec.LEVELS):
+    height, width = levels.shape
+    flat = np.ascontiguousarray(levels, dtype=np.uint8).reshape(-1)
+    if mode == MODE_PACKED:
+        payload = encode_packed(flat, level_count)
+    elif mode == MODE_RLE:
+        payload = encode_rle(flat)
+    elif mode == MODE_HUFFMAN:
+        payload = encode_huffman(flat, level_count)
+    elif mode == MODE_ZLIB:
+        payload = encode_zlib(flat, level_count)
+    else:
+        raise ValueError("Unknown PIX coding mode: {}".format(mode))
+    if payload is None:
+        return None
+    header = HEADER.pack(MAGIC, width, height, level_count, mode, zlib.crc32(flat.tobytes()), len(payload))
+    return header + payload
+
+
+def encode_best(levels, level_count=pixcodec.LEVELS, modes=tuple(MODE_NAMES)):
+    # the smallest coded frame among the given modes
+    best = None
+    for mode in modes:
+        data = encode(levels, mode, level_count)
+        if data is not None and (best is None or len(data) < len(best)):
+            best = data
+    return best
+
+
+def is_coded(data):
+    return data[:len(MAGIC)] == MAGIC
+
+
+def read_header(data):
+    # returns (width, height, level count, mode, CRC32, size of the whole frame)
+    if len(data) < HEADER.size or not is_coded(data):
+        raise ValueError("Not an entropy-coded PIX header")
+    _, width, height, level_count, mode, checksum, length = HEADER.unpack_from(data)
+    return width, height, level_count, mode, checksum, HEADER.size + length
+
+
+def decode(data):
+    width, height, level_count, mode, checksum, size = read_header(data)
+    if len(data) < size:
+        raise ValueError("Coded PIX data is truncated ({} of {} bytes)".format(len(data), size))
+    payload = bytes(data[HEADER.size:size])
+    count = width * height
+    if mode == MODE_PACKED:
+        flat = decode_packed(payload, count, level_count)
+    elif mode == MODE_RLE:
+        flat = decode_rle(payload, count)
+    elif mode == MODE_HUFFMAN:
+        flat = decode_huffman(payload, count, level_count)
+    elif mode == MODE_ZLIB:
+        flat = decode_zlib(payload, count, level_count)
+    else:
+        raise ValueError("Unknown PIX coding mode: {}".format(mode))
+    flat = np.ascontiguousarray(flat, dtype=np.uint8)
+    if zlib.crc32(flat.tobytes()) != checksum:
+        raise ValueError("Coded PIX checksum mismatch")
+    return flat.reshape(height, width)
+
+
+def write_coded(output_path, levels, level_count=pixcodec.LEVELS):
+    with open(output_path, 'wb') as output_file:
+        output_file.write(encode_best(levels, level_count))
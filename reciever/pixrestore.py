@@ -0,0 +1,169 @@
+import os
+import numpy as np
+import pixcodec
+
+# Restore damaged text .pix files: every digit in a line is a pixel,
+# anything else is dropped, and each row is padded with zeros or cut to the
+# frame width. Rows are written out as they are read, a block at a time, so
+# memory does not grow with the file. Used by fixer.py and PixViewer
+# (through pixrows.py).
+DIGIT = pixcodec.DIGIT
+NON_DIGITS = bytes(value for value in range(256) if not DIGIT <= value < DIGIT + 10)
+
+SAMPLE_ROWS = 64  # rows looked at to guess the width
+BLOCK_ROWS = 1024  # rows formatted and written at a time
+
+
+def clean(line):
+    # the digits of a line, everything else removed in one step
+    return line.translate(None, NON_DIGITS)
+
+
+def restore_row(line, width):
+    # bytes of one line -> uint8 row of exactly width pixels
+    row = np.zeros(width, dtype=np.uint8)
+    digits = np.frombuffer(clean(line), dtype=np.uint8)[:width]
+    row[:digits.size] = digits - DIGIT
+    return row
+
+
+def likely_width(digit_counts):
+    # the most common number of digits per row; damage mostly adds or drops
+    # a few digits, so the clean rows outvote it (ties go to the wider row)
+    counts = np.bincount(np.asarray(digit_counts, dtype=np.int64))
+    return int(len(counts) - 1 - np.argmax(counts[::-1])) if counts.size else 0
+
+
+def split_rows(lines):
+    # rows of a binary file: '\n', '\r\n' and a lone '\r' all end a row,
+    # as in a file read in text mode
+    for line in lines:
+        if line.endswith(b'\r\n'):
+            line = line[:-2]
+        elif line.endswith((b'\n', b'\r')):
+            line = line[:-1]
+        if b'\r' in line:
+            yield from line.split(b'\r')
+        else:
+            yield line
+
+
+def guess_width(input_file, samples=SAMPLE_ROWS):
+    # digits per row for rows spread over the whole file, without reading it all
+    size = input_file.seek(0, os.SEEK_END)
+    counts = []
+    for index in range(samples):
+        offset = size * index // samples
+        input_file.seek(offset)
+        if offset:
+            input_file.readline()  # the rest of a row cut in the middle
+        line = input_file.readline()
+        if line:
+            counts.extend(len(clean(row)) for row in split_rows([line]))
+    input_file.seek(0)
+    return likely_width(counts)
+
+
+class RowWriter:
+    # collects rows of digits and writes them as text rows, a block at a
+    # time; rows past limit are dropped
+    def __init__(self, output_file, width, block_rows=BLOCK_ROWS, limit=None):
+        self.output_file = output_file
+        self.block = np.zeros((block_rows, width), dtype=np.uint8)
+        self.limit = limit
+        self.filled = 0
+        self.rows = 0
+
+    def count(self):
+        return self.rows + self.filled
+
+    def add(self, digits):
+        # digits: bytes of '0'-'9', padded with zeros or cut to the width
+        if self.limit is not None and self.count() >= self.limit:
+            return
+        values = np.frombuffer(digits, dtype=np.uint8)[:self.block.shape[1]]
+        self.block[self.filled, :values.size] = values - DIGIT
+        self.block[self.filled, values.size:] = 0
+        self.filled += 1
+        if self.filled == len(self.block):
+            self.flush()
+
+    def flush(self):
+        if self.filled:
+            self.output_file.write(pixcodec.format_pix(self.block[:self.filled]))
+            self.rows += self.filled
+            self.filled = 0
+
+
+def restore_stream(input_file, output_file, width, block_rows=BLOCK_ROWS):
+    # one row per line; returns (rows written, rows that were not clean "d d d" rows)
+    writer = RowWriter(output_file, width, block_rows)
+    damaged = 0
+    clean_length = max(2 * width - 1, 0)
+    for line in split_rows(input_file):
+        digits = clean(line)
+        if len(digits) != width or len(line) != clean_length:
+            damaged += 1
+        writer.add(digits)
+    writer.flush()
+    return writer.rows, damaged
+
+
+def resegment_stream(input_file, output_file, width, height=None, block_rows=BLOCK_ROWS):
+    # For a known width: the digits are one stream cut into rows of width
+    # pixels, so a lost line break no longer merges two rows into one.
+    # Line breaks that survived resynchronize the cut: at each one the
+    # digits since the last cut make round(count / width) rows (the last one
+    # padded or cut), and a piece shorter than half a row is taken for a
+    # spurious break and joined to the next line. With a known height the
+    # output has exactly that many rows.
+    # Returns (rows written, line breaks that were not where a row ends).
+    writer = RowWriter(output_file, width, block_rows, height)
+    pending = b''
+    resynced = 0
+    for line in split_rows(input_file):
+        pending += clean(line)
+        rows = (2 * len(pending) + width) // (2 * width)  # rounded
+        if not rows:
+            resynced += 1
+            continue
+        if len(pending) != rows * width or rows > 1:
+            resynced += 1
+        for row in range(rows - 1):
+            writer.add(pending[row * width:(row + 1) * width])
+        writer.add(pending[(rows - 1) * width:])
+        pending = b''
+        if height and writer.count() >= height:
+            break
+    if pending:
+        for row in range(max(1, (2 * len(pending) + width) // (2 * width))):
+            writer.add(pending[row * width:(row + 1) * width])
+    while height and writer.count() < height:
+        writer.add(b'')
+    writer.flush()
+    return writer.rows, resynced
+
+
+def header_geometry(path):
+    # (width, height) from the header of a packed or coded .pix of the same frame
+    with open(path, 'rb') as f:
+        head = f.read(32)
+    if pixcodec.is_packed(head):
+        return tuple(pixcodec.read_header(head)[:2])
+    import pixentropy
+    return tuple(pixentropy.read_header(head)[:2])
+
+
+def restore_file(input_path, output_path, width=None):
+    # returns (width, rows written, rows repaired)
+    with open(input_path, 'rb') as input_file, open(output_path, 'wb') as output_file:
+        if not width:
+            width = guess_width(input_file)
+        rows, damaged = restore_stream(input_file, output_file, width)
+    return width, rows, damaged
+
+
+def resegment_file(input_path, output_path, width, height=None):
+    # returns (rows written, line breaks resynchronized on)
+    with open(input_path, 'rb') as input_file, open(output_path, 'wb') as output_file:
+        return resegment_stream(input_file, output_file, width, height)
@@ -0,0 +1,132 @@
+import mmap
+import numpy as np
+import pixcodec
+import pixrestore
+
+# Row-indexed .pix reader for the viewer. Text files are memory-mapped and
+# only the row offsets are kept (one pass over the file, done in blocks);
+# rows are decoded when asked for. Damaged rows are restored by pixrestore.py
+# (every digit is a pixel, padded or cut to the most common row width).
+# Packed and coded files are decoded whole (they are small and carry a
+# checksum).
+DIGIT = pixcodec.DIGIT
+SPACE = pixcodec.SPACE
+NEWLINE = pixcodec.NEWLINE
+RETURN = pixcodec.RETURN
+
+INDEX_BLOCK = 1 << 20  # bytes scanned at a time while indexing
+GATHER_ROWS = 256  # plain rows decoded at a time
+
+
+class PixRowReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.map = None
+        self.levels = None
+        size = self.file.seek(0, 2)
+        if not size:
+            self.file.close()
+            raise ValueError("Empty PIX file")
+        self.file.seek(0)
+        if pixcodec.is_binary(self.file.read(len(pixcodec.MAGIC))):
+            self.file.seek(0)
+            self.levels, self.level_count = pixcodec.parse_pix_info(self.file.read())
+            self.file.close()
+            self.height, self.width = self.levels.shape
+            self.damaged = np.zeros(self.height, dtype=bool)
+            return
+        self.level_count = pixcodec.LEVELS
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = np.frombuffer(self.map, dtype=np.uint8)
+        self.index()
+
+    def index(self):
+        # row starts and ends (without '\r\n'), digits per row and which
+        # rows are not plain "d d d" rows; a lone '\r' ends a row too, as
+        # it did when the viewer read the file in text mode. One pass over
+        # the file, INDEX_BLOCK bytes at a time, so memory stays flat.
+        buffer = self.buffer
+        breaks = []
+        digits_before = []
+        spaces_before = []
+        digit_total = 0
+        space_total = 0
+        for first in range(0, buffer.size, INDEX_BLOCK):
+            block = buffer[first:first + INDEX_BLOCK]
+            following = buffer[first + 1:first + 1 + block.size]
+            lone_returns = block == RETURN
+            lone_returns[:following.size] &= following != NEWLINE
+            positions = np.flatnonzero((block == NEWLINE) | lone_returns)
+            digit_sum = np.cumsum((block - DIGIT) < 10, dtype=np.int32)
+            space_sum = np.cumsum(block == SPACE, dtype=np.int32)
+            breaks.append(positions + first)
+            digits_before.append(digit_sum[positions] + digit_total)
+            spaces_before.append(space_sum[positions] + space_total)
+            digit_total += int(digit_sum[-1])
+            space_total += int(space_sum[-1])
+        breaks = np.concatenate(breaks)
+        digits_before = np.concatenate(digits_before)
+        spaces_before = np.concatenate(spaces_before)
+        if not breaks.size or breaks[-1] != buffer.size - 1:
+            # the last row has no line break
+            breaks = np.append(breaks, buffer.size)
+            digits_before = np.append(digits_before, digit_total)
+            spaces_before = np.append(spaces_before, space_total)
+        starts = np.concatenate(([0], breaks[:-1] + 1))
+        ends = breaks - ((breaks > starts) & (buffer[np.maximum(breaks - 1, 0)] == RETURN))
+        digits = np.diff(digits_before, prepend=0)
+        spaces = np.diff(spaces_before, prepend=0)
+        self.starts = starts
+        self.ends = ends
+        self.height = starts.size
+        self.width = pixrestore.likely_width(digits)
+        lengths = ends - starts
+        self.damaged = ((digits != self.width) | (spaces != max(self.width - 1, 0))
+                        | (lengths != max(2 * self.width - 1, 0)))
+
+    def row(self, y):
+        return self.rows(y, y + 1)[0]
+
+    def rows(self, first, last, step=1):
+        # (rows, width) uint8 array of the restored rows first, first + step, ... before last
+        first = max(first, 0)
+        last = min(last, self.height)
+        if self.levels is not None:
+            return self.levels[first:last:step]
+        wanted = np.arange(first, last, step)
+        levels = np.zeros((wanted.size, self.width), dtype=np.uint8)
+        if not wanted.size:
+            return levels
+        plain = np.flatnonzero(~self.damaged[wanted])
+        for block in range(0, plain.size, GATHER_ROWS):
+            # "d d d" rows: every second byte from the row start; a row that
+            # only has the right counts ("5 4 3 22 7") is restored after all
+            batch = plain[block:block + GATHER_ROWS]
+            starts = self.starts[wanted[batch]][:, None]
+            values = self.buffer[starts + np.arange(0, 2 * self.width, 2)] - DIGIT
+            gaps = self.buffer[starts + np.arange(1, 2 * self.width - 1, 2)]
+            wrong = (values >= 10).any(axis=1) | (gaps != SPACE).any(axis=1)
+            self.damaged[wanted[batch[wrong]]] = True
+            levels[batch] = values
+        for offset in np.flatnonzero(self.damaged[wanted]):
+            line = self.map[self.starts[wanted[offset]]:self.ends[wanted[offset]]]
+            levels[offset] = pixrestore.restore_row(line, self.width)
+        return levels
+
+    def damaged_rows(self):
+        return int(self.damaged.sum())
+
+    def write_restored(self, output_path):
+        # the whole file as clean text rows, streamed from disk
+        if self.levels is not None:
+            pixcodec.write_pix(output_path, self.levels)
+        else:
+            pixrestore.restore_file(self.path, output_path, self.width)
+
+    def close(self):
+        if self.map is not None:
+            self.buffer = None
+            self.map.close()
+            self.file.close()
+            self.map = None
@@ -2,11 +2,18 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, Menu, Label, Entry, Checkbutton, IntVar, DoubleVar, Toplevel, Button, Text, Scrollbar, Frame, StringVar
 from tkinter.ttk import Progressbar
 from PIL import Image, ImageTk
+import numpy as np
+import math
 import os
 import re
 import random
 import threading
-from itertools import takewhile
+import pixcodec
+import pixcorrupt
+import pixrows
+
+# Zoom, pan and window resizes redraw once the events stop for this long
+RENDER_DELAY_MS = 30
 
 class PixViewer(tk.Tk):
     def __init__(self):
@@ -43,8 +50,15 @@ class PixViewer(tk.Tk):
         view_menu.add_radiobutton(label="Fixed", variable=self.view_mode, value="fixed", command=self.update_view_mode)
 
         self.current_file_path = None
+        # the open .pix file; only the rows inside the canvas are decoded
+        self.reader = None
         self.image = None
         self.tk_image = None
+        # the shown image and its cached 1/2, 1/4, ... reductions for zooming out
+        self.pyramid = []
+        # (image or reader, crop height) of the last one cropped in "Fixed" mode
+        self.crop_cache = None
+        self.render_job = None
 
         self.canvas.bind("<Configure>", self.resize_image)
         self.canvas.bind("<ButtonPress-1>", self.on_button_press)
@@ -58,6 +72,9 @@ class PixViewer(tk.Tk):
         self.pan_end_x = 0
         self.pan_end_y = 0
         self.scale_factor = 1.0
+        # canvas position of the image's top left corner
+        self.view_x = 0
+        self.view_y = 0
 
     def open_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("PIX files", "*.pix"), ("JPG files", "*.jpg")])
@@ -72,21 +89,19 @@ class PixViewer(tk.Tk):
 
     def load_pix_file(self, file_path):
         try:
-            with open(file_path, 'r') as file:
-                lines = file.readlines()
-
-            # Clean and restore the file if necessary
-            restored_lines = self.restore_pix_file(lines)
-            if restored_lines != lines:
+            # Rows are indexed once and restored as they are drawn
+            # (packed and coded files carry a checksum, there is nothing to restore)
+            reader = pixrows.PixRowReader(file_path)
+            self.close_reader()
+            self.reader = reader
+            if reader.damaged_rows():
                 restored_file_path = os.path.join(os.path.dirname(file_path), f"restored_{os.path.basename(file_path)}")
-                with open(restored_file_path, 'w') as restored_file:
-                    restored_file.writelines(restored_lines)
+                reader.write_restored(restored_file_path)
                 self.show_info(f"Restored file saved as {restored_file_path}")
-                lines = restored_lines
 
             self.canvas.delete("all")
-            self.image = self.create_image_from_pix(lines)
-            self.scale_factor = 1.0
+            self.image = None
+            self.reset_view()
             self.display_image()
 
         except Exception as e:
@@ -95,27 +110,12 @@ class PixViewer(tk.Tk):
     def load_jpg_file(self, file_path):
         try:
             self.image = Image.open(file_path).convert('L')
-            self.scale_factor = 1.0
+            self.close_reader()
+            self.reset_view()
             self.display_image()
         except Exception as e:
             self.show_error(f"Failed to load JPG file: {e}")
 
-    def restore_pix_file(self, lines):
-        cleaned_lines = [re.sub(r'[^0-9 ]', '', line) for line in lines]
-        cleaned_lines = [re.sub(r'(\d)(?=\d)', r'\1 ', line) for line in cleaned_lines]
-        max_length = max(len(re.findall(r'\d', line)) for line in cleaned_lines)
-
-        restored_lines = []
-        for line in cleaned_lines:
-            numbers = line.split()
-            if len(numbers) < max_length:
-                numbers.extend(['0'] * (max_length - len(numbers)))
-            elif len(numbers) > max_length:
-                numbers = numbers[:max_length]
-            restored_lines.append(' '.join(numbers) + "\n")
-
-        return restored_lines
-
     def convert_to_pix(self):
         if not self.current_file_path or not self.current_file_path.endswith('.jpg'):
             self.show_error("No valid JPG file loaded for conversion.")
@@ -144,20 +144,10 @@ class PixViewer(tk.Tk):
         if not os.path.exists(output_folder_path):
             os.makedirs(output_folder_path)
 
-        img = Image.open(input_image_path).convert('L')
-        width, height = img.size
-
         next_file_number = self.get_next_file_number(output_folder_path, "splash_", ".pix")
         output_file_path = os.path.join(output_folder_path, f"splash_{next_file_number}.pix")
 
-        with open(output_file_path, 'w') as output_file:
-            for y in range(height):
-                line = []
-                for x in range(width):
-                    pixel = img.getpixel((x, y))
-                    gray_value = pixel // 26
-                    line.append(str(gray_value))
-                output_file.write(" ".join(line) + "\n")
+        pixcodec.image_to_pix(input_image_path, output_file_path)
 
         self.show_info(f"Image successfully converted to {output_file_path}")
         return output_file_path
@@ -174,18 +164,18 @@ class PixViewer(tk.Tk):
         output_image_path = os.path.join(output_folder_path, f"converted_{next_file_number}.jpg")
 
         try:
-            img_data = self.load_pix_file_data(input_pix_path)
+            img_data, level_count = self.load_pix_file_data(input_pix_path)
         except ValueError:
-            with open(input_pix_path, 'r') as file:
-                lines = file.readlines()
-            restored_lines = self.restore_pix_file(lines)
+            if self.is_packed_file(input_pix_path):
+                raise
+            reader = pixrows.PixRowReader(input_pix_path)
             restored_file_path = os.path.join(os.path.dirname(input_pix_path), f"restored_{os.path.basename(input_pix_path)}")
-            with open(restored_file_path, 'w') as restored_file:
-                restored_file.writelines(restored_lines)
-            img_data = self.load_pix_file_data(restored_file_path)
+            reader.write_restored(restored_file_path)
+            reader.close()
+            img_data, level_count = self.load_pix_file_data(restored_file_path)
             self.show_info(f"Restored file saved as {restored_file_path}")
 
-        img = self.create_image_from_data(img_data)
+        img = self.create_image_from_data(img_data, level_count)
         img.save(output_image_path)
 
         self.show_info(f"Image successfully converted to {output_image_path}")
@@ -201,51 +191,131 @@ class PixViewer(tk.Tk):
                     max_number = number
         return max_number + 1
 
+    def is_packed_file(self, file_path):
+        with open(file_path, 'rb') as f:
+            return pixcodec.is_binary(f.read(len(pixcodec.MAGIC)))
+
     def load_pix_file_data(self, input_pix_path):
-        with open(input_pix_path, 'r') as f:
-            lines = f.readlines()
-            img_data = [[int(value) for value in line.strip().split()] for line in lines]
-        return img_data
-
-    def create_image_from_data(self, img_data):
-        height = len(img_data)
-        width = len(img_data[0])
-        img = Image.new('L', (width, height))
-        pixels = img.load()
-        for y in range(height):
-            for x in range(width):
-                gray_value = img_data[y][x] * 26
-                pixels[x, y] = gray_value
-        return img
-
-    def create_image_from_pix(self, lines):
-        img_data = [[int(value) for value in line.strip().split()] for line in lines]
-        return self.create_image_from_data(img_data)
+        # (levels, level count)
+        return pixcodec.read_pix_info(input_pix_path)
+
+    def create_image_from_data(self, img_data, level_count=pixcodec.LEVELS):
+        return pixcodec.pix_to_image(img_data, pixcodec.LUT_26, level_count)
+
+    def close_reader(self):
+        # the file stays open (and on Windows locked) while it is shown
+        if self.reader:
+            self.reader.close()
+            self.reader = None
 
     def display_image(self):
-        if self.image:
+        if self.reader:
+            self.pyramid = []
+            self.render_view()
+        elif self.image:
             mode = self.view_mode.get()
+            shown = self.image
             if mode == "fixed":
-                self.image = self.crop_image_if_needed(self.image)
-            self.tk_image = ImageTk.PhotoImage(self.image)
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_image)
-            self.canvas.config(scrollregion=self.canvas.bbox(tk.ALL))
-
-    def crop_image_if_needed(self, img):
-        img_data = list(img.getdata())
-        width, height = img.size
-        img_data = [img_data[i * width:(i + 1) * width] for i in range(height)]
-
-        def count_trailing_zeros(row):
-            return len(list(takewhile(lambda x: x == 0, reversed(row))))
+                shown = self.crop_image_if_needed(self.image)
+            self.pyramid = [shown]
+            self.render_view()
 
-        cropped_height = height
-        for y in range(height - 1, -1, -1):
-            if count_trailing_zeros(img_data[y]) > width * 0.2:
-                cropped_height = y
-                break
+    def reset_view(self):
+        self.scale_factor = 1.0
+        self.view_x = 0
+        self.view_y = 0
+
+    def pyramid_level(self, scale):
+        # the smallest reduction that is still at least as large as the shown image
+        level = 0
+        while scale * 2 ** (level + 1) <= 1 and min(self.pyramid[level].size) > 1:
+            level += 1
+            if level == len(self.pyramid):
+                self.pyramid.append(self.pyramid[-1].reduce(2))
+        return self.pyramid[level]
+
+    def render_view(self):
+        # Only the part of the image inside the canvas is scaled and drawn,
+        # into a single canvas item that is reused (the old PhotoImage is freed)
+        self.render_job = None
+        if self.reader:
+            # every step-th row and column of the file, zoomed out like the pyramid
+            step = 1
+            while self.scale_factor * step * 2 <= 1:
+                step *= 2
+            height = self.reader.height
+            if self.view_mode.get() == "fixed":
+                height = self.fixed_height(self.reader)
+            width = -(-self.reader.width // step)
+            height = -(-height // step)
+            scale_x = scale_y = self.scale_factor * step
+        elif self.image:
+            source = self.pyramid_level(self.scale_factor)
+            width, height = source.size
+            scale_x = self.scale_factor * self.pyramid[0].width / source.width
+            scale_y = self.scale_factor * self.pyramid[0].height / source.height
+        else:
+            return
+        left = max(0, int(-self.view_x / scale_x))
+        top = max(0, int(-self.view_y / scale_y))
+        right = min(width, math.ceil((self.canvas.winfo_width() - self.view_x) / scale_x))
+        bottom = min(height, math.ceil((self.canvas.winfo_height() - self.view_y) / scale_y))
+        if right <= left or bottom <= top:
+            self.canvas.delete("view")
+            self.tk_image = None
+            return
+        if self.reader:
+            levels = self.reader.rows(top * step, bottom * step, step)[:, left * step:right * step:step]
+            region = self.create_image_from_data(levels, self.reader.level_count)
+        else:
+            region = source.crop((left, top, right, bottom))
+        size = (max(1, round((right - left) * scale_x)), max(1, round((bottom - top) * scale_y)))
+        self.tk_image = ImageTk.PhotoImage(region.resize(size, Image.NEAREST))
+        x = self.view_x + left * scale_x
+        y = self.view_y + top * scale_y
+        if self.canvas.find_withtag("view"):
+            self.canvas.coords("view", x, y)
+            self.canvas.itemconfig("view", image=self.tk_image)
+        else:
+            self.canvas.create_image(x, y, anchor=tk.NW, image=self.tk_image, tags="view")
+
+    def schedule_render(self):
+        if self.render_job:
+            self.after_cancel(self.render_job)
+        self.render_job = self.after(RENDER_DELAY_MS, self.render_view)
 
-        return img.crop((0, 0, width, cropped_height))
+    def crop_image_if_needed(self, img):
+        # Cut the image above the lowest row that ends in more than 20% black
+        # pixels (a short, zero-padded row)
+        return img.crop((0, 0, img.width, self.fixed_height(img)))
+
+    def fixed_height(self, source):
+        # the crop height is kept for the image or reader
+        if self.crop_cache is None or self.crop_cache[0] is not source:
+            self.crop_cache = (source, self.crop_height(source))
+        return self.crop_cache[1]
+
+    def crop_height(self, source):
+        if not isinstance(source, pixrows.PixRowReader):
+            short_rows = self.short_rows(np.asarray(source))
+            return int(short_rows[-1]) if short_rows.size else source.height
+        # from the bottom up, a block of rows at a time (level 0 is black in
+        # every table); the lowest short row is usually near the end
+        for last in range(source.height, 0, -pixrows.GATHER_ROWS):
+            first = max(0, last - pixrows.GATHER_ROWS)
+            short_rows = self.short_rows(source.rows(first, last))
+            if short_rows.size:
+                return first + int(short_rows[-1])
+        return source.height
+
+    def short_rows(self, pixels):
+        height, width = pixels.shape
+        if not width:
+            return np.zeros(0, dtype=np.int64)
+        # trailing zeros per row: position of the first nonzero pixel from the right
+        lit = pixels[:, ::-1] != 0
+        trailing = np.where(lit.any(axis=1), lit.argmax(axis=1), width)
+        return np.flatnonzero(trailing > width * 0.2)
 
     def on_button_press(self, event):
         self.pan_start_x = event.x
@@ -254,7 +324,7 @@ class PixViewer(tk.Tk):
     def on_move_press(self, event):
         delta_x = event.x - self.pan_start_x
         delta_y = event.y - self.pan_start_y
-        self.canvas.move(tk.ALL, delta_x, delta_y)
+        self.pan_view(delta_x, delta_y)
         self.pan_start_x = event.x
         self.pan_start_y = event.y
 
@@ -265,10 +335,17 @@ class PixViewer(tk.Tk):
     def on_right_move_press(self, event):
         delta_x = event.x - self.pan_end_x
         delta_y = event.y - self.pan_end_y
-        self.canvas.move(tk.ALL, delta_x, delta_y)
+        self.pan_view(delta_x, delta_y)
         self.pan_end_x = event.x
         self.pan_end_y = event.y
 
+    def pan_view(self, delta_x, delta_y):
+        # move what is drawn right away, fill in the uncovered part later
+        self.view_x += delta_x
+        self.view_y += delta_y
+        self.canvas.move(tk.ALL, delta_x, delta_y)
+        self.schedule_render()
+
     def on_mouse_wheel(self, event):
         scale = 1.0
         if event.delta > 0:
@@ -276,17 +353,15 @@ class PixViewer(tk.Tk):
         elif event.delta < 0:
             scale = 0.9
 
+        # keep the point under the cursor in place
+        self.view_x = event.x - (event.x - self.view_x) * scale
+        self.view_y = event.y - (event.y - self.view_y) * scale
         self.scale_factor *= scale
         self.resize_image(event)
 
     def resize_image(self, event):
-        if self.image:
-            new_width = int(self.image.width * self.scale_factor)
-            new_height = int(self.image.height * self.scale_factor)
-            resized_image = self.image.resize((new_width, new_height), Image.NEAREST)
-            self.tk_image = ImageTk.PhotoImage(resized_image)
-            self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_image)
-            self.canvas.config(scrollregion=self.canvas.bbox(tk.ALL))
+        if self.image or self.reader:
+            self.schedule_render()
 
     def update_view_mode(self):
         self.display_image()
@@ -311,12 +386,13 @@ class PixViewer(tk.Tk):
         damage_percentage = DoubleVar(value=10)
         Entry(config_window, textvariable=damage_percentage).grid(row=0, column=1)
 
+        # a burst of Damage Distance bytes hits Damage Rows Percentage of the rows
         Label(config_window, text="Damage Distance:").grid(row=1, column=0)
         damage_distance = IntVar(value=5)
         Entry(config_window, textvariable=damage_distance).grid(row=1, column=1)
 
         Label(config_window, text="Damage Rows Percentage:").grid(row=2, column=0)
-        damage_rows_percentage = DoubleVar(value=10)
+        damage_rows_percentage = DoubleVar(value=0)
         Entry(config_window, textvariable=damage_rows_percentage).grid(row=2, column=1)
 
         shuffle_rows = IntVar(value=0)
@@ -326,8 +402,20 @@ class PixViewer(tk.Tk):
         shuffle_percentage = DoubleVar(value=10)
         Entry(config_window, textvariable=shuffle_percentage).grid(row=4, column=1)
 
+        Label(config_window, text="Bit Error Rate:").grid(row=5, column=0)
+        bit_error_rate = DoubleVar(value=0)
+        Entry(config_window, textvariable=bit_error_rate).grid(row=5, column=1)
+
+        Label(config_window, text="Dropped Newlines Percentage:").grid(row=6, column=0)
+        dropped_newlines_percentage = DoubleVar(value=0)
+        Entry(config_window, textvariable=dropped_newlines_percentage).grid(row=6, column=1)
+
+        Label(config_window, text="Seed (empty for random):").grid(row=7, column=0)
+        seed = StringVar(value="")
+        Entry(config_window, textvariable=seed).grid(row=7, column=1)
+
         log_frame = Frame(config_window)
-        log_frame.grid(row=5, column=0, columnspan=2, sticky="nsew")
+        log_frame.grid(row=8, column=0, columnspan=2, sticky="nsew")
         log_frame.rowconfigure(0, weight=1)
         log_frame.columnconfigure(0, weight=1)
 
@@ -338,10 +426,10 @@ class PixViewer(tk.Tk):
         log_text.config(yscrollcommand=log_scroll.set)
 
         progress = Progressbar(config_window, mode="determinate")
-        progress.grid(row=6, column=0, columnspan=2, sticky="ew")
+        progress.grid(row=9, column=0, columnspan=2, sticky="ew")
 
         cancel_button = Button(config_window, text="Cancel", command=config_window.destroy)
-        cancel_button.grid(row=7, column=0)
+        cancel_button.grid(row=10, column=0)
 
         corrupt_button = Button(config_window, text="Corrupt", command=lambda: self.start_corruption_thread(
             damage_percentage.get(),
@@ -349,83 +437,57 @@ class PixViewer(tk.Tk):
             damage_rows_percentage.get(),
             shuffle_rows.get(),
             shuffle_percentage.get(),
+            bit_error_rate.get(),
+            dropped_newlines_percentage.get(),
+            seed.get(),
             output_folder_path,
             config_window,
             log_text,
             progress))
-        corrupt_button.grid(row=7, column=1)
+        corrupt_button.grid(row=10, column=1)
 
-    def start_corruption_thread(self, damage_percentage, damage_distance, damage_rows_percentage, shuffle_rows, shuffle_percentage, output_folder_path, config_window, log_text, progress):
+    def start_corruption_thread(self, damage_percentage, damage_distance, damage_rows_percentage, shuffle_rows, shuffle_percentage, bit_error_rate, dropped_newlines_percentage, seed, output_folder_path, config_window, log_text, progress):
         corruption_thread = threading.Thread(target=self.corrupt_pix_file, args=(
-            damage_percentage, damage_distance, damage_rows_percentage, shuffle_rows, shuffle_percentage, output_folder_path, config_window, log_text, progress))
+            damage_percentage, damage_distance, damage_rows_percentage, shuffle_rows, shuffle_percentage, bit_error_rate, dropped_newlines_percentage, seed, output_folder_path, config_window, log_text, progress))
         corruption_thread.start()
 
-    def corrupt_pix_file(self, damage_percentage, damage_distance, damage_rows_percentage, shuffle_rows, shuffle_percentage, output_folder_path, config_window, log_text, progress):
-        with open(self.current_file_path, 'r') as file:
-            lines = file.readlines()
-
-        corrupted_lines = self.corrupt_lines(lines, damage_percentage, damage_distance, damage_rows_percentage, shuffle_rows, shuffle_percentage, log_text, progress)
-        output_file_path = os.path.join(output_folder_path, os.path.basename(self.current_file_path))
-
-        with open(output_file_path, 'w') as file:
-            file.writelines(corrupted_lines)
+    def corrupt_pix_file(self, damage_percentage, damage_distance, damage_rows_percentage, shuffle_rows, shuffle_percentage, bit_error_rate, dropped_newlines_percentage, seed, output_folder_path, config_window, log_text, progress):
+        with open(self.current_file_path, 'rb') as file:
+            data = file.read()
 
-        self.show_info(f"File successfully corrupted and saved to {output_file_path}")
-        config_window.destroy()
-
-    def corrupt_lines(self, lines, damage_percentage, damage_distance, damage_rows_percentage, shuffle_rows, shuffle_percentage, log_text, progress):
-        total_chars = sum(len(line) for line in lines)
-        num_damages = int(total_chars * (damage_percentage / 100))
-        damage_positions = random.sample(range(total_chars), num_damages)
+        # The damage itself is done by pixcorrupt.py; the seed is logged so the same damage can be made again
+        seed = int(seed) if seed.strip() else random.randrange(2 ** 32)
+        progress["maximum"] = 1
+        corrupted, counts = self.corrupt_data(data, damage_percentage, damage_distance, damage_rows_percentage,
+                                              shuffle_rows, shuffle_percentage, bit_error_rate,
+                                              dropped_newlines_percentage, seed)
+        progress["value"] = 1
 
         log_text.config(state="normal")
-        log_text.insert("end", f"Total characters: {total_chars}\n")
-        log_text.insert("end", f"Total damages: {num_damages}\n")
+        log_text.insert("end", f"Total characters: {len(data)}\n")
+        log_text.insert("end", f"Seed: {seed}\n")
+        for kind, count in counts.items():
+            log_text.insert("end", f"{kind.replace('_', ' ').capitalize()}: {count}\n")
         log_text.config(state="disabled")
 
-        progress["maximum"] = total_chars
-
-        corrupted_lines = []
-        current_pos = 0
-
-        for line in lines:
-            new_line = []
-            for char in line:
-                if current_pos in damage_positions:
-                    if random.random() < 0.5:
-                        new_char = random.choice(['@', '#', '$', '%', '&'])
-                    else:
-                        new_char = char
-                    new_line.append(new_char)
-                    damage_positions = [pos - 1 for pos in damage_positions]
-                else:
-                    new_line.append(char)
-                current_pos += 1
-                progress["value"] = current_pos
-                progress.update()
-            corrupted_lines.append(''.join(new_line))
-
-        log_text.config(state="normal")
-        log_text.insert("end", "Character corruption completed.\n")
-        log_text.config(state="disabled")
-
-        if shuffle_rows:
-            num_rows = int(len(corrupted_lines) * (shuffle_percentage / 100))
-            rows_to_shuffle = random.sample(range(len(corrupted_lines)), num_rows)
-            log_text.config(state="normal")
-            log_text.insert("end", f"Shuffling {num_rows} rows.\n")
-            log_text.config(state="disabled")
-
-            for i in range(len(rows_to_shuffle) // 2):
-                idx1 = rows_to_shuffle[2 * i]
-                idx2 = rows_to_shuffle[2 * i + 1]
-                corrupted_lines[idx1], corrupted_lines[idx2] = corrupted_lines[idx2], corrupted_lines[idx1]
+        output_file_path = os.path.join(output_folder_path, os.path.basename(self.current_file_path))
+        with open(output_file_path, 'wb') as file:
+            file.write(corrupted)
 
-        log_text.config(state="normal")
-        log_text.insert("end", "Row shuffling completed.\n")
-        log_text.config(state="disabled")
+        self.show_info(f"File successfully corrupted and saved to {output_file_path}")
+        config_window.destroy()
 
-        return corrupted_lines
+    def corrupt_data(self, data, damage_percentage, damage_distance, damage_rows_percentage, shuffle_rows, shuffle_percentage, bit_error_rate, dropped_newlines_percentage, seed):
+        # the dialog fields as pixcorrupt rates; bursts are spread so that about
+        # damage_rows_percentage of the rows get one
+        rows = max(data.count(b'\n'), 1)
+        return pixcorrupt.corrupt(data, seed,
+                                  symbols=damage_percentage / 100,
+                                  bit_errors=bit_error_rate,
+                                  bursts=rows * damage_rows_percentage / 100 / max(len(data), 1),
+                                  burst_length=max(damage_distance, 1),
+                                  dropped_newlines=dropped_newlines_percentage / 100,
+                                  row_swaps=shuffle_percentage / 100 if shuffle_rows else 0)
 
     def show_error(self, message):
         messagebox.showerror("Error", message)
@@ -3,6 +3,47 @@
 import serial
 import sys
 import os
+import time
+import pixcheck
+import pixcodec
+import pixentropy
+import pixprogressive
+
+def receive_progressive(ser, buffer, save_path, preview_interval=1.0):
+    # Every packet improves the image; preview.png is rewritten as it goes.
+    # Ctrl+C stops the transfer and keeps what has arrived.
+    image = pixprogressive.ProgressiveImage()
+    preview_path = os.path.join(save_path, "preview.png")
+    last_preview = 0
+    data = buffer
+    try:
+        while not image.done:
+            if image.feed(data) and time.monotonic() - last_preview >= preview_interval:
+                pixcodec.pix_to_image(image.levels, pixcodec.LUT_26, image.level_count).save(preview_path)
+                last_preview = time.monotonic()
+                print("Preview: {:.0%} final after {} bytes".format(image.coverage(), image.received))
+            data = ser.read(ser.in_waiting or 1)
+    except KeyboardInterrupt:
+        print("Transfer stopped, keeping the partial image.")
+    if image.levels is not None:
+        pixcodec.pix_to_image(image.levels, pixcodec.LUT_26, image.level_count).save(preview_path)
+    return image.levels, image.level_count
+
+def receive_checked(ser, buffer):
+    # Blocks of rows with a CRC32 each; blocks that fail it are left as zero
+    # rows and listed, so only they are asked for again (command 8).
+    # Ctrl+C stops the transfer and keeps what has arrived.
+    frame = pixcheck.CheckedFrame()
+    data = buffer
+    try:
+        while not frame.ended:
+            frame.feed(data)
+            if frame.good is not None and frame.good.all():
+                break
+            data = ser.read(ser.in_waiting or 1)
+    except KeyboardInterrupt:
+        print("Transfer stopped, keeping the rows received so far.")
+    return frame
 
 def receive_file(save_path, port, baudrate):
     try:
@@ -12,7 +53,10 @@ def receive_file(save_path, port, baudrate):
             start_marker = b'++'
             end_marker = b'++'
             
-            # Read until start marker is found
+            # Read until start marker (text .pix) or packed header is found
+            packed = False
+            progressive = False
+            checked = False
             while True:
                 byte = ser.read(1)
                 buffer += byte
@@ -20,15 +64,45 @@ def receive_file(save_path, port, baudrate):
                     buffer = buffer.split(start_marker, 1)[1]
                     print("Start marker detected.")
                     break
-            
-            # Read until end marker is found
-            while True:
-                byte = ser.read(1)
-                buffer += byte
-                if end_marker in buffer:
-                    buffer = buffer.split(end_marker, 1)[0]
-                    print("End marker detected.")
+                if pixcodec.MAGIC in buffer or pixcodec.CODED_MAGIC in buffer:
+                    magic = pixcodec.MAGIC if pixcodec.MAGIC in buffer else pixcodec.CODED_MAGIC
+                    buffer = buffer[buffer.index(magic):]
+                    packed = True
+                    print("Packed PIX header detected.")
+                    break
+                if pixprogressive.MAGIC in buffer:
+                    buffer = buffer[buffer.index(pixprogressive.MAGIC):]
+                    progressive = True
+                    print("Progressive PIX transfer detected.")
                     break
+                if pixcheck.MAGIC in buffer:
+                    buffer = buffer[buffer.index(pixcheck.MAGIC):]
+                    checked = True
+                    print("Row-checked PIX transfer detected.")
+                    break
+
+            if progressive:
+                levels, level_count = receive_progressive(ser, buffer, save_path)
+            elif checked:
+                frame = receive_checked(ser, buffer)
+            elif packed:
+                # The header tells the size, read exactly that many bytes
+                if magic == pixcodec.MAGIC:
+                    buffer += ser.read(pixcodec.HEADER.size - len(buffer))
+                    size = pixcodec.read_header(buffer)[4]
+                else:
+                    buffer += ser.read(pixentropy.HEADER.size - len(buffer))
+                    size = pixentropy.read_header(buffer)[5]
+                buffer += ser.read(size - len(buffer))
+            else:
+                # Read until end marker is found
+                while True:
+                    byte = ser.read(1)
+                    buffer += byte
+                    if end_marker in buffer:
+                        buffer = buffer.split(end_marker, 1)[0]
+                        print("End marker detected.")
+                        break
 
             print("Data received!")
 
@@ -37,10 +111,35 @@ def receive_file(save_path, port, baudrate):
         new_file_name = "splash_{}.pix".format(file_count + 1)
         new_file_path = os.path.join(save_path, new_file_name)
 
-        # Save the data to a file with explicit UTF-8 encoding
-        with open(new_file_path, 'w', encoding='utf-8') as f:
-            f.write(buffer.decode('utf-8'))
+        if progressive:
+            if levels is None:
+                print("Nothing usable was received.")
+                return
+            # Complete or not, the image is saved in the packed format
+            pixcodec.write_packed(new_file_path, levels, level_count)
+            print("File saved as {}.".format(new_file_name))
+        elif checked:
+            if frame.levels is None:
+                print("Nothing usable was received.")
+                return
+            # Saved packed; the rows still missing go to splash_N.bad for rowcheck.py
+            pixcodec.write_packed(new_file_path, frame.levels, frame.level_count)
             print("File saved as {}.".format(new_file_name))
+            bad_rows = pixcheck.format_rows(frame.bad_rows())
+            if bad_rows:
+                with open(new_file_path[:-len(".pix")] + ".bad", 'w') as f:
+                    f.write(bad_rows + "\n")
+                print("{} rows damaged, ask for them again with: ++8+{}:str++".format(len(frame.bad_rows()), bad_rows))
+        elif packed:
+            # Packed data is saved as is, readers detect it by the magic
+            with open(new_file_path, 'wb') as f:
+                f.write(buffer)
+                print("File saved as {}.".format(new_file_name))
+        else:
+            # Save the data to a file with explicit UTF-8 encoding
+            with open(new_file_path, 'w', encoding='utf-8') as f:
+                f.write(buffer.decode('utf-8'))
+                print("File saved as {}.".format(new_file_name))
 
     except Exception as e:
         print("An error occurred: {}".format(e))
@@ -0,0 +1,124 @@
+import argparse
+import base64
+import binascii
+import re
+import time
+import zlib
+import serial
+from binframe import encode_command
+
+# Сборка длинных ответов борта (см. satcont_main/command_handler/response_chunks.py):
+#   Chunked<Kind>[seq]: <count> <encoding> <crc32> <length>
+#   Chunk[seq] <index>/<count> <crc16>: <base64>
+RESEND_COMMAND = 101
+HEADER_INDEX = -1  # index that asks for the header line again
+
+HEADER = re.compile(r'Chunked(\w+)\[(\d+)\]: (\d+) ([zb]) ([0-9a-f]{8}) (\d+)$')
+CHUNK = re.compile(r'Chunk\[(\d+)\] (\d+)/(\d+) ([0-9a-f]{4}): ([A-Za-z0-9+/=]*)$')
+
+
+def resend_command(seq, indices, binary=False):
+    if binary:
+        return encode_command(RESEND_COMMAND, [seq] + list(indices))
+    args = ''.join(f"+{index}:int" for index in indices)
+    return f"++{RESEND_COMMAND}+{seq}:int{args}++".encode()
+
+
+class ResponseAssembler:
+    # feed() принимает строки порта и возвращает (kind, seq, text) для
+    # собранных ответов; битые и потерянные куски видны через missing().
+    # Куски без заголовка копятся, пока заголовок не запрошен заново (индекс -1)
+    def __init__(self):
+        self.pending = {}
+
+    def feed(self, line):
+        line = line.strip()
+        match = HEADER.match(line)
+        if match:
+            kind, seq, count, encoding, crc, length = match.groups()
+            entry = self.pending.get(int(seq))
+            chunks = entry['chunks'] if entry is not None and entry['count'] == int(count) else {}
+            self.pending[int(seq)] = {'kind': kind, 'count': int(count), 'encoding': encoding,
+                                      'crc': int(crc, 16), 'length': int(length), 'chunks': chunks,
+                                      'updated': time.monotonic()}
+            if len(chunks) == int(count):
+                return self.complete(int(seq))
+            return None
+        match = CHUNK.match(line)
+        if match:
+            seq, index, count, crc, data = match.groups()
+            entry = self.pending.get(int(seq))
+            if entry is None:
+                # заголовок потерян: число кусков известно из самого куска
+                entry = self.pending[int(seq)] = {'kind': None, 'count': int(count), 'chunks': {},
+                                                  'updated': time.monotonic()}
+            if int(count) != entry['count']:
+                return None
+            if binascii.crc_hqx(data.encode('ascii'), 0xffff) != int(crc, 16):
+                return None  # кусок испорчен, остаётся в missing()
+            entry['chunks'][int(index)] = data
+            entry['updated'] = time.monotonic()
+            if len(entry['chunks']) == entry['count'] and entry['kind'] is not None:
+                return self.complete(int(seq))
+            return None
+        if line.startswith(('Response', 'Error')):
+            kind, _, text = line.partition(': ')
+            match = re.match(r'(\w+)\[(\d+)\]$', kind)
+            if match:
+                return match.group(1), int(match.group(2)), text
+            return kind, None, text
+        return None
+
+    def complete(self, seq):
+        entry = self.pending.pop(seq)
+        payload = base64.b64decode(''.join(entry['chunks'][i] for i in range(entry['count'])))
+        if entry['encoding'] == 'z':
+            payload = zlib.decompress(payload)
+        if len(payload) != entry['length'] or zlib.crc32(payload) != entry['crc']:
+            # куски прошли CRC, но целое не сошлось - запрашиваем всё заново
+            entry['chunks'] = {}
+            self.pending[seq] = entry
+            return None
+        return entry['kind'], seq, payload.decode('utf-8', errors='replace')
+
+    def missing(self, seq):
+        entry = self.pending.get(seq)
+        if entry is None:
+            return []
+        header = [HEADER_INDEX] if entry['kind'] is None else []
+        return header + [i for i in range(entry['count']) if i not in entry['chunks']]
+
+    def stalled(self, quiet):
+        # ответы, куски которых не приходили дольше quiet секунд
+        now = time.monotonic()
+        return [seq for seq, entry in self.pending.items() if now - entry['updated'] >= quiet]
+
+
+def listen(port, baudrate, quiet, binary):
+    assembler = ResponseAssembler()
+    with serial.Serial(port, baudrate, timeout=0.5) as ser:
+        print("Waiting for answers...")
+        while True:
+            line = ser.readline().decode('utf-8', errors='replace')
+            if line:
+                result = assembler.feed(line)
+                if result is not None:
+                    kind, seq, text = result
+                    print(f"{kind}[{seq}]: {text}")
+                elif not line.startswith('Chunk'):
+                    print(line.rstrip())
+            for seq in assembler.stalled(quiet):
+                indices = assembler.missing(seq)
+                print(f"Re-requesting chunks {indices} of [{seq}]")
+                ser.write(resend_command(seq, indices, binary))
+                assembler.pending[seq]['updated'] = time.monotonic()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print device answers, reassembling chunked ones")
+    parser.add_argument('port', type=str, help="Serial port, e.g. COM3 or /dev/ttyUSB0")
+    parser.add_argument('baudrate', type=int, help="Baudrate")
+    parser.add_argument('--quiet', type=float, default=3.0, help="Seconds without chunks before re-requesting")
+    parser.add_argument('--binary', action='store_true', help="Send re-requests as binary frames")
+    args = parser.parse_args()
+    listen(args.port, args.baudrate, args.quiet, args.binary)
@@ -0,0 +1,114 @@
+#python3 rowcheck.py splash_3.pix --answer answers.txt
+#python3 rowcheck.py splash_3.pix --port /dev/ttyUSB0 --baudrate 115200
+
+import argparse
+import base64
+import os
+import re
+import sys
+import time
+import pixcheck
+import pixcodec
+
+# Puts rows sent again by the device into a frame received with
+# pictrans.py --checked. reciever.py saves the frame as splash_N.pix and the
+# rows that failed their CRC as splash_N.bad; command 8 answers
+# "Response[seq]: PIXC <base64 row-checked stream>" with just those rows.
+RESEND_ROWS_COMMAND = 8
+ANSWER = re.compile(r'PIXC ([A-Za-z0-9+/=]+)')
+
+
+def bad_path(pix_path):
+    return os.path.splitext(pix_path)[0] + ".bad"
+
+
+def read_bad_rows(pix_path):
+    if not os.path.exists(bad_path(pix_path)):
+        return []
+    with open(bad_path(pix_path), 'r') as f:
+        return pixcheck.parse_rows(f.read())
+
+
+def resend_command(rows):
+    return "++{}+{}:str++".format(RESEND_ROWS_COMMAND, pixcheck.format_rows(rows)).encode()
+
+
+def streams_in(text):
+    # every command 8 answer in the text, decoded
+    return [base64.b64decode(match.group(1)) for match in ANSWER.finditer(text)]
+
+
+def apply_answers(pix_path, streams):
+    # returns the rows that are still missing
+    levels, level_count = pixcodec.read_pix_info(pix_path)
+    levels = levels.copy()
+    bad_rows = set(read_bad_rows(pix_path))
+    frame = pixcheck.CheckedFrame()
+    for stream in streams:
+        frame.feed(stream)
+    if frame.levels is not None:
+        if frame.levels.shape != levels.shape or frame.level_count != level_count:
+            raise ValueError("The answer is for another frame ({}x{})".format(*frame.geometry[:2]))
+        repaired = [row for row in bad_rows if frame.good[row]]
+        levels[repaired] = frame.levels[repaired]
+        bad_rows.difference_update(repaired)
+        print("{} rows repaired.".format(len(repaired)))
+    pixcodec.write_packed(pix_path, levels, level_count)
+    if bad_rows:
+        with open(bad_path(pix_path), 'w') as f:
+            f.write(pixcheck.format_rows(bad_rows) + "\n")
+    elif os.path.exists(bad_path(pix_path)):
+        os.remove(bad_path(pix_path))
+    return sorted(bad_rows)
+
+
+def ask_device(port, baudrate, rows, wait):
+    # sends command 8 and waits for its answer (chunked answers are put
+    # together and re-requested by responses.py)
+    import serial
+    from responses import ResponseAssembler, resend_command as resend_chunks
+    assembler = ResponseAssembler()
+    with serial.Serial(port, baudrate, timeout=0.5) as ser:
+        ser.write(resend_command(rows))
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            line = ser.readline().decode('utf-8', errors='replace')
+            result = assembler.feed(line) if line else None
+            if result is not None and ANSWER.search(result[2]):
+                return result[2]
+            if result is not None and result[0] == 'Error':
+                print("Device: {}".format(result[2]))
+                return ''
+            for seq in assembler.stalled(3.0):
+                ser.write(resend_chunks(seq, assembler.missing(seq)))
+                assembler.pending[seq]['updated'] = time.monotonic()
+    print("No answer in {} s.".format(wait))
+    return ''
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repair the damaged rows of a row-checked frame")
+    parser.add_argument('pix', type=str, help="Frame saved by reciever.py (splash_N.pix, next to splash_N.bad)")
+    parser.add_argument('--answer', type=str, help="Text with the command 8 answer, e.g. saved responses.py output")
+    parser.add_argument('--port', type=str, help="Ask the device directly on this port")
+    parser.add_argument('--baudrate', type=int, default=115200)
+    parser.add_argument('--wait', type=float, default=60.0, help="Seconds to wait for the answer")
+    args = parser.parse_args()
+
+    rows = read_bad_rows(args.pix)
+    if not rows:
+        print("No damaged rows listed for {}.".format(args.pix))
+        sys.exit(0)
+    if args.answer:
+        with open(args.answer, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    elif args.port:
+        text = ask_device(args.port, args.baudrate, rows, args.wait)
+    else:
+        print("{} rows damaged, send: {}".format(len(rows), resend_command(rows).decode()))
+        sys.exit(0)
+    left = apply_answers(args.pix, streams_in(text))
+    if left:
+        print("{} rows still damaged, send: {}".format(len(left), resend_command(left).decode()))
+    else:
+        print("Frame complete.")
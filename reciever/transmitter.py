@@ -2,8 +2,12 @@ import serial
 import time
 import os
 import sys
+import rsfec
 
-def send_file(port, baudrate, filepath):
+def send_file(port, baudrate, filepath, parity=0):
+    packet_size = 240  # Размер пакета данных (LoRa E32 имеет ограничение на пакет данных)
+    if not 0 <= parity < packet_size - 1:
+        raise ValueError(f"{parity} parity bytes leave no room for data in a {packet_size}-byte packet")
     ser = serial.Serial(port, baudrate, timeout=1)
     ser.flush()
 
@@ -12,35 +16,51 @@ def send_file(port, baudrate, filepath):
         data = file.read()
     
     file_size = len(data)
-    packet_size = 240  # Размер пакета данных (LoRa E32 имеет ограничение на пакет данных)
-    num_packets = (file_size + packet_size - 1) // packet_size
+    # С FEC в пакет входят и байты чётности Рида-Соломона (rsfec.py):
+    # приёмник сам исправляет до parity // 2 байт и не просит повтора.
+    # Первый защищённый байт - номер пакета (по модулю 256): пакет, повторённый
+    # из-за потерянного ACK, приёмник подтверждает снова и отбрасывает.
+    # Все пакеты полные, последний дополнен нулями.
+    data_size = packet_size - parity - 1 if parity else packet_size
+    num_packets = (file_size + data_size - 1) // data_size
     
-    ser.write(f"SIZE:{file_size}\n".encode())
+    ser.write((f"SIZE:{file_size} FEC:{parity}\n" if parity else f"SIZE:{file_size}\n").encode())
     time.sleep(1)
     
+    resent = 0
+    corrected = 0
     for i in range(num_packets):
-        start = i * packet_size
-        end = start + packet_size
-        packet = data[start:end]
+        start = i * data_size
+        end = start + data_size
+        if parity:
+            chunk = bytes([i & 0xff]) + data[start:end].ljust(data_size, b'\0')
+            packet = rsfec.encode(chunk, parity)
+        else:
+            packet = data[start:end]
         ser.write(packet)
         time.sleep(0.5)  # Задержка для обеспечения надежной передачи
 
-        # Ожидание подтверждения
-        ack = ser.readline().decode().strip()
-        while ack != 'ACK':
+        # Ожидание подтверждения ("ACK" или "ACK <исправлено байт>")
+        ack = ser.readline().decode(errors='replace').strip()
+        while not ack.startswith('ACK'):
             ser.write(packet)
+            resent += 1
             time.sleep(0.5)
-            ack = ser.readline().decode().strip()
+            ack = ser.readline().decode(errors='replace').strip()
+        if ack[3:].strip().isdigit():
+            corrected += int(ack[3:])
     
+    print(f"{num_packets} packets sent, {resent} resent, {corrected} bytes corrected by FEC.")
     ser.close()
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print(f"Usage: {sys.argv[0]} <port> <baudrate> <filepath>")
+    if len(sys.argv) not in (4, 5):
+        print(f"Usage: {sys.argv[0]} <port> <baudrate> <filepath> [<parity bytes per packet, e.g. {rsfec.PARITY}>]")
         sys.exit(1)
 
     port = sys.argv[1]
     baudrate = int(sys.argv[2])
     filepath = sys.argv[3]
+    parity = int(sys.argv[4]) if len(sys.argv) == 5 else 0
 
-    send_file(port, baudrate, filepath)
+    send_file(port, baudrate, filepath, parity)
@@ -2,7 +2,7 @@
 
 import sys
 import os
-from PIL import Image
+import pixcodec
 
 def main(input_pix_path, output_folder_path):
     # Check if the input file exists
@@ -21,8 +21,8 @@ def main(input_pix_path, output_folder_path):
     output_image_path = os.path.join(output_folder_path, f"converted_{next_file_number}.jpg")
 
     # Load pix file and convert to grayscale image
-    img_data = load_pix_file(input_pix_path)
-    img = create_image_from_data(img_data)
+    img_data, level_count = load_pix_file(input_pix_path)
+    img = create_image_from_data(img_data, level_count)
 
     # Save the image as jpg
     img.save(output_image_path)
@@ -42,20 +42,12 @@ def get_next_file_number(folder_path):
     return max_number + 1
 
 def load_pix_file(input_pix_path):
-    with open(input_pix_path, 'r') as f:
-        lines = f.readlines()
-        img_data = [[int(value) for value in line.strip().split()] for line in lines]
-    return img_data
+    # (height, width) uint8 array of 0-9 values and the level count (10 unless the header says otherwise)
+    return pixcodec.read_pix_info(input_pix_path)
 
-def create_image_from_data(img_data):
-    height = len(img_data)
-    width = len(img_data[0])
-    img = Image.new('L', (width, height))
-    pixels = img.load()
-    for y in range(height):
-        for x in range(width):
-            pixels[x, y] = int(img_data[y][x] * 25.5)  # Convert back from 0-9 range to 0-255 range
-    return img
+def create_image_from_data(img_data, level_count=pixcodec.LEVELS):
+    # Convert back from 0-9 range to 0-255 range with a lookup table
+    return pixcodec.pix_to_image(img_data, pixcodec.LUT_255, level_count)
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
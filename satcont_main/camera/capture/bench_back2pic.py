@@ -0,0 +1,52 @@
+#python3 bench_back2pic.py --repeat 3
+
+import argparse
+import os
+import tempfile
+import numpy as np
+from PIL import Image
+import pixcodec
+from bench_pointillism import SIZES, timed
+
+
+def legacy_decode(input_pix_path):
+    # the previous load_pix_file + create_image_from_data from back2pic.py
+    with open(input_pix_path, 'r') as f:
+        lines = f.readlines()
+        img_data = [[int(value) for value in line.strip().split()] for line in lines]
+    height = len(img_data)
+    width = len(img_data[0])
+    img = Image.new('L', (width, height))
+    pixels = img.load()
+    for y in range(height):
+        for x in range(width):
+            pixels[x, y] = int(img_data[y][x] * 25.5)
+    return img
+
+
+def vector_decode(input_pix_path):
+    return pixcodec.pix_to_image(pixcodec.read_pix(input_pix_path), pixcodec.LUT_255)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PIX -> image decode time, Python lists vs NumPy")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per size, the best one is reported")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    for width, height in SIZES:
+        pix_path = os.path.join(folder, f"splash_{width}x{height}.pix")
+        crlf_path = os.path.join(folder, f"crlf_{width}x{height}.pix")
+        levels = rng.integers(0, 10, (height, width), dtype=np.uint8)
+        pixcodec.write_pix(pix_path, levels)
+        with open(crlf_path, 'wb') as f:
+            f.write(pixcodec.format_pix(levels).replace(b'\n', b'\r\n'))
+
+        legacy = timed(lambda: legacy_decode(pix_path), args.repeat)
+        vector = timed(lambda: vector_decode(pix_path), args.repeat)
+        irregular = timed(lambda: vector_decode(crlf_path), args.repeat)
+        same = legacy_decode(pix_path).tobytes() == vector_decode(pix_path).tobytes() == vector_decode(crlf_path).tobytes()
+
+        print(f"{width}x{height:<5} legacy {legacy * 1000:8.1f} ms   numpy {vector * 1000:6.1f} ms "
+              f"(CRLF rows {irregular * 1000:6.1f} ms)   x{legacy / vector:6.1f}   identical image: {same}")
@@ -0,0 +1,108 @@
+#python3 bench_capture_pix.py --camera 4 --runs 5
+#python3 bench_capture_pix.py --synthetic --runs 5
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import capture
+import pointillism
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class FakeCamera:
+    # stands in for cv2.VideoCapture when no camera is attached
+    def __init__(self, width, height):
+        rng = np.random.default_rng(0)
+        x = np.linspace(0, 255, width)
+        y = np.linspace(0, 255, height)[:, None]
+        gray = np.clip((x + y) / 2 + rng.normal(0, 12, (height, width)), 0, 255).astype(np.uint8)
+        self.frame = np.dstack((gray, gray, gray))
+
+    def grab(self):
+        return True
+
+    def get(self, prop):
+        return 0
+
+    def read(self):
+        return True, self.frame.copy()
+
+    def release(self):
+        pass
+
+
+def two_scripts(folder, width, height, camera_index):
+    # today's path: capture.py writes a JPEG, pointillism.py reads it back,
+    # each in its own interpreter
+    result = subprocess.run([sys.executable, os.path.join(HERE, 'capture.py'), folder, str(width), str(height),
+                             str(camera_index), 'black', '10'], capture_output=True, text=True, check=True)
+    jpeg_path = result.stdout.strip().splitlines()[-1]
+    subprocess.run([sys.executable, os.path.join(HERE, 'pointillism.py'), jpeg_path, folder],
+                   capture_output=True, text=True, check=True)
+
+
+def two_steps_in_process(folder, resolution, camera_index, cameras):
+    # the same JPEG round-trip inside one interpreter (what the resident
+    # imaging worker did before capture_pix)
+    jpeg_path = capture.capture_image(folder, resolution, camera_index, 'black', 10, cameras)
+    pointillism.main(jpeg_path, folder)
+
+
+def timed(function, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times), sum(times) / len(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end capture -> PIX time")
+    parser.add_argument('--camera', type=int, default=0, help="Camera index")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--synthetic', action='store_true', help="Use a generated frame instead of a camera")
+    args = parser.parse_args()
+
+    resolution = (args.width, args.height)
+    folder = tempfile.mkdtemp()
+    cameras = {}
+    if args.synthetic:
+        cameras[args.camera] = (FakeCamera(args.width, args.height), resolution)
+
+    quiet = open(os.devnull, 'w')
+    stdout = sys.stdout
+    results = []
+    if not args.synthetic:
+        results.append(("two scripts (capture.py + pointillism.py)",
+                        timed(lambda: two_scripts(folder, args.width, args.height, args.camera), args.runs)))
+    sys.stdout = quiet
+    try:
+        two_steps_in_process(folder, resolution, args.camera, cameras)  # opens the camera once
+        results.append(("JPEG round-trip, one process",
+                        timed(lambda: two_steps_in_process(folder, resolution, args.camera, cameras), args.runs)))
+        results.append(("capture_pix",
+                        timed(lambda: capture.capture_pix(folder, resolution, args.camera, cameras=cameras), args.runs)))
+        results.append(("capture_pix, JPEG kept",
+                        timed(lambda: capture.capture_pix(folder, resolution, args.camera, True, cameras=cameras), args.runs)))
+        results.append(("capture_pix, packed",
+                        timed(lambda: capture.capture_pix(folder, resolution, args.camera, packed=True, cameras=cameras), args.runs)))
+        for level_count, dither in ((4, 'ordered'), (4, 'diffusion'), (2, 'ordered')):
+            results.append((f"capture_pix, {level_count} levels, {dither}",
+                            timed(lambda: capture.capture_pix(folder, resolution, args.camera, level_count=level_count,
+                                                              dither=dither, cameras=cameras), args.runs)))
+    finally:
+        sys.stdout = stdout
+        for cap, _ in cameras.values():
+            cap.release()
+
+    print(f"{args.width}x{args.height}, {'synthetic frame' if args.synthetic else 'camera ' + str(args.camera)}, {args.runs} runs")
+    for name, (best, mean) in results:
+        print(f"{name:44} best {best * 1000:8.1f} ms   mean {mean * 1000:8.1f} ms")
@@ -0,0 +1,86 @@
+#python3 bench_pixcheck.py --width 1280 --height 720
+#python3 bench_pixcheck.py --ber 1e-5 1e-4 --block-rows 4
+
+import argparse
+import time
+import numpy as np
+import pixcheck
+import pixcodec
+
+MAX_ROUNDS = 20  # give up after this many transfers of a frame
+
+
+def damaged(data, ber, rng):
+    # data with each bit flipped with probability ber
+    data = np.frombuffer(data, dtype=np.uint8).copy()
+    flips = rng.binomial(data.size * 8, ber)
+    positions = rng.integers(0, data.size * 8, flips)
+    np.bitwise_xor.at(data, positions // 8, (1 << (positions % 8)).astype(np.uint8))
+    return data.tobytes()
+
+
+def whole_frame(levels, level_count, ber, rng):
+    # packed frame with one checksum: sent again whole until it arrives clean;
+    # returns (bytes sent, transfers, complete)
+    data = pixcodec.pack_pix(levels, level_count)
+    sent = 0
+    for rounds in range(1, MAX_ROUNDS + 1):
+        sent += len(data)
+        if damaged(data, ber, rng) == data:
+            return sent, rounds, True
+    return sent, MAX_ROUNDS, False
+
+
+def row_checked(levels, level_count, block_rows, ber, rng):
+    # row-checked stream, then only the rows that failed their CRC
+    frame = pixcheck.CheckedFrame()
+    rows = None
+    sent = 0
+    for rounds in range(1, MAX_ROUNDS + 1):
+        data = pixcheck.encode_stream(levels, level_count, block_rows, rows)
+        sent += len(data)
+        frame.feed(damaged(data, ber, rng))
+        rows = frame.bad_rows() if frame.geometry is not None else None
+        if rows == []:
+            return sent, rounds, (frame.levels == levels).all()
+    return sent, MAX_ROUNDS, False
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bytes on air to get one frame through a noisy link")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--levels', type=int, default=pixcodec.LEVELS, help="Gray levels, 2-16")
+    parser.add_argument('--block-rows', type=int, default=pixcheck.BLOCK_ROWS, help="Rows per checksum")
+    parser.add_argument('--ber', type=float, nargs='+', default=[1e-6, 1e-5, 1e-4, 1e-3], help="Bit error rates")
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    levels = np.random.default_rng(0).integers(0, args.levels, (args.height, args.width), dtype=np.uint8)
+    packed_size = len(pixcodec.pack_pix(levels, args.levels))
+    stream = pixcheck.encode_stream(levels, args.levels, args.block_rows)
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        pixcheck.encode_stream(levels, args.levels, args.block_rows)
+    encode_ms = (time.perf_counter() - start) / args.runs * 1000
+    start = time.perf_counter()
+    for _ in range(args.runs):
+        pixcheck.CheckedFrame().feed(stream)
+    decode_ms = (time.perf_counter() - start) / args.runs * 1000
+
+    print(f"{args.width}x{args.height}, {args.levels} levels, {args.block_rows} rows per checksum")
+    print(f"packed {packed_size} bytes, row-checked {len(stream)} bytes "
+          f"({len(stream) / packed_size - 1:+.1%} for the checksums)")
+    print(f"encode {encode_ms:.1f} ms, check and decode {decode_ms:.1f} ms")
+    print(f"{'BER':>8} {'whole frame':>22} {'row-checked':>22}")
+    rng = np.random.default_rng(1)
+    for ber in args.ber:
+        results = []
+        for method in (lambda: whole_frame(levels, args.levels, ber, rng),
+                       lambda: row_checked(levels, args.levels, args.block_rows, ber, rng)):
+            runs = [method() for _ in range(args.runs)]
+            sent = sum(run[0] for run in runs) / len(runs)
+            rounds = sum(run[1] for run in runs) / len(runs)
+            failed = sum(not run[2] for run in runs)
+            results.append(f"{sent / 1e3:9.0f} kB {rounds:4.1f} tx" + (f" {failed} lost" if failed else ""))
+        print(f"{ber:8.0e} {results[0]:>22} {results[1]:>22}")
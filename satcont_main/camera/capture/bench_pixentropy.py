@@ -0,0 +1,86 @@
+#python3 bench_pixentropy.py --corpus /home/sky/capture
+
+import argparse
+import glob
+import os
+import platform
+import time
+import numpy as np
+import pixcodec
+import pixentropy
+
+IMAGE_PATTERNS = ('*.jpg', '*.jpeg', '*.png', '*.pix')
+
+
+def load_corpus(folder):
+    frames = []
+    for pattern in IMAGE_PATTERNS:
+        for path in sorted(glob.glob(os.path.join(folder, pattern))):
+            if path.endswith('.pix'):
+                frames.append((os.path.basename(path), pixcodec.read_pix(path)))
+            else:
+                frames.append((os.path.basename(path), pixcodec.quantize(pixcodec.load_gray(path))))
+    return frames
+
+
+def synthetic_corpus():
+    # stand-ins when no captures are at hand: a dark night frame, a smooth
+    # sky gradient and a busy, noisy scene at 1280x720
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, 1280)
+    y = np.linspace(0, 255, 720)[:, None]
+    night = np.clip(rng.normal(10, 6, (720, 1280)), 0, 255)
+    night[300:340, 600:700] = 240
+    sky = np.clip((x * 0.2 + y * 0.8) + rng.normal(0, 3, (720, 1280)), 0, 255)
+    busy = np.clip((x + y) / 2 + rng.normal(0, 25, (720, 1280)), 0, 255)
+    return [(name, pixcodec.quantize(gray.astype(np.uint8)))
+            for name, gray in (('night', night), ('sky', sky), ('busy', busy))]
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Size and encode time of the PIX coding modes")
+    parser.add_argument('--corpus', type=str, help="Folder with captures (.jpg/.png) or .pix files")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per frame and mode, the best one is reported")
+    args = parser.parse_args()
+
+    frames = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not frames:
+        print(f"No images found in {args.corpus}")
+        raise SystemExit(1)
+    print(f"{platform.machine()} {platform.processor() or ''} python {platform.python_version()}, "
+          f"{'corpus ' + args.corpus if args.corpus else 'synthetic frames'}")
+
+    totals = {mode: [0, 0.0] for mode in pixentropy.MODE_NAMES}
+    text_total = 0
+    best_total = 0
+    for name, levels in frames:
+        text_size = levels.shape[0] * levels.shape[1] * 2
+        text_total += text_size
+        results = []
+        for mode, mode_name in pixentropy.MODE_NAMES.items():
+            data, seconds = timed(lambda: pixentropy.encode(levels, mode), args.repeat)
+            if data is None:
+                continue
+            totals[mode][0] += len(data)
+            totals[mode][1] += seconds
+            results.append((len(data), mode_name, seconds))
+        best_total += min(results)[0]
+        print(f"{name} {levels.shape[1]}x{levels.shape[0]}, text {text_size} bytes")
+        for size, mode_name, seconds in results:
+            print(f"    {mode_name:8} {size:9} bytes  ratio {text_size / size:6.2f}  encode {seconds * 1000:7.1f} ms")
+        print(f"    best: {min(results)[1]}")
+
+    print("total")
+    for mode, (size, seconds) in totals.items():
+        print(f"    {pixentropy.MODE_NAMES[mode]:8} {size:9} bytes  ratio {text_total / size:6.2f}  encode {seconds * 1000:7.1f} ms")
+    print(f"    {'auto':8} {best_total:9} bytes  ratio {text_total / best_total:6.2f}")
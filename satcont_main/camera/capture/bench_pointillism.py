@@ -0,0 +1,67 @@
+#python3 bench_pointillism.py --repeat 3
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from PIL import Image
+import pixcodec
+
+SIZES = ((640, 480), (1280, 720), (1920, 1080))
+
+
+def legacy_convert(input_image_path, output_file_path):
+    # the previous getpixel loop from pointillism.py
+    img = Image.open(input_image_path).convert('L')
+    width, height = img.size
+    with open(output_file_path, 'w') as output_file:
+        for y in range(height):
+            line = []
+            for x in range(width):
+                pixel = img.getpixel((x, y))
+                gray_value = pixel // 26
+                line.append(str(gray_value))
+            output_file.write(" ".join(line) + "\n")
+
+
+def make_capture(path, width, height):
+    # gradient plus noise, saved as JPEG like a camera capture
+    rng = np.random.default_rng(width)
+    x = np.linspace(0, 255, width)
+    y = np.linspace(0, 255, height)[:, None]
+    gray = (x + y) / 2 + rng.normal(0, 20, (height, width))
+    Image.fromarray(np.clip(gray, 0, 255).astype(np.uint8)).save(path, quality=90)
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JPEG -> PIX conversion time, getpixel loop vs NumPy")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per size, the best one is reported")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    for width, height in SIZES:
+        image_path = os.path.join(folder, f"capture_{width}x{height}.jpg")
+        legacy_path = os.path.join(folder, "legacy.pix")
+        vector_path = os.path.join(folder, "vector.pix")
+        make_capture(image_path, width, height)
+
+        legacy = timed(lambda: legacy_convert(image_path, legacy_path), args.repeat)
+        vector = timed(lambda: pixcodec.image_to_pix(image_path, vector_path), args.repeat)
+        with open(legacy_path, 'rb') as f:
+            expected = f.read().replace(b'\r\n', b'\n')
+        with open(vector_path, 'rb') as f:
+            same = f.read() == expected
+
+        print(f"{width}x{height:<5} legacy {legacy * 1000:8.1f} ms   numpy {vector * 1000:7.1f} ms   "
+              f"x{legacy / vector:6.1f}   identical output: {same}")
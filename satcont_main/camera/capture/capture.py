@@ -6,23 +6,68 @@
 import cv2
 import sys
 import os
+import pixcodec
+import pointillism
 
-def capture_image(output_folder, resolution, camera_index, mode, depth):
-    # Open the camera
+STALE_FRAMES = 4  # buffers V4L2 keeps queued by default while the camera sits open
+
+def open_camera(camera_index, resolution):
     cap = cv2.VideoCapture(camera_index)
     if not cap.isOpened():
-        print("Error: Unable to open camera.")
-        return
+        return None
 
     # Set resolution
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
     cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+    # Queue only one frame where the backend allows it, so little goes stale
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+def drop_stale_frames(cap):
+    # Frames queued while the camera was idle predate the command: grab
+    # (without decoding) as many as the driver may hold, the read that
+    # follows then waits for a fresh one
+    buffered = int(cap.get(cv2.CAP_PROP_BUFFERSIZE) or 0)
+    for _ in range(buffered if 0 < buffered < STALE_FRAMES else STALE_FRAMES):
+        cap.grab()
+
+def grab_frame(resolution, camera_index, cameras=None):
+    # Open the camera (a long-lived caller passes a dict of already opened
+    # cameras: camera index -> (capture, resolution))
+    cap, opened_at = cameras.get(camera_index, (None, None)) if cameras is not None else (None, None)
+    if cap is not None and opened_at != resolution:
+        # the device can be opened only once: release it before asking for another size
+        cap.release()
+        del cameras[camera_index]
+        cap = None
+    if cap is None:
+        cap = open_camera(camera_index, resolution)
+        if cap is None:
+            print("Error: Unable to open camera.")
+            return None
+        if cameras is not None:
+            cameras[camera_index] = (cap, resolution)
+    else:
+        drop_stale_frames(cap)
 
     # Capture a frame
     ret, frame = cap.read()
     if not ret:
         print("Error: Unable to capture frame.")
-        return
+        cap.release()
+        if cameras is not None:
+            cameras.pop(camera_index, None)
+        return None
+
+    # Release the camera unless the caller keeps it open
+    if cameras is None:
+        cap.release()
+    return frame
+
+def capture_image(output_folder, resolution, camera_index, mode, depth, cameras=None):
+    frame = grab_frame(resolution, camera_index, cameras)
+    if frame is None:
+        return None
 
     # Convert to grayscale if mode is black
     if mode == "black":
@@ -37,15 +82,35 @@ def capture_image(output_folder, resolution, camera_index, mode, depth):
         gray_frame = frame
     else:
         print("Error: Invalid mode specified.")
-        return
+        return None
 
     # Save the image
-    cv2.imwrite(os.path.join(output_folder, output_file), gray_frame)
+    output_path = os.path.join(output_folder, output_file)
+    cv2.imwrite(output_path, gray_frame)
+
+    print("{}".format(output_path))
+    return output_path
+
+def capture_pix(output_folder, resolution, camera_index, keep_jpeg=False, packed=False,
+                level_count=pixcodec.LEVELS, dither='none', cameras=None):
+    # Frame -> grayscale -> 0-9 (or 0..level_count-1) levels -> .pix in memory,
+    # without writing and re-reading a JPEG; the JPEG is only saved if keep_jpeg is set
+    frame = grab_frame(resolution, camera_index, cameras)
+    if frame is None:
+        return None
+
+    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if keep_jpeg:
+        jpeg_path = os.path.join(output_folder, "capture_" + str(len(os.listdir(output_folder))) + ".jpg")
+        cv2.imwrite(jpeg_path, gray_frame)
+        print("{}".format(jpeg_path))
 
-    print("{}".format(os.path.join(output_folder, output_file)))
+    levels = pixcodec.quantize(gray_frame, level_count, dither)
+    output_path = os.path.join(output_folder, "splash_{}.pix".format(pointillism.get_next_file_number(output_folder)))
+    pixcodec.write_levels(output_path, levels, level_count, packed)
 
-    # Release the camera
-    cap.release()
+    print("{}".format(output_path))
+    return output_path
 
 if __name__ == "__main__":
     if len(sys.argv) != 7:
@@ -0,0 +1,263 @@
+import struct
+import zlib
+import numpy as np
+from PIL import Image
+
+# .pix text format: one line per image row, one digit 0-9 per pixel,
+# separated by spaces ("0 3 9 9\n"). A copy of this file lives in
+# reciever/pixcodec.py for the ground tools.
+LEVELS = 10
+STEP = 26  # 26 = 256 / 10, to get values from 0 to 9
+MAX_LEVELS = 16  # the packed format holds up to 4 bits per pixel
+
+DIGIT = ord('0')
+SPACE = ord(' ')
+NEWLINE = ord('\n')
+RETURN = ord('\r')
+
+# Packed .pix: header (magic, width, height, level count, CRC32 of the pixel
+# bytes), then the pixels row by row, most significant bit first, with as
+# many bits per pixel as the level count needs (4 for the usual 10 levels,
+# i.e. two pixels per byte, high nibble first). Readers tell it from the
+# text format by the magic.
+MAGIC = b'PIX4'
+HEADER = struct.Struct('>4sHHBI')
+CODED_MAGIC = b'PIXZ'  # entropy-coded frames, see pixentropy.py
+
+
+def load_gray(image_path):
+    return np.asarray(Image.open(image_path).convert('L'))
+
+
+# 8x8 Bayer matrix, thresholds in 64ths
+BAYER_8 = np.array([[0, 32, 8, 40, 2, 34, 10, 42],
+                    [48, 16, 56, 24, 50, 18, 58, 26],
+                    [12, 44, 4, 36, 14, 46, 6, 38],
+                    [60, 28, 52, 20, 62, 30, 54, 22],
+                    [3, 35, 11, 43, 1, 33, 9, 41],
+                    [51, 19, 59, 27, 49, 17, 57, 25],
+                    [15, 47, 7, 39, 13, 45, 5, 37],
+                    [63, 31, 55, 23, 61, 29, 53, 21]], dtype=np.int32)
+DITHER_MODES = ('none', 'ordered', 'diffusion')
+
+
+def quantize(gray, level_count=LEVELS, dither='none'):
+    # 0-255 -> 0..level_count-1 for the whole array at once
+    gray = np.asarray(gray, dtype=np.uint8)
+    if level_count == LEVELS and dither in (None, 'none'):
+        return (gray // STEP).astype(np.uint8)  # the original 10-level scale
+    if not 2 <= level_count <= MAX_LEVELS:
+        raise ValueError("Level count must be 2-{}, got {}".format(MAX_LEVELS, level_count))
+    if dither in (None, 'none'):
+        levels = (gray.astype(np.int32) * (level_count - 1) * 2 + 255) // 510  # rounded
+    elif dither == 'ordered':
+        # floor(gray * (level_count - 1) / 255 + threshold) in integers
+        height, width = gray.shape
+        thresholds = np.tile(BAYER_8 * 255, (-(-height // 8), -(-width // 8)))[:height, :width]
+        levels = (gray.astype(np.int32) * ((level_count - 1) * 64) + thresholds) // (255 * 64)
+    elif dither == 'diffusion':
+        levels = diffuse(gray * np.float32((level_count - 1) / 255.0), level_count)
+    else:
+        raise ValueError("Unknown dither mode: {}".format(dither))
+    return np.clip(levels, 0, level_count - 1).astype(np.uint8)
+
+
+def diffuse(scaled, level_count):
+    # Error diffusion done a row at a time: each row is rounded as a whole and
+    # its error goes to the next row (1/4 down-left, 1/2 down, 1/4 down-right),
+    # so the loop runs per row instead of per pixel
+    levels = np.empty_like(scaled)
+    carried = np.zeros(scaled.shape[1], dtype=scaled.dtype)
+    for y in range(scaled.shape[0]):
+        row = scaled[y] + carried
+        levels[y] = np.clip(np.rint(row), 0, level_count - 1)
+        error = row - levels[y]
+        carried = error * 0.5
+        carried[1:] += error[:-1] * 0.25
+        carried[:-1] += error[1:] * 0.25
+    return levels
+
+
+def bits_for(level_count):
+    return max(1, int(level_count - 1).bit_length()) if level_count else 4
+
+
+def pack_bits(flat, bits):
+    # most significant bit first, the last byte padded with zeros
+    if bits == 4:
+        if flat.size % 2:
+            flat = np.append(flat, 0)
+        return ((flat[0::2] << 4) | flat[1::2]).astype(np.uint8).tobytes()
+    if bits in (1, 2):
+        per_byte = 8 // bits
+        flat = np.append(flat, np.zeros(-flat.size % per_byte, dtype=np.uint8)).astype(np.uint8)
+        shifts = np.arange(8 - bits, -1, -bits, dtype=np.uint8)
+        return (flat.reshape(-1, per_byte) << shifts).sum(axis=1, dtype=np.uint8).tobytes()
+    planes = (flat[:, None] >> np.arange(bits - 1, -1, -1)) & 1
+    return np.packbits(planes.astype(np.uint8).reshape(-1)).tobytes()
+
+
+def unpack_bits(pixels, count, bits):
+    pixels = np.frombuffer(pixels, dtype=np.uint8)
+    if bits == 4:
+        flat = np.empty(pixels.size * 2, dtype=np.uint8)
+        flat[0::2] = pixels >> 4
+        flat[1::2] = pixels & 0x0f
+        return flat[:count]
+    if bits in (1, 2):
+        shifts = np.arange(8 - bits, -1, -bits, dtype=np.uint8)
+        return ((pixels[:, None] >> shifts) & ((1 << bits) - 1)).reshape(-1)[:count]
+    planes = np.unpackbits(pixels)[:count * bits].reshape(count, bits)
+    return (planes << np.arange(bits - 1, -1, -1).astype(np.uint8)).sum(axis=1).astype(np.uint8)
+
+
+def format_pix(levels):
+    # every row is "d d ... d\n", exactly two bytes per pixel, so the text is
+    # filled in as one (height, 2 * width) byte array
+    height, width = levels.shape
+    text = np.full((height, 2 * width), SPACE, dtype=np.uint8)
+    text[:, 0::2] = levels + DIGIT
+    if width:
+        text[:, -1] = NEWLINE
+    return text.tobytes()
+
+
+def write_pix(output_path, levels):
+    with open(output_path, 'wb') as output_file:
+        output_file.write(format_pix(levels))
+
+
+def pack_pix(levels, level_count=LEVELS):
+    height, width = levels.shape
+    pixels = pack_bits(np.ascontiguousarray(levels, dtype=np.uint8).reshape(-1), bits_for(level_count))
+    return HEADER.pack(MAGIC, width, height, level_count, zlib.crc32(pixels)) + pixels
+
+
+def write_packed(output_path, levels, level_count=LEVELS):
+    with open(output_path, 'wb') as output_file:
+        output_file.write(pack_pix(levels, level_count))
+
+
+def write_levels(output_path, levels, level_count=LEVELS, packed=False):
+    # the text format only knows the 10-level scale, other counts are packed
+    if packed or level_count != LEVELS:
+        write_packed(output_path, levels, level_count)
+    else:
+        write_pix(output_path, levels)
+
+
+def image_to_pix(input_image_path, output_path, packed=False, level_count=LEVELS, dither='none'):
+    levels = quantize(load_gray(input_image_path), level_count, dither)
+    write_levels(output_path, levels, level_count, packed)
+    return levels.shape
+
+
+def is_packed(data):
+    return data[:len(MAGIC)] == MAGIC
+
+
+def is_binary(data):
+    # packed or entropy-coded, i.e. not the text format
+    return data[:len(MAGIC)] in (MAGIC, CODED_MAGIC)
+
+
+def read_header(data):
+    # returns (width, height, level count, CRC32, size of the whole file)
+    if len(data) < HEADER.size or not is_packed(data):
+        raise ValueError("Not a packed PIX header")
+    _, width, height, level_count, checksum = HEADER.unpack_from(data)
+    return width, height, level_count, checksum, HEADER.size + (width * height * bits_for(level_count) + 7) // 8
+
+
+def unpack_pix(data):
+    width, height, level_count, checksum, size = read_header(data)
+    if len(data) < size:
+        raise ValueError("Packed PIX data is truncated ({} of {} bytes)".format(len(data), size))
+    pixels = data[HEADER.size:size]
+    if zlib.crc32(pixels) != checksum:
+        raise ValueError("Packed PIX checksum mismatch")
+    levels = unpack_bits(pixels, width * height, bits_for(level_count)).reshape(height, width)
+    if level_count and levels.max(initial=0) >= level_count:
+        raise ValueError("Packed PIX value out of range")
+    return levels
+
+
+# 0-9 -> 0-255 lookup tables: back2pic.py scales by 25.5, PixViewer by 26
+LUT_255 = np.array([int(value * 25.5) for value in range(LEVELS)], dtype=np.uint8)
+LUT_26 = np.array([value * STEP for value in range(LEVELS)], dtype=np.uint8)
+
+
+def lut_for(level_count, lut=LUT_255):
+    # the given table for 10-level files, an even 0-255 spread otherwise
+    if level_count in (0, LEVELS):
+        return lut
+    return np.rint(np.arange(level_count) * (255.0 / (level_count - 1))).astype(np.uint8)
+
+
+def parse_pix(data):
+    # packed, entropy-coded or text PIX -> (height, width) uint8 array of level values;
+    # raises ValueError like the old int() parsing did on broken files
+    return parse_pix_info(data)[0]
+
+
+def parse_pix_info(data):
+    # (levels, level count)
+    if is_packed(data):
+        return unpack_pix(data), read_header(data)[2]
+    if data[:len(CODED_MAGIC)] == CODED_MAGIC:
+        import pixentropy
+        return pixentropy.decode(data), pixentropy.read_header(data)[2]
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    levels = parse_regular(buffer)
+    if levels is None:
+        levels = parse_regular(buffer[buffer != RETURN])  # CRLF rows
+    if levels is None:
+        levels = parse_irregular(buffer)
+    return levels, LEVELS
+
+
+def parse_regular(buffer):
+    # fast path for files as written by format_pix
+    newlines = np.flatnonzero(buffer[1:2 * 4096:2] == NEWLINE)
+    if not newlines.size:
+        return None
+    row_size = 2 * (newlines[0] + 1)
+    if buffer.size % row_size:
+        return None
+    rows = buffer.reshape(-1, row_size)
+    digits = rows[:, 0::2] - DIGIT
+    separators = rows[:, 1:-1:2]
+    if digits.max(initial=0) > 9 or (separators != SPACE).any() or (rows[:, -1] != NEWLINE).any():
+        return None
+    return digits
+
+
+def parse_irregular(buffer):
+    # any whitespace layout (CRLF, trailing spaces, blank lines)
+    is_digit = (buffer >= DIGIT) & (buffer <= DIGIT + 9)
+    is_newline = buffer == NEWLINE
+    if (~(is_digit | is_newline | (buffer == SPACE) | (buffer == RETURN) | (buffer == ord('\t')))).any():
+        raise ValueError("Invalid character in PIX data")
+    if (is_digit[1:] & is_digit[:-1]).any():
+        raise ValueError("PIX values must be single digits")
+    row_of_digit = np.cumsum(is_newline)[is_digit]
+    counts = np.bincount(row_of_digit)
+    counts = counts[counts > 0]
+    if not counts.size:
+        raise ValueError("Empty PIX data")
+    if (counts != counts[0]).any():
+        raise ValueError("PIX rows have different lengths")
+    return (buffer[is_digit] - DIGIT).reshape(counts.size, counts[0])
+
+
+def read_pix(input_pix_path):
+    return read_pix_info(input_pix_path)[0]
+
+
+def read_pix_info(input_pix_path):
+    with open(input_pix_path, 'rb') as f:
+        return parse_pix_info(f.read())
+
+
+def pix_to_image(levels, lut=LUT_255, level_count=LEVELS):
+    return Image.fromarray(lut_for(level_count, lut)[levels], 'L')
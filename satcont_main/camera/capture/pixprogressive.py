@@ -0,0 +1,138 @@
+import struct
+import numpy as np
+import pixcodec
+import pixentropy
+
+# Progressive .pix transfer: a coarse layer (block averages) first, then
+# full-resolution tiles, the ones that differ most from the coarse layer
+# first, then an end packet. Every packet is
+#   magic, kind, x, y, frame width, frame height
+# followed (except for the end packet) by a pixentropy frame, which carries
+# its own size and checksum. For the coarse layer x is the block size.
+# Each packet can be used on its own, so the transfer can stop anywhere.
+# A copy of this file lives in reciever/pixprogressive.py for the ground tools.
+MAGIC = b'PIXP'
+PACKET = struct.Struct('>4sBHHHH')
+
+KIND_COARSE = 0
+KIND_TILE = 1
+KIND_END = 2
+
+COARSE_FACTOR = 8
+TILE_SIZE = 32
+
+
+def pad_to(levels, height, width):
+    return np.pad(levels, ((0, height - levels.shape[0]), (0, width - levels.shape[1])), mode='edge')
+
+
+def downsample(levels, factor):
+    height, width = levels.shape
+    rows = -(-height // factor)
+    columns = -(-width // factor)
+    blocks = pad_to(levels, rows * factor, columns * factor).reshape(rows, factor, columns, factor)
+    return np.rint(blocks.mean(axis=(1, 3))).astype(np.uint8)
+
+
+def upsample(coarse, factor, height, width):
+    return np.repeat(np.repeat(coarse, factor, axis=0), factor, axis=1)[:height, :width]
+
+
+def tile_order(levels, preview, tile):
+    # (y, x) of every tile, largest difference to the preview first
+    height, width = levels.shape
+    rows = -(-height // tile)
+    columns = -(-width // tile)
+    error = np.abs(levels.astype(np.int16) - preview)
+    error = np.pad(error, ((0, rows * tile - height), (0, columns * tile - width)))
+    per_tile = error.reshape(rows, tile, columns, tile).sum(axis=(1, 3)).reshape(-1)
+    order = np.argsort(-per_tile, kind='stable')
+    return [(int(index // columns) * tile, int(index % columns) * tile) for index in order]
+
+
+def encode_packets(levels, factor=COARSE_FACTOR, tile=TILE_SIZE, level_count=pixcodec.LEVELS):
+    # yields the packets in sending order
+    height, width = levels.shape
+    coarse = downsample(levels, factor)
+    yield PACKET.pack(MAGIC, KIND_COARSE, factor, 0, width, height) + pixentropy.encode_best(coarse, level_count)
+    preview = upsample(coarse, factor, height, width)
+    for y, x in tile_order(levels, preview, tile):
+        block = levels[y:y + tile, x:x + tile]
+        yield PACKET.pack(MAGIC, KIND_TILE, x, y, width, height) + pixentropy.encode_best(block, level_count)
+    yield PACKET.pack(MAGIC, KIND_END, 0, 0, width, height)
+
+
+def packet_size(buffer):
+    # size of the packet at the start of buffer, None if more bytes are needed
+    if len(buffer) < PACKET.size:
+        return None
+    magic, kind = PACKET.unpack_from(buffer)[:2]
+    if magic != MAGIC:
+        raise ValueError("Not a progressive PIX packet")
+    if kind == KIND_END:
+        return PACKET.size
+    if len(buffer) < PACKET.size + pixentropy.HEADER.size:
+        return None
+    return PACKET.size + pixentropy.read_header(bytes(buffer[PACKET.size:PACKET.size + pixentropy.HEADER.size]))[5]
+
+
+class ProgressiveImage:
+    # Ground side: feed() the received bytes in any pieces; levels always
+    # holds the best image so far and exact marks the pixels already final;
+    # level_count comes from the packets.
+    def __init__(self):
+        self.buffer = bytearray()
+        self.levels = None
+        self.level_count = pixcodec.LEVELS
+        self.exact = None
+        self.done = False
+        self.packets = 0
+        self.received = 0
+
+    def feed(self, data):
+        # returns the number of packets applied
+        self.buffer += data
+        self.received += len(data)
+        applied = 0
+        while not self.done:
+            start = self.buffer.find(MAGIC)
+            if start == -1:
+                del self.buffer[:max(len(self.buffer) - len(MAGIC) + 1, 0)]
+                break
+            del self.buffer[:start]
+            try:
+                size = packet_size(self.buffer)
+            except ValueError:
+                del self.buffer[:1]  # damaged header, look for the next packet
+                continue
+            if size is None or len(self.buffer) < size:
+                break
+            packet = bytes(self.buffer[:size])
+            del self.buffer[:size]
+            try:
+                self.apply(packet)
+            except ValueError:
+                continue  # damaged packet: the tile stays as it was
+            applied += 1
+        return applied
+
+    def apply(self, packet):
+        _, kind, x, y, width, height = PACKET.unpack_from(packet)
+        if self.levels is None:
+            self.levels = np.zeros((height, width), dtype=np.uint8)
+            self.exact = np.zeros((height, width), dtype=bool)
+        if kind == KIND_END:
+            self.done = True
+            return
+        block = pixentropy.decode(packet[PACKET.size:])
+        self.level_count = pixentropy.read_header(packet[PACKET.size:])[2]
+        if kind == KIND_COARSE:
+            preview = upsample(block, x, height, width)
+            self.levels[~self.exact] = preview[~self.exact]
+        elif kind == KIND_TILE:
+            self.levels[y:y + block.shape[0], x:x + block.shape[1]] = block
+            self.exact[y:y + block.shape[0], x:x + block.shape[1]] = True
+        self.packets += 1
+
+    def coverage(self):
+        return 0.0 if self.exact is None else float(self.exact.mean())
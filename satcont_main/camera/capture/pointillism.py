@@ -1,8 +1,11 @@
-#python3 pointillism.py /home/sky/capture/capture_1.jpg /home/sky/capture/pointed
+#python3 pointillism.py /home/sky/capture/capture_1.jpg /home/sky/capture/pointed [--packed]
+#python3 pointillism.py /home/sky/capture/capture_1.jpg /home/sky/capture/pointed --levels 4 --dither ordered
 
-import sys
+import argparse
 import os
+import numpy as np
 from PIL import Image
+import pixcodec
 
 def get_next_file_number(folder_path):
     max_number = 0
@@ -16,11 +19,11 @@ def get_next_file_number(folder_path):
                 continue
     return max_number + 1
 
-def main(input_image_path, output_folder_path):
+def main(input_image_path, output_folder_path, packed=False, level_count=pixcodec.LEVELS, dither='none'):
     # Check if the input file exists
     if not os.path.isfile(input_image_path):
         print(f"File {input_image_path} does not exist.")
-        return
+        return None
 
     # Check if the output folder exists, create if it doesn't
     if not os.path.exists(output_folder_path):
@@ -28,7 +31,6 @@ def main(input_image_path, output_folder_path):
 
     # Open the image and convert it to grayscale
     img = Image.open(input_image_path).convert('L')
-    width, height = img.size
 
     # Determine the next file number
     next_file_number = get_next_file_number(output_folder_path)
@@ -36,22 +38,22 @@ def main(input_image_path, output_folder_path):
     # Path to the output file
     output_file_path = os.path.join(output_folder_path, f"splash_{next_file_number}.pix")
 
-    with open(output_file_path, 'w') as output_file:
-        for y in range(height):
-            line = []
-            for x in range(width):
-                pixel = img.getpixel((x, y))
-                # Convert pixel value from 0-255 to 0-9
-                gray_value = pixel // 26  # 26 = 256 / 10, to get values from 0 to 9
-                line.append(str(gray_value))
-            output_file.write(" ".join(line) + "\n")
+    # Convert pixel values from 0-255 to 0-9 (or 0..level_count-1) and write all rows at once
+    levels = pixcodec.quantize(np.asarray(img), level_count, dither)
+    # packed: up to 4 bits per pixel with a header, about 4x smaller than the
+    # text rows (8x with 4 levels, 16x with 2); level counts other than 10
+    # are always packed
+    pixcodec.write_levels(output_file_path, levels, level_count, packed)
 
     print(f"{output_file_path}")
+    return output_file_path
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <path to input image> <path to output folder>")
-    else:
-        input_image_path = sys.argv[1]
-        output_folder_path = sys.argv[2]
-        main(input_image_path, output_folder_path)
+    parser = argparse.ArgumentParser(description="Image -> .pix")
+    parser.add_argument('input_image_path', help="Path to input image")
+    parser.add_argument('output_folder_path', help="Path to output folder")
+    parser.add_argument('--packed', action='store_true', help="Write the binary packed format")
+    parser.add_argument('--levels', type=int, default=pixcodec.LEVELS, help="Gray levels, 2-16 (default 10)")
+    parser.add_argument('--dither', choices=pixcodec.DITHER_MODES, default='none', help="Dithering for few levels")
+    args = parser.parse_args()
+    main(args.input_image_path, args.output_folder_path, args.packed, args.levels, args.dither)
@@ -0,0 +1,70 @@
+#python3 bench_framing.py --frames 5000
+
+import argparse
+import hashlib
+import time
+import serial
+import main
+from uart_command import UARTCommand
+from framing import FrameDecoder, encode_binary_command
+from log_writer import set_log_level
+
+SAMPLE_COMMANDS = [
+    (1, ["FoxWind", 1234, "example"]),
+    (2, ["sky"]),
+    (3, ["/home/sky/capture", "1280", "720", "4", "black", "10"]),
+    (4, ["/home/sky/capture/capture_1.jpg", "/home/sky/capture/pointed"]),
+    (5, ["/home/sky/test123.txt", "12345ahahahaha", "remove", "d21", 3]),
+]
+
+
+def text_frame(command_number, args):
+    # the format reciever/fproc.py and commandgen.py produce
+    parts = [str(command_number)]
+    for arg in args:
+        if isinstance(arg, bool):
+            parts.append(f"{arg}:bool")
+        elif isinstance(arg, int):
+            parts.append(f"{arg}:int")
+        else:
+            parts.append(f"{arg}:str")
+    return ("++" + "+".join(parts) + "++").encode()
+
+
+def build_commands(count):
+    commands = (SAMPLE_COMMANDS * (count // len(SAMPLE_COMMANDS) + 1))[:count // 2]
+    for i in range(1, count - len(commands) + 1):
+        data = "line {} of the uploaded file".format(i)
+        commands.append((5, ["/home/sky/upload.txt", data, "nstring", hashlib.md5(data.encode()).hexdigest()[:3], i]))
+    return commands
+
+
+def run(name, stream, uart, expected):
+    decoder = FrameDecoder()
+    start = time.perf_counter()
+    frames = []
+    for i in range(0, len(stream), 4096):
+        frames += decoder.feed(stream[i:i + 4096])
+    decoded = time.perf_counter()
+    for frame in frames:
+        uart.parse_command(frame)
+    parsed = time.perf_counter()
+    if len(frames) != expected:
+        raise RuntimeError(f"{name}: {len(frames)} frames decoded, {expected} expected")
+    print(f"{name:6} {len(stream):8} bytes on the wire ({len(stream) / expected:6.1f} per frame)  "
+          f"split {(decoded - start) / expected * 1e6:6.2f} us/frame  parse {(parsed - decoded) / expected * 1e6:6.2f} us/frame")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Text vs binary command framing")
+    parser.add_argument('--frames', type=int, default=5000, help="Number of frames")
+    args = parser.parse_args()
+
+    set_log_level('WARNING')
+    uart = UARTCommand(0, 0, ser=serial.serial_for_url('loop://'))
+    for number, function in [(1, main.test1), (2, main.test2), (3, main.execute_capture_command),
+                             (4, main.pic2point), (5, main.manage_file)]:
+        uart.add_command(number, function)
+    commands = build_commands(args.frames)
+    run("text", b"".join(text_frame(number, command_args) for number, command_args in commands), uart, len(commands))
+    run("binary", b"".join(encode_binary_command(number, command_args) for number, command_args in commands), uart, len(commands))
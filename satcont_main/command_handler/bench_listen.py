@@ -0,0 +1,98 @@
+#python3 bench_listen.py --frames 20000
+
+import argparse
+import hashlib
+import threading
+import time
+import serial
+from uart_command import UARTCommand
+from framing import FrameDecoder
+
+# frames as they are sent from the ground (see main.py and reciever/fproc.py)
+RECORDED_FRAMES = [
+    "++1+FoxWind:str+1234:int+example:str++",
+    "++2+sky:str++",
+    "++3+/home/sky/capture:str+1280:str+720:str+4:str+black:str+10:str++",
+    "++4+/home/sky/capture/capture_1.jpg:str+/home/sky/capture/pointed:str++",
+    "++5+/home/sky/test123.txt:str+12345ahahahaha:str+remove:str+d21:str+3:int++",
+]
+
+
+def upload_frames(count):
+    frames = []
+    for i in range(1, count + 1):
+        data = "line {} of the uploaded file".format(i)
+        data_hash = hashlib.md5(data.encode()).hexdigest()[:3]
+        frames.append(f"++5+/home/sky/upload.txt:str+{data}:str+nstring:str+{data_hash}:str+{i}:int++\n")
+    return frames
+
+
+def build_stream(count):
+    frames = (RECORDED_FRAMES * (count // len(RECORDED_FRAMES) + 1))[:count // 2]
+    frames += upload_frames(count - len(frames))
+    return "".join(frames).encode(), len(frames)
+
+
+def legacy_listen(ser, expected):
+    # the previous byte-at-a-time loop, without the command execution
+    current_command = ""
+    received = 0
+    while received < expected:
+        char = ser.read().decode('utf-8', errors='ignore')
+        if not char:
+            continue
+        if (char == '+') and current_command and (current_command[-1] == '+'):
+            if current_command.strip("+\n"):
+                received += 1
+            current_command = ""
+        else:
+            current_command += char
+    return received
+
+
+def decoder_listen(ser, expected):
+    uart = UARTCommand(0, 0, ser=ser)
+    received = 0
+    while received < expected:
+        received += len(uart.read_frames())
+    return received
+
+
+def run(name, reader, stream, expected):
+    # loop:// buffers only a few KiB, so the stream is written from a second thread
+    ser = serial.serial_for_url('loop://', timeout=1)
+    writer = threading.Thread(target=ser.write, args=(stream,))
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()  # listener thread only, not the writer
+    writer.start()
+    received = reader(ser, expected)
+    cpu = time.thread_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    writer.join()
+    ser.close()
+    print(f"{name:8} frames: {received:6}  {received / wall:10.0f} frames/s  "
+          f"{cpu / max(received, 1) * 1e6:8.2f} us CPU/frame  {len(stream) / wall / 1024:8.0f} KiB/s")
+
+
+def run_decoder_only(stream, expected, chunk_size=4096):
+    # loop:// moves data through a per-byte queue; this shows the decoder cost alone
+    decoder = FrameDecoder()
+    cpu_start = time.process_time()
+    received = 0
+    for i in range(0, len(stream), chunk_size):
+        received += len(decoder.feed(stream[i:i + chunk_size]))
+    cpu = time.process_time() - cpu_start
+    print(f"{'no port':8} frames: {received:6}  {received / cpu:10.0f} frames/s  "
+          f"{cpu / max(received, 1) * 1e6:8.2f} us CPU/frame  ({chunk_size} byte reads)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="UART frame decoding throughput")
+    parser.add_argument('--frames', type=int, default=20000, help="Number of frames to feed")
+    args = parser.parse_args()
+
+    stream, expected = build_stream(args.frames)
+    print(f"stream: {len(stream)} bytes, {expected} frames")
+    run("legacy", legacy_listen, stream, expected)
+    run("decoder", decoder_listen, stream, expected)
+    run_decoder_only(stream, expected)
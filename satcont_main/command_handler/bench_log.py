@@ -0,0 +1,66 @@
+#python3 bench_log.py --commands 2000
+
+import argparse
+import contextlib
+import datetime
+import os
+import tempfile
+import time
+import log_writer
+
+COMMAND = "5+/home/sky/upload.txt:str+line of the uploaded file:str+nstring:str+a1b:str+12:int"
+
+
+def legacy_log(message, level='INFO'):
+    # the previous per-call implementation
+    if not os.path.exists('logs'):
+        os.makedirs('logs')
+    log_file = os.path.join('logs', datetime.datetime.now().strftime('%Y-%m-%d') + '.log')
+    timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    log_message = f'[{timestamp}] [{level}] {message}'
+    with open(log_file, 'a') as f:
+        f.write(log_message + '\n')
+    print(log_message)
+
+
+def legacy_command(seq):
+    # the log calls execute_command/parse_command make for one frame
+    legacy_log("Executing command [{}]: {}".format(seq, COMMAND), 'DEBUG')
+    legacy_log("Parsing command: {}".format(COMMAND), 'DEBUG')
+    legacy_log("Parsed command number: {} with arguments: {}".format(5, COMMAND.split('+')[1:]), 'DEBUG')
+    legacy_log("Command executed successfully: {} [{}]".format(5, seq), 'INFO')
+    legacy_log("Sending response message: {}".format("success"), 'INFO')
+
+
+def queued_command(seq):
+    log = log_writer.log
+    log("Executing command [{}]: {}", 'DEBUG', seq, COMMAND)
+    log("Parsing command: {}", 'DEBUG', COMMAND)
+    log("Parsed command number: {} with arguments: {}", 'DEBUG', 5, COMMAND.split('+')[1:])
+    log("Command executed successfully: {} [{}]", 'INFO', 5, seq)
+    log("Sending response message: {}", 'INFO', "success")
+
+
+def run(name, command, count, drain=None):
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for seq in range(count):
+            command(seq)
+        caller = time.perf_counter() - start
+        if drain:
+            drain()
+        total = time.perf_counter() - start
+    print(f"{name:16} {caller / count * 1e6:8.1f} us/command on the caller, {total / count * 1e6:8.1f} us/command until on disk")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Logging overhead per command")
+    parser.add_argument('--commands', type=int, default=2000, help="Number of simulated commands")
+    args = parser.parse_args()
+
+    os.chdir(tempfile.mkdtemp())
+    run("legacy", legacy_command, args.commands)
+    log_writer.writer.set_level('DEBUG')
+    run("queued (DEBUG)", queued_command, args.commands, log_writer.flush_log)
+    log_writer.writer.set_level('INFO')
+    run("queued (INFO)", queued_command, args.commands, log_writer.flush_log)
@@ -0,0 +1,64 @@
+#python3 bench_manage_file.py --lines 5000
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+import main
+from log_writer import set_log_level
+
+
+def legacy_manage_file(path, data, mode, hash_check, line_number=0):
+    # the previous read-everything/rewrite-everything version, nstring only
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    if hashlib.md5(data.encode()).hexdigest()[:3] != hash_check:
+        return "Hash mismatch warning"
+    if not os.path.exists(path):
+        with open(path, 'w'):
+            pass
+    with open(path, 'r') as f:
+        lines = f.readlines()
+    if 1 <= line_number <= len(lines):
+        lines.insert(line_number, data + '\n')
+    else:
+        lines.append(data + '\n')
+    with open(path, 'w') as f:
+        f.writelines(lines)
+    return "success"
+
+
+def upload_commands(count):
+    # the same arguments fproc.py "upstring" generates for a text file
+    commands = []
+    for i in range(1, count + 1):
+        data = "{:05d} some uploaded configuration or script line".format(i)
+        commands.append((data, 'nstring', hashlib.md5(data.encode()).hexdigest()[:3], i))
+    return commands
+
+
+def run(name, manage_file, commands, path, flush=None):
+    start = time.perf_counter()
+    for data, mode, data_hash, line_number in commands:
+        result = manage_file(path, data, mode, data_hash, line_number)
+        if result != "success":
+            raise RuntimeError(result)
+    if flush:
+        flush()
+    elapsed = time.perf_counter() - start
+    with open(path, 'rb') as f:
+        digest = hashlib.md5(f.read()).hexdigest()
+    print(f"{name:8} {len(commands)} lines in {elapsed:7.3f} s  {elapsed / len(commands) * 1e6:8.1f} us/line  md5 {digest}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload a file through manage_file")
+    parser.add_argument('--lines', type=int, default=5000, help="Number of nstring commands")
+    args = parser.parse_args()
+
+    set_log_level('WARNING')  # measure the file work, not the log
+    folder = tempfile.mkdtemp()
+    commands = upload_commands(args.lines)
+    run("legacy", legacy_manage_file, commands, os.path.join(folder, "legacy", "upload.txt"))
+    run("editor", main.manage_file, commands, os.path.join(folder, "editor", "upload.txt"), main.editor.flush)
@@ -0,0 +1,75 @@
+#python3 bench_parse.py --frames 20000
+
+import argparse
+import hashlib
+import time
+import serial
+import main
+from uart_command import UARTCommand
+from log_writer import log, set_log_level
+
+
+def legacy_parse(command):
+    # the previous parse_command
+    log("Parsing command: {}", 'DEBUG', command)
+    command = command.strip()
+    parts = command.strip("++").split('+')
+    if len(parts) < 2:
+        raise ValueError("Invalid command format")
+    command_number = int(parts[0])
+    parsed_args = []
+    for arg in parts[1:]:
+        if ':' not in arg:
+            raise ValueError("Invalid argument format, missing type specifier")
+        value, type_specifier = arg.split(':')
+        if type_specifier == 'str':
+            parsed_args.append(value)
+        elif type_specifier == 'int':
+            parsed_args.append(int(value))
+        elif type_specifier == 'bool':
+            parsed_args.append(value.lower() == 'true')
+        else:
+            raise ValueError("Unsupported type specifier")
+    log("Parsed command number: {} with arguments: {}", 'DEBUG', command_number, parsed_args)
+    return command_number, parsed_args
+
+
+def build_frames(count, malformed=False):
+    frames = []
+    for i in range(1, count + 1):
+        data = "line {} of the uploaded file".format(i)
+        data_hash = hashlib.md5(data.encode()).hexdigest()[:3]
+        if malformed:
+            frames.append(f"5+/home/sky/upload.txt:str+{data}:str+{i}:int")  # wrong argument count
+        else:
+            frames.append(f"5+/home/sky/upload.txt:str+{data}:str+nstring:str+{data_hash}:str+{i}:int")
+    return frames
+
+
+def run(name, parse, frames):
+    rejected = 0
+    start = time.perf_counter()
+    for frame in frames:
+        try:
+            parse(frame)
+        except ValueError:
+            rejected += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name:22} {len(frames) / elapsed:10.0f} frames/s  {elapsed / len(frames) * 1e6:6.2f} us/frame  rejected at parse: {rejected}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Command parsing throughput")
+    parser.add_argument('--frames', type=int, default=20000, help="Number of frames")
+    args = parser.parse_args()
+
+    set_log_level('WARNING')
+    uart = UARTCommand(0, 0, ser=serial.serial_for_url('loop://'))
+    uart.add_command(5, main.manage_file)
+    frames = build_frames(args.frames)
+    malformed = build_frames(args.frames // 10, malformed=True)
+    run("legacy", legacy_parse, frames)
+    run("checked", uart.parse_command, frames)
+    # the legacy parser lets these through to a TypeError in the handler call
+    run("legacy (malformed)", legacy_parse, malformed)
+    run("checked (malformed)", uart.parse_command, malformed)
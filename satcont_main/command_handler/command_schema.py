@@ -0,0 +1,103 @@
+import inspect
+
+
+def parse_bool(value):
+    return value.lower() == 'true'
+
+
+def convert_text(value, type_specifier):
+    converter = TEXT_CONVERTERS[type_specifier]
+    return value if converter is None else converter(value)
+
+
+# type specifier in "value:type" -> converter (None keeps the string)
+TEXT_CONVERTERS = {
+    'str': None,
+    'int': int,
+    'bool': parse_bool,
+}
+TYPE_NAMES = {str: 'str', int: 'int', bool: 'bool', bytes: 'bytes'}
+
+
+class CommandSchema:
+    # Built once per command in add_command from the handler signature:
+    # how many arguments it accepts and, where the annotation or the default
+    # value tells, which type each one must have.
+    def __init__(self, function):
+        self.name = function.__name__
+        self.required = 0
+        self.maximum = 0
+        self.types = []
+        for param in inspect.signature(function).parameters.values():
+            if param.kind == param.VAR_POSITIONAL:
+                self.maximum = None
+                break
+            if param.kind not in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+                continue
+            self.maximum += 1
+            if param.default is param.empty:
+                self.required += 1
+            expected = param.annotation if param.annotation is not param.empty else type(param.default)
+            self.types.append(TYPE_NAMES.get(expected))
+        # (type specifier, converter) per argument, applied in order by parse_text;
+        # None as the type accepts any specifier
+        self.fields = [(expected, TEXT_CONVERTERS.get(expected)) for expected in self.types]
+
+    def check_count(self, count):
+        if count < self.required or (self.maximum is not None and count > self.maximum):
+            if self.maximum == self.required:
+                expected = str(self.required)
+            elif self.maximum is None:
+                expected = "at least {}".format(self.required)
+            else:
+                expected = "{}-{}".format(self.required, self.maximum)
+            raise ValueError("{} expects {} argument(s), got {}".format(self.name, expected, count))
+
+    def expected_type(self, index):
+        return self.types[index] if index < len(self.types) else None
+
+    def parse_text(self, body, start):
+        # body is the frame without "++"; its arguments begin after body[start]
+        if start < 0:
+            self.check_count(0)
+            return []
+        parts = body[start + 1:].split('+')
+        count = len(parts)
+        if count < self.required or (self.maximum is not None and count > self.maximum):
+            self.check_count(count)
+        if self.maximum is None:
+            return self.parse_text_slow(body, start)
+        args = []
+        for part, (expected, converter) in zip(parts, self.fields):
+            value, separator, type_specifier = part.rpartition(':')
+            if not separator or type_specifier != expected:
+                if expected is not None or type_specifier not in TEXT_CONVERTERS or not separator:
+                    return self.parse_text_slow(body, start)  # raises with the reason
+                converter = TEXT_CONVERTERS[type_specifier]
+            args.append(value if converter is None else converter(value))
+        return args
+
+    def parse_text_slow(self, body, start):
+        # argument by argument, for *args handlers and to name what is wrong
+        args = []
+        for index, arg in enumerate(body[start + 1:].split('+')):
+            value, separator, type_specifier = arg.rpartition(':')
+            if not separator:
+                raise ValueError("Invalid argument format, missing type specifier")
+            if type_specifier not in TEXT_CONVERTERS:
+                raise ValueError("Unsupported type specifier")
+            expected = self.expected_type(index)
+            if expected is not None and expected != type_specifier:
+                raise ValueError("Argument {} of {} must be {}, got {}".format(index + 1, self.name, expected, type_specifier))
+            converter = TEXT_CONVERTERS[type_specifier]
+            args.append(value if converter is None else converter(value))
+        return args
+
+    def check_args(self, args):
+        # binary frames arrive already typed
+        self.check_count(len(args))
+        for index, arg in enumerate(args):
+            expected = self.expected_type(index)
+            if expected is not None and TYPE_NAMES.get(type(arg)) != expected:
+                raise ValueError("Argument {} of {} must be {}, got {}".format(index + 1, self.name, expected, type(arg).__name__))
+        return args
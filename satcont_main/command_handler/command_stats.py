@@ -0,0 +1,149 @@
+import atexit
+import json
+import os
+import threading
+import time
+from framing import read_varint
+from log_writer import log
+
+# reserved command number: ++102++ answers with the summary below,
+# ++102+true:bool++ also starts the counters again
+STATS_COMMAND = 102
+
+# upper bounds of the latency buckets in milliseconds (the last one is open)
+BUCKETS_MS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+PHASES = ('parse', 'execute', 'respond')
+PHASE_KEYS = {'parse': 'p', 'execute': 'x', 'respond': 'r'}
+
+
+def peek_command_number(command):
+    # best effort, for frames that failed to parse
+    try:
+        if isinstance(command, bytes):
+            return read_varint(command, 0)[0]
+        body = command.strip().strip("++")
+        return int(body.split('+', 1)[0])
+    except ValueError:
+        return None
+
+
+def bucket_index(ms):
+    for index, bound in enumerate(BUCKETS_MS):
+        if ms <= bound:
+            return index
+    return len(BUCKETS_MS)
+
+
+def percentile(histogram, fraction):
+    # upper bound of the bucket holding the given share of the samples
+    total = sum(histogram)
+    if not total:
+        return 0
+    seen = 0
+    for index, count in enumerate(histogram):
+        seen += count
+        if seen >= total * fraction:
+            return BUCKETS_MS[index] if index < len(BUCKETS_MS) else float('inf')
+    return float('inf')
+
+
+def format_ms(value):
+    return 'inf' if value == float('inf') else f"{value:g}"
+
+
+class CommandStats:
+    # Counters per command number, updated by UARTCommand from the listener
+    # and the workers. Frames whose number cannot be read are counted under
+    # None. Every dump_interval seconds the counters are appended as one
+    # JSON line to logs/stats.jsonl.
+    def __init__(self, log_dir='logs', dump_interval=300):
+        self.path = os.path.join(log_dir, 'stats.jsonl')
+        self.dump_interval = dump_interval
+        self.lock = threading.Lock()
+        self.since = time.time()
+        self.commands = {}
+        self.thread = None
+
+    def entry(self, command_number):
+        # caller holds the lock
+        entry = self.commands.get(command_number)
+        if entry is None:
+            entry = {'calls': 0, 'errors': 0, 'parse_failures': 0, 'bytes_in': 0, 'bytes_out': 0}
+            for phase in PHASES:
+                entry[phase] = [0] * (len(BUCKETS_MS) + 1)
+            self.commands[command_number] = entry
+        return entry
+
+    def received(self, command_number, size, parse_seconds, parsed=True):
+        with self.lock:
+            entry = self.entry(command_number)
+            entry['calls'] += 1
+            entry['bytes_in'] += size
+            entry['parse'][bucket_index(parse_seconds * 1000)] += 1
+            if not parsed:
+                entry['parse_failures'] += 1
+
+    def executed(self, command_number, seconds, failed=False):
+        with self.lock:
+            entry = self.entry(command_number)
+            entry['execute'][bucket_index(seconds * 1000)] += 1
+            if failed:
+                entry['errors'] += 1
+
+    def responded(self, command_number, size, seconds=None):
+        with self.lock:
+            entry = self.entry(command_number)
+            entry['bytes_out'] += size
+            if seconds is not None:
+                entry['respond'][bucket_index(seconds * 1000)] += 1
+
+    def summary(self):
+        # one item per command: calls/errors/parse failures, bytes in/out and
+        # p50/p95 per phase in ms, e.g. "5 c=120/2/1 io=10240/1500 p=0.1/0.2 x=10/20 r=0.5/1"
+        with self.lock:
+            items = []
+            for command_number, entry in sorted(self.commands.items(), key=lambda item: (item[0] is None, item[0] or 0)):
+                phases = ' '.join(
+                    "{}={}/{}".format(PHASE_KEYS[phase],
+                                      format_ms(percentile(entry[phase], 0.5)),
+                                      format_ms(percentile(entry[phase], 0.95)))
+                    for phase in PHASES if any(entry[phase]))
+                items.append("{} c={}/{}/{} io={}/{} {}".format(
+                    '?' if command_number is None else command_number,
+                    entry['calls'], entry['errors'], entry['parse_failures'],
+                    entry['bytes_in'], entry['bytes_out'], phases).rstrip())
+            seconds = int(time.time() - self.since)
+        return "{}s; {}".format(seconds, "; ".join(items)) if items else "{}s; no commands".format(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.commands = {}
+            self.since = time.time()
+
+    def dump(self):
+        with self.lock:
+            record = {
+                'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'since': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.since)),
+                'buckets_ms': BUCKETS_MS,
+                'commands': {str(number): {key: list(value) if isinstance(value, list) else value
+                                           for key, value in entry.items()}
+                             for number, entry in self.commands.items()},
+            }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            log("Failed to write command stats: {}", 'ERROR', e)
+
+    def start(self):
+        if self.thread is None and self.dump_interval:
+            self.thread = threading.Thread(target=self.dump_periodically, name='command-stats', daemon=True)
+            self.thread.start()
+            atexit.register(self.dump)
+
+    def dump_periodically(self):
+        while True:
+            time.sleep(self.dump_interval)
+            self.dump()
@@ -0,0 +1,197 @@
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from log_writer import log
+
+
+class EditedFile:
+    # Lines of one file kept in memory together with the byte offset of
+    # every line on disk. Only the lines from dirty_from onwards differ from
+    # the disk, so a flush seeks there and rewrites the tail (for appends
+    # that is just the new lines). The mtime and size seen on disk are kept
+    # so a change made by someone else is noticed before the offsets are trusted.
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.lines = f.readlines()
+            self.stamp = self.stat(f.fileno())
+        self.offsets = [0]
+        for line in self.lines:
+            self.offsets.append(self.offsets[-1] + len(line))
+        self.dirty_from = None
+        self.pending = 0
+
+    def stat(self, target=None):
+        try:
+            st = os.stat(self.path if target is None else target)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def changed_on_disk(self):
+        return self.stat() != self.stamp
+
+    def touch(self, index):
+        if self.dirty_from is None or index < self.dirty_from:
+            self.dirty_from = index
+        self.pending += 1
+
+    def append(self, line):
+        self.touch(len(self.lines))
+        self.lines.append(line)
+
+    def insert(self, index, line):
+        self.touch(index)
+        self.lines.insert(index, line)
+
+    def set(self, index, line):
+        self.touch(index)
+        self.lines[index] = line
+
+    def replace_all(self, line):
+        self.touch(0)
+        self.lines = [line]
+
+    def flush(self):
+        if self.dirty_from is None:
+            return False
+        exists = os.path.exists(self.path)
+        start = min(self.dirty_from, len(self.offsets) - 1) if exists else 0
+        if self.changed_on_disk():
+            # the file changed under us: the offsets are stale, write it all
+            log(f"{self.path} changed on disk, rewriting it whole", 'WARNING')
+            start = 0
+        position = self.offsets[start]
+        with open(self.path, 'r+b' if exists else 'wb') as f:
+            f.seek(position)
+            f.write(b''.join(self.lines[start:]))
+            f.truncate()
+            f.flush()
+            self.stamp = self.stat(f.fileno())
+        del self.offsets[start + 1:]
+        for line in self.lines[start:]:
+            position += len(line)
+            self.offsets.append(position)
+        self.dirty_from = None
+        self.pending = 0
+        return True
+
+
+class FileEditor:
+    # Edits for manage_file (command 5) are applied to cached EditedFile
+    # objects and written back in batches: after idle_delay seconds without
+    # edits, after max_pending edits to one file, or on flush().
+    def __init__(self, idle_delay=2.0, max_pending=500, max_open=8):
+        self.idle_delay = idle_delay
+        self.max_pending = max_pending
+        self.max_open = max_open
+        self.files = OrderedDict()
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.last_edit = 0
+        self.thread = None
+
+    def get(self, path):
+        # caller holds the lock
+        edited = self.files.get(path)
+        if edited is not None and edited.dirty_from is None and edited.changed_on_disk():
+            # changed by someone else since it was cached: read it again
+            del self.files[path]
+            edited = None
+        if edited is None:
+            if not os.path.exists(path):
+                with open(path, 'w'):
+                    pass
+                log(f"Created empty file: {path}", 'INFO')
+            edited = EditedFile(path)
+            log(f"Read {len(edited.lines)} lines from file: {path}", 'INFO')
+            self.files[path] = edited
+            while len(self.files) > self.max_open:
+                _, oldest = self.files.popitem(last=False)
+                self.write(oldest)
+        else:
+            self.files.move_to_end(path)
+        return edited
+
+    def edit(self, path, mode, data, line_number):
+        # same line semantics as the previous readlines()/writelines() code
+        line = (data + '\n').encode()
+        with self.lock:
+            edited = self.get(path)
+            lines = edited.lines
+            if mode == 'nstring':
+                if line_number == -1:
+                    edited.insert(0, line)
+                elif 1 <= line_number < len(lines):
+                    edited.insert(line_number, line)
+                else:
+                    edited.append(line)
+            elif mode == 'sstring':
+                if not lines or not (-1 <= line_number <= len(lines)):
+                    edited.append(line)
+                else:
+                    index = {0: len(lines) - 1, -1: 0}.get(line_number, line_number - 1)
+                    edited.set(index, lines[index].rstrip(b'\n') + line)
+            elif mode == 'rstring':
+                if 1 <= line_number <= len(lines):
+                    edited.set(line_number - 1, line)
+                else:
+                    edited.append(line)
+            elif mode == 'replace':
+                edited.replace_all(line)
+            else:
+                raise ValueError(f"Unsupported mode: {mode}")
+
+            if edited.pending >= self.max_pending:
+                self.write(edited)
+            self.last_edit = time.monotonic()
+            self.start()
+            self.changed.notify()
+
+    def remove(self, path):
+        with self.lock:
+            self.files.pop(path, None)
+
+    def flush(self, path=None):
+        with self.lock:
+            if path is None:
+                targets = list(self.files.values())
+            else:
+                targets = [self.files[path]] if path in self.files else []
+            return sum(self.write(edited) for edited in targets)
+
+    def write(self, edited):
+        try:
+            written = edited.flush()
+        except OSError as e:
+            log(f"Failed to write {edited.path}: {e}", 'ERROR')
+            raise
+        if written:
+            log(f"Flushed changes to file: {edited.path}", 'DEBUG')
+        return written
+
+    def start(self):
+        # caller holds the lock
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.flush_when_idle, name='file-editor', daemon=True)
+            self.thread.start()
+            atexit.register(self.flush)
+
+    def flush_when_idle(self):
+        with self.lock:
+            while True:
+                dirty = [edited for edited in self.files.values() if edited.dirty_from is not None]
+                if not dirty:
+                    self.changed.wait()
+                    continue
+                idle = time.monotonic() - self.last_edit
+                if idle < self.idle_delay:
+                    self.changed.wait(self.idle_delay - idle)
+                    continue
+                for edited in dirty:
+                    try:
+                        self.write(edited)
+                    except OSError:
+                        edited.dirty_from = None  # already logged, do not retry forever
@@ -0,0 +1,251 @@
+import binascii
+import re
+import time
+
+FRAME_DELIMITER = b'++'
+WHITESPACE = b' \t\r\n'
+
+# Binary frame: sync word, varint body length, header CRC16, body, CRC16.
+# body = varint command number, then per argument a type tag and its value.
+# Both CRCs are CCITT, init 0xFFFF, big endian; the header CRC covers the
+# length field, the last one the length field and the body. A frame whose
+# header checks out is waited for until it is complete (or the partial
+# command timeout drops it), whatever its body looks like.
+SYNC = b'\xa5\x5a'
+MAX_BODY = 4096
+
+# reserved command number: args are a stop-on-error flag and the bodies of
+# the sub-commands (see UARTCommand.run_batch)
+BATCH_COMMAND = 100
+
+TAG_STR = 0
+TAG_INT = 1
+TAG_FALSE = 2
+TAG_TRUE = 3
+TAG_BYTES = 4
+
+# a complete text command ("++5+a:str++"), where resynchronising may stop
+TEXT_FRAME = re.compile(rb'\+\+[0-9]+[ -~]*?\+\+')
+TEXT_FRAME_START = re.compile(rb'\+\+([0-9]+[ -~]*)?')  # what may still become one
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def read_varint(data, pos):
+    # returns (value, next position), or (None, pos) if data ends first
+    value = 0
+    shift = 0
+    end = len(data)
+    while pos < end:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+        if shift > 63:
+            raise ValueError("Varint too long")
+    return None, pos
+
+
+def encode_binary_command(command_number, args):
+    return encode_binary_frame(encode_binary_body(command_number, args))
+
+
+def encode_binary_batch(commands, stop_on_error=True):
+    # commands: (command_number, args) pairs, sent as one BATCH_COMMAND frame
+    bodies = [encode_binary_body(command_number, args) for command_number, args in commands]
+    return encode_binary_command(BATCH_COMMAND, [stop_on_error] + bodies)
+
+
+def encode_binary_body(command_number, args):
+    body = bytearray(encode_varint(command_number))
+    for arg in args:
+        if isinstance(arg, bool):
+            body.append(TAG_TRUE if arg else TAG_FALSE)
+        elif isinstance(arg, int):
+            body.append(TAG_INT)
+            body += encode_varint((arg << 1) ^ (arg >> 63))  # zigzag, small negatives stay short
+        elif isinstance(arg, str):
+            raw = arg.encode('utf-8')
+            body.append(TAG_STR)
+            body += encode_varint(len(raw)) + raw
+        elif isinstance(arg, (bytes, bytearray)):
+            body.append(TAG_BYTES)
+            body += encode_varint(len(arg)) + arg
+        else:
+            raise ValueError("Unsupported argument type: {}".format(type(arg).__name__))
+    return bytes(body)
+
+
+def encode_binary_frame(body):
+    header = encode_varint(len(body))
+    header_crc = binascii.crc_hqx(header, 0xffff)
+    crc = binascii.crc_hqx(header + body, 0xffff)
+    return SYNC + header + header_crc.to_bytes(2, 'big') + bytes(body) + crc.to_bytes(2, 'big')
+
+
+def decode_binary_command(body):
+    command_number, pos = read_varint(body, 0)
+    if command_number is None:
+        raise ValueError("Truncated binary command")
+    args = []
+    end = len(body)
+    while pos < end:
+        tag = body[pos]
+        pos += 1
+        if tag == TAG_TRUE or tag == TAG_FALSE:
+            args.append(tag == TAG_TRUE)
+            continue
+        if pos < end and body[pos] < 0x80:  # one-byte varint, the common case
+            value = body[pos]
+            pos += 1
+        else:
+            value, pos = read_varint(body, pos)
+            if value is None:
+                raise ValueError("Truncated binary argument")
+        if tag == TAG_INT:
+            args.append((value >> 1) ^ -(value & 1))
+        elif tag == TAG_STR or tag == TAG_BYTES:
+            if pos + value > end:
+                raise ValueError("Truncated binary argument")
+            raw = body[pos:pos + value]
+            args.append(raw.decode('utf-8') if tag == TAG_STR else bytes(raw))
+            pos += value
+        else:
+            raise ValueError("Unsupported type tag: {}".format(tag))
+    return command_number, args
+
+
+class FrameDecoder:
+    # Splits the incoming byte stream into frames: "++...++" text frames are
+    # returned as str, binary frames (see SYNC above) as the bytes of their
+    # body. Bytes are accumulated in one bytearray and the delimiter search
+    # resumes where the previous one stopped, so text is scanned only once.
+    def __init__(self, timeout=10):
+        self.buffer = bytearray()
+        self.timeout = timeout  # seconds a partial command may stay incomplete
+        self.scan_pos = 0
+        self.partial_since = None
+        self.crc_errors = 0
+        self.discarding = False  # skipping the rest of a corrupted binary frame
+
+    def feed(self, data, now=None):
+        frames = []
+        if not data:
+            return frames
+        if now is None:
+            now = time.monotonic()
+
+        buffer = self.buffer
+        buffer += data
+        end = len(buffer)
+        start = 0  # start of the segment being decoded
+        while True:
+            if self.discarding:
+                start = self.skip_corrupted(buffer, start)
+                if self.discarding:
+                    break
+            while start < end and buffer[start] in WHITESPACE:  # gap between two frames
+                start += 1
+            if start == end:
+                break
+            if buffer[start] == SYNC[0] and buffer[start + 1:start + 2] != SYNC[1:]:
+                pass  # plain text that happens to start with the first sync byte
+            elif buffer[start] == SYNC[0]:
+                frame_end = self.read_binary(buffer, start, frames)
+                if frame_end is None:
+                    break  # wait for the rest of the frame
+                start = frame_end
+                continue
+
+            pos = buffer.find(FRAME_DELIMITER, max(self.scan_pos, start))
+            if pos == -1:
+                # a trailing '+' may be the first half of the next delimiter
+                self.scan_pos = max(end - len(FRAME_DELIMITER) + 1, start)
+                break
+            segment = buffer[start:pos].decode('utf-8', errors='ignore')
+            if segment.strip():
+                frames.append(segment)
+            start = pos + len(FRAME_DELIMITER)
+
+        if start:
+            del buffer[:start]
+            self.scan_pos = max(self.scan_pos - start, 0)
+            self.partial_since = None
+
+        if not buffer.strip(WHITESPACE):
+            discarding = self.discarding
+            self.reset()
+            self.discarding = discarding  # the rest of a damaged frame may still follow
+        elif self.partial_since is None:
+            self.partial_since = now
+        return frames
+
+    def read_binary(self, buffer, start, frames):
+        # returns the position after the frame, or None if it is incomplete
+        if len(buffer) - start < len(SYNC) + 1:
+            return None
+        try:
+            length, header_end = read_varint(buffer, start + len(SYNC))
+        except ValueError:
+            length, header_end = MAX_BODY + 1, start + len(SYNC)  # a runaway varint, damaged
+        if length is None or (length <= MAX_BODY and len(buffer) < header_end + 2):
+            return None
+        header_crc = binascii.crc_hqx(bytes(buffer[start + len(SYNC):header_end]), 0xffff)
+        if length > MAX_BODY or header_crc != int.from_bytes(buffer[header_end:header_end + 2], 'big'):
+            # the announced length cannot be trusted: drop only the sync
+            # byte and resynchronise on the next sync word or delimiter,
+            # so frames behind it are not lost
+            self.crc_errors += 1
+            self.discarding = True
+            return start + 1
+        body_start = header_end + 2
+        frame_end = body_start + length + 2
+        if len(buffer) < frame_end:
+            return None
+        crc = binascii.crc_hqx(bytes(buffer[start + len(SYNC):header_end] + buffer[body_start:frame_end - 2]), 0xffff)
+        if crc != int.from_bytes(buffer[frame_end - 2:frame_end], 'big'):
+            self.crc_errors += 1  # damaged body, the length is good: skip the whole frame
+        else:
+            frames.append(bytes(buffer[body_start:frame_end - 2]))
+        return frame_end
+
+    def skip_corrupted(self, buffer, start):
+        # returns the position of the next sync word or text command; a '++'
+        # that does not start a command is part of the damaged frame
+        pos = start
+        while True:
+            found = [found for found in (buffer.find(SYNC, pos), buffer.find(FRAME_DELIMITER, pos)) if found != -1]
+            if not found:
+                return max(len(buffer) - 1, start, pos)  # the last byte may start either marker
+            pos = min(found)
+            if buffer[pos] == SYNC[0] or TEXT_FRAME.match(buffer, pos):
+                self.discarding = False
+                return pos
+            if TEXT_FRAME_START.fullmatch(buffer, pos):
+                return pos  # may be a command still arriving
+            pos += 1
+
+    def expired(self, now=None):
+        if self.partial_since is None:
+            return False
+        if now is None:
+            now = time.monotonic()
+        return now - self.partial_since >= self.timeout
+
+    def pending(self):
+        return len(self.buffer)
+
+    def reset(self):
+        self.buffer.clear()
+        self.scan_pos = 0
+        self.partial_since = None
+        self.discarding = False
@@ -0,0 +1,146 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import threading
+from log_writer import log
+
+CAPTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'camera', 'capture')
+
+
+def capture(cameras, output_folder, width, height, camera_index, mode, depth):
+    # same checks as capture.py run from the command line
+    import capture as capture_script
+    if not os.path.exists(output_folder):
+        print("Error: Output folder does not exist.")
+        return False
+    if mode not in ["color", "black"]:
+        print("Error: Invalid mode specified.")
+        return False
+    path = capture_script.capture_image(output_folder, (int(width), int(height)), int(camera_index), mode, int(depth),
+                                        cameras)
+    return path is not None
+
+
+def capture_pix(cameras, output_folder, width, height, camera_index, keep_jpeg=False, packed=False,
+                level_count=10, dither='none'):
+    # camera frame straight to .pix, see capture.capture_pix
+    import capture as capture_script
+    if not os.path.exists(output_folder):
+        print("Error: Output folder does not exist.")
+        return False
+    path = capture_script.capture_pix(output_folder, (int(width), int(height)), int(camera_index), keep_jpeg, packed,
+                                      int(level_count), dither, cameras)
+    return path is not None
+
+
+def resend_rows(cameras, pix_path, rows, block_rows=1):
+    # the given rows of a .pix as a row-checked stream (pixcheck.py), base64 so it fits an answer line
+    import base64
+    import pixcheck
+    import pixcodec
+    levels, level_count = pixcodec.read_pix_info(pix_path)
+    stream = pixcheck.encode_stream(levels, level_count, int(block_rows), pixcheck.parse_rows(rows))
+    print(base64.b64encode(stream).decode())
+    return True
+
+
+def convert(cameras, source, save, packed=False, level_count=10, dither='none'):
+    import pointillism
+    pointillism.main(source, save, packed, int(level_count), dither)
+    return True
+
+
+METHODS = {
+    'capture': capture,
+    'capture_pix': capture_pix,
+    'convert': convert,
+    'resend_rows': resend_rows,
+}
+
+
+def serve(conn, capture_dir):
+    # runs in the worker process: cv2 and PIL are imported once and the
+    # cameras stay open between calls
+    sys.path.insert(0, capture_dir)
+    for module in ('capture', 'pointillism'):
+        try:
+            __import__(module)
+        except ImportError:
+            pass  # reported by the call that needs it
+    cameras = {}
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        method, args = request
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                ok = METHODS[method](cameras, *args)
+            conn.send((ok, output.getvalue()))
+        except Exception as e:
+            conn.send((False, "{}{}: {}".format(output.getvalue(), type(e).__name__, e)))
+    for cap, _ in cameras.values():
+        cap.release()
+
+
+class ImagingWorker:
+    # Long-lived process for capture.py/pointillism.py, called over a pipe.
+    # A dead worker is restarted on the next call.
+    def __init__(self, capture_dir=CAPTURE_DIR, timeout=120):
+        self.capture_dir = os.path.abspath(capture_dir)
+        self.timeout = timeout
+        self.context = multiprocessing.get_context('spawn')  # safe to start from a threaded parent
+        self.lock = threading.Lock()
+        self.process = None
+        self.conn = None
+
+    def start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=serve, args=(child_conn, self.capture_dir),
+                                            name='imaging-worker', daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        log("Imaging worker started with pid {}", 'INFO', self.process.pid)
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def call(self, method, *args):
+        # returns (ok, text printed by the script)
+        with self.lock:
+            if self.process is None or not self.process.is_alive():
+                if self.process is not None:
+                    log("Imaging worker exited with code {}, restarting", 'WARNING', self.process.exitcode)
+                self.restart()
+            try:
+                self.conn.send((method, args))
+                if not self.conn.poll(self.timeout):
+                    raise TimeoutError("no answer in {} s".format(self.timeout))
+                return self.conn.recv()
+            except (EOFError, OSError, TimeoutError) as e:
+                log("Imaging worker failed during {}: {}", 'ERROR', method, e)
+                self.restart()
+                return False, "Imaging worker failed: {}".format(e)
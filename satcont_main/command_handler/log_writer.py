@@ -0,0 +1,162 @@
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+
+class LogWriter:
+    # Background writer for the day log files ("logs/YYYY-MM-DD.log").
+    # Callers only enqueue the message; a single thread keeps the day file
+    # open, batches lines and flushes them by size or by interval.
+    def __init__(self, log_dir='logs', level='INFO', flush_size=8192, flush_interval=1.0, echo=True):
+        self.log_dir = log_dir
+        self.threshold = LEVELS[level]
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.echo = echo
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.start_lock = threading.Lock()
+        self.file = None
+        self.day = None
+        self.second = None
+        self.timestamp = ''
+
+    def set_level(self, level):
+        self.threshold = LEVELS[level]
+
+    def write(self, level, message):
+        if self.thread is None:
+            self.start()
+        self.queue.put((time.time(), level, message))
+
+    def start(self):
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='log-writer', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+
+    def flush(self, timeout=5):
+        # blocks until everything queued so far is on disk
+        if self.thread is None:
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout=5):
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def run(self):
+        lines = []
+        size = 0
+        last_flush = time.monotonic()
+        while True:
+            wait = None
+            if lines:
+                wait = max(self.flush_interval - (time.monotonic() - last_flush), 0)
+            try:
+                item = self.queue.get(timeout=wait)
+            except queue.Empty:
+                item = ()
+
+            if item is None or isinstance(item, threading.Event):
+                try:
+                    self.write_lines(lines)
+                    if item is None:
+                        self.close_file()
+                except Exception as e:
+                    self.report(e)
+                lines, size, last_flush = [], 0, time.monotonic()
+                if item is None:
+                    return
+                item.set()
+                continue
+
+            # a full SD card or a bad message costs that record only, the
+            # thread keeps draining the queue (open_day is retried next time)
+            try:
+                if item:
+                    created, level, message = item
+                    day = self.format_time(created)
+                    if day != self.day:
+                        # day rollover: finish the old file before opening the new one
+                        self.write_lines(lines)
+                        lines, size = [], 0
+                        self.open_day(day)
+                    line = f'[{self.timestamp}] [{level}] {message}\n'
+                    lines.append(line)
+                    size += len(line)
+
+                if size >= self.flush_size or (lines and time.monotonic() - last_flush >= self.flush_interval):
+                    self.write_lines(lines)
+                    lines, size, last_flush = [], 0, time.monotonic()
+            except Exception as e:
+                self.report(e)
+
+    def report(self, error):
+        try:
+            sys.stderr.write(f'log writer error: {error!r}\n')
+        except Exception:
+            pass
+
+    def format_time(self, created):
+        # strftime once per second is enough for the log resolution
+        second = int(created)
+        if second != self.second:
+            self.second = second
+            self.timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(second))
+        return self.timestamp[:10]
+
+    def open_day(self, day):
+        self.close_file()
+        os.makedirs(self.log_dir, exist_ok=True)
+        self.file = open(os.path.join(self.log_dir, day + '.log'), 'a')  # filename forming "YYYY-MM-DD.log"
+        self.day = day
+
+    def write_lines(self, lines):
+        if not lines:
+            return
+        text = ''.join(lines)
+        try:
+            self.file.write(text)
+            self.file.flush()
+        except (OSError, ValueError, AttributeError) as e:
+            sys.stderr.write(f'log write failed: {e}\n')
+        if self.echo:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.day = None
+
+
+writer = LogWriter()
+
+
+def log(message, level='INFO', *args):
+    # below-threshold messages are dropped before any formatting happens
+    if LEVELS.get(level, LEVELS['INFO']) < writer.threshold:
+        return
+    if args:
+        message = message.format(*args)
+    writer.write(level, message)
+
+
+def set_log_level(level):
+    writer.set_level(level)
+
+
+def flush_log():
+    writer.flush()
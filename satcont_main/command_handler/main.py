@@ -1,11 +1,19 @@
 import argparse
 import threading
-from uart_command import UARTCommand, log, verbose_logging, get_full_port_name
+from uart_command import UARTCommand, log, set_verbose, get_full_port_name
 import serial
 import os
 import json
-import subprocess
 import hashlib
+from imaging_worker import ImagingWorker
+from file_editor import FileEditor
+
+# capture.py and pointillism.py run in one resident process, started in __main__
+imaging = ImagingWorker()
+
+# manage_file edits are cached per path and written back on idle or by command 6
+editor = FileEditor()
+EDIT_MODES = ('nstring', 'sstring', 'rstring', 'replace')
 
 def test1(arg1, arg2, arg3):
     log(f"parsed arguments: {arg1} {arg2} {arg3}", 'INFO')
@@ -16,46 +24,83 @@ def test2(device_name):
     return f"device_name: {device_name}"
 
 def execute_capture_command(arg1, arg2, arg3, arg4, arg5, arg6):
-    command = ["python3", "/home/sky/satcont_main/camera/capture/capture.py", arg1, arg2, arg3, arg4, arg5, arg6]
+    command = ["capture", arg1, arg2, arg3, arg4, arg5, arg6]
     log(f"Executing capture command: {' '.join(command)}", 'INFO')
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            log(f"[EXTERNAL] {result.stdout}", 'INFO')
-            return result.stdout.strip()
+        ok, output = imaging.call("capture", arg1, arg2, arg3, arg4, arg5, arg6)
+        if ok:
+            log(f"[EXTERNAL] {output}", 'INFO')
         else:
-            log(f"[EXTERNAL] {result.stderr}", 'ERROR')
-            return result.stderr.strip()
+            log(f"[EXTERNAL] {output}", 'ERROR')
+        return output.strip()
     except Exception as e:
         log(f"[EXTERNAL] Error executing capture command: {e}", 'ERROR')
         return str(e)
 
-def pic2point(source, save):
-    command = ["python3", "/home/sky/satcont_main/camera/capture/pointillism.py", source, save]
+def pic2point(source, save, packed: bool = False, levels: int = 10, dither: str = 'none'):
+    # packed=True writes the 4-bit binary .pix (see pixcodec.py); levels 2-16
+    # with dither none/ordered/diffusion trades image bytes for gray levels
+    command = ["convert", source, save] + (["--packed"] if packed else []) + ["--levels", str(levels), "--dither", dither]
     log(f"Executing converting: {' '.join(command)}", 'INFO')
     try:
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        if result.returncode == 0:
-            output_path = result.stdout.strip()
-            log(f"[EXTERNAL] {output_path}", 'INFO')
-            if os.path.exists(output_path):
-                data = {"converted_file": output_path}
-                json_file_path = "/home/sky/capture/pointed/ptconv.json"
-                os.makedirs(os.path.dirname(json_file_path), exist_ok=True)
-                with open(json_file_path, 'w') as json_file:
-                    json.dump(data, json_file, indent=4)
-                log(f"Path {output_path} written to {json_file_path}", 'INFO')
-                return json_file_path
-            else:
-                log(f"not exist: {output_path}", 'WARNING')
-                return "Output path does not exist"
+        ok, output = imaging.call("convert", source, save, packed, levels, dither)
+        if ok:
+            return write_conversion_json(output.strip())
         else:
-            log(f"[EXTERNAL] {result.stderr}", 'ERROR')
-            return result.stderr.strip()
+            log(f"[EXTERNAL] {output}", 'ERROR')
+            return output.strip()
     except Exception as e:
         log(f"[EXTERNAL] Error executing converting command: {e}", 'ERROR')
         return str(e)
 
+def write_conversion_json(output_path):
+    # pictrans.py sends the file named in ptconv.json
+    log(f"[EXTERNAL] {output_path}", 'INFO')
+    if os.path.exists(output_path):
+        data = {"converted_file": output_path}
+        json_file_path = "/home/sky/capture/pointed/ptconv.json"
+        os.makedirs(os.path.dirname(json_file_path), exist_ok=True)
+        with open(json_file_path, 'w') as json_file:
+            json.dump(data, json_file, indent=4)
+        log(f"Path {output_path} written to {json_file_path}", 'INFO')
+        return json_file_path
+    else:
+        log(f"not exist: {output_path}", 'WARNING')
+        return "Output path does not exist"
+
+def capture_pix(save, width, height, camera_index, keep_jpeg: bool = False, packed: bool = False,
+                levels: int = 10, dither: str = 'none'):
+    # capture and pic2point in one step, without the JPEG round-trip
+    log(f"Capturing straight to PIX: {save} {width}x{height} camera {camera_index} {levels} levels", 'INFO')
+    try:
+        ok, output = imaging.call("capture_pix", save, width, height, camera_index, keep_jpeg, packed, levels, dither)
+        if ok:
+            # the last printed line is the .pix path, a kept JPEG comes before it
+            return write_conversion_json(output.strip().splitlines()[-1])
+        else:
+            log(f"[EXTERNAL] {output}", 'ERROR')
+            return output.strip()
+    except Exception as e:
+        log(f"[EXTERNAL] Error executing capture_pix command: {e}", 'ERROR')
+        return str(e)
+
+def resend_rows(rows, block_rows: int = 1):
+    # rows of the last converted frame ("3,17,20-25", as printed by the ground
+    # receiver) again, as a row-checked stream; rowcheck.py on the ground puts them in place
+    try:
+        with open("/home/sky/capture/pointed/ptconv.json", 'r') as json_file:
+            pix_path = json.load(json_file)["converted_file"]
+        log(f"Resending rows {rows} of {pix_path}", 'INFO')
+        ok, output = imaging.call("resend_rows", pix_path, rows, block_rows)
+        if ok:
+            return "PIXC " + output.strip()
+        else:
+            log(f"[EXTERNAL] {output}", 'ERROR')
+            return output.strip()
+    except Exception as e:
+        log(f"[EXTERNAL] Error executing resend_rows command: {e}", 'ERROR')
+        return str(e)
+
 def manage_file(path, data, mode, hash_check, line_number=0):
     log(f"Managing file: {path}", 'INFO')
 
@@ -72,6 +117,7 @@ def manage_file(path, data, mode, hash_check, line_number=0):
 
     # Удаление файла, если mode == 'remove'
     if mode == 'remove':
+        editor.remove(path)
         if os.path.exists(path):
             os.remove(path)
             log(f"Removed file: {path}", 'INFO')
@@ -79,79 +125,35 @@ def manage_file(path, data, mode, hash_check, line_number=0):
             log(f"File does not exist: {path}", 'WARNING')
         return "File removed"
 
-    # Проверка существования файла
-    if not os.path.exists(path):
-        with open(path, 'w') as f:
-            pass
-        log(f"Created empty file: {path}", 'INFO')
-
-    # Чтение текущего содержимого файла
-    with open(path, 'r') as f:
-        lines = f.readlines()
-    
-    log(f"Read {len(lines)} lines from file: {path}", 'INFO')
-
-    # Выполнение операций над содержимым файла
-    if mode == 'nstring':
-        if line_number == 0:
-            lines.append(data + '\n')
-        elif line_number == -1:
-            lines.insert(0, data + '\n')
-        elif 1 <= line_number <= len(lines):
-            lines.insert(line_number, data + '\n')
-        else:
-            lines.append(data + '\n')
-        log(f"Added new string to file: {path}", 'INFO')
-
-    elif mode == 'sstring':
-        if line_number == 0:
-            if lines:
-                lines[-1] = lines[-1].rstrip('\n') + data + '\n'
-            else:
-                lines.append(data + '\n')
-        elif line_number == -1:
-            if lines:
-                lines[0] = lines[0].rstrip('\n') + data + '\n'
-            else:
-                lines.append(data + '\n')
-        elif 1 <= line_number <= len(lines):
-            lines[line_number - 1] = lines[line_number - 1].rstrip('\n') + data + '\n'
-        else:
-            lines.append(data + '\n')
-        log(f"Appended data to line {line_number} in file: {path}", 'INFO')
-
-    elif mode == 'rstring':
-        if 1 <= line_number <= len(lines):
-            lines[line_number - 1] = data + '\n'
-        else:
-            lines.append(data + '\n')
-        log(f"Replaced data in line {line_number} in file: {path}", 'INFO')
-
-    elif mode == 'replace':
-        lines = [data + '\n']
-        log(f"Replaced all content in file: {path}", 'INFO')
-
-    else:
+    if mode not in EDIT_MODES:
         log(f"Unsupported mode: {mode}", 'ERROR')
         return "Unsupported mode"
 
-    # Запись изменений в файл
-    with open(path, 'w') as f:
-        f.writelines(lines)
-
+    # Изменения копятся в памяти и записываются пачкой (см. file_editor.py)
+    editor.edit(path, mode, data, line_number)
     log(f"Operation {mode} performed on file {path}", 'INFO')
     return "success"
 
+def flush_files(path):
+    # "*" flushes every cached file
+    flushed = editor.flush(None if path == '*' else path)
+    log(f"Flushed {flushed} file(s) for {path}", 'INFO')
+    return f"flushed {flushed}"
+
 if __name__ == "__main__":
     # arg parser
     parser = argparse.ArgumentParser(description="UART Command Execution")
     parser.add_argument('--verbose', action='store_true', help="Enable detailed logging")
     parser.add_argument('--port', type=int, required=True, help="UART port number")
     parser.add_argument('--baudrate', type=int, required=True, help="UART baud rate")
+    parser.add_argument('--workers', type=int, default=2, help="Worker threads for commands that release the port")
     args = parser.parse_args()
 
-    # use --verbose to activate verbose logging
-    verbose_logging = args.verbose
+    # use --verbose to activate verbose logging (DEBUG messages are dropped otherwise)
+    set_verbose(args.verbose)
+
+    # start the imaging worker now, so cv2/PIL are loaded before the first capture
+    imaging.start()
 
     # got port name
     full_port_name = get_full_port_name(args.port)
@@ -163,11 +165,13 @@ if __name__ == "__main__":
     ser.write("started\n".encode())
 
     # port setup (number and baudrate)
-    uart = UARTCommand(port=args.port, baudrate=args.baudrate)
+    uart = UARTCommand(port=args.port, baudrate=args.baudrate, max_workers=args.workers)
     
     # Commands: command number
     # add_command takes the command number (used to check for arguments), 
     # the name of the executable function, and the need to release the port for function execution.
+    # Commands that release the port run in a worker pool (max_concurrency runs of each at a time)
+    # and answer "Queued[seq]: N" first, then "Response[seq]: ..." once they finish.
     # The command is called using the following format:
     # ++command_number+arg1:type+arg2:type+arg3:type
     # Example:
@@ -175,12 +179,29 @@ if __name__ == "__main__":
     # You can change the verbose logging value to True inside uart_command.py if you need to debug the code.
     # Note: that the error log processing and output for parsing and command processing are provided, although they are not perfect.
     # ++5+/home/sky/test123.txt:str+12345ahahahaha:str+remove:str+d21:str+3:int++
+    # ++6+*:str++ writes all pending manage_file edits to disk right away
+    # ++7+/home/sky/capture/pointed:str+1280:str+720:str+4:str++ captures straight to .pix
+    # (optional +true:bool keeps the JPEG, a second +true:bool writes the packed format,
+    # then +4:int+ordered:str picks 2-16 gray levels and the dithering, as pic2point takes them)
+    # ++8+3,17,20-25:str++ sends those rows of the last frame again after a pictrans.py --checked
+    # transfer, answering "Response[seq]: PIXC <base64>" (the ground receiver prints the row list)
+    # Command 100 (binary frames only) carries several commands in one frame and
+    # answers once with a status per command, e.g. "Response[7]: 0,0,1,-";
+    # success_results lists the results that count as status 0 there.
+    # Answers over 240 bytes come as "ChunkedResponse[seq]: ..." plus "Chunk[seq] i/n crc: ..."
+    # lines (see response_chunks.py); ++101+seq:int+i:int++ sends chunk i again (-1: the header).
+    # ++102++ answers with calls, errors, bytes and latencies per command
+    # (command_stats.py); the same counters go to logs/stats.jsonl every 5 minutes.
 
     uart.add_command(1, test1, release_port_during_execution=True)
     uart.add_command(2, test2, release_port_during_execution=False)
-    uart.add_command(3, execute_capture_command, release_port_during_execution=False)
-    uart.add_command(4, pic2point, release_port_during_execution=False)
-    uart.add_command(5, manage_file, release_port_during_execution=False)
+    uart.add_command(3, execute_capture_command, release_port_during_execution=True, max_concurrency=1)
+    uart.add_command(4, pic2point, release_port_during_execution=True, max_concurrency=1)
+    uart.add_command(5, manage_file, release_port_during_execution=False,
+                     success_results=("success", "File removed"))
+    uart.add_command(6, flush_files, release_port_during_execution=False)
+    uart.add_command(7, capture_pix, release_port_during_execution=True, max_concurrency=1)
+    uart.add_command(8, resend_rows, release_port_during_execution=True, max_concurrency=1)
     # parallel uart listening
     listener_thread = threading.Thread(target=uart.listen)
     listener_thread.start()
@@ -0,0 +1,65 @@
+import base64
+import binascii
+import threading
+import zlib
+from collections import OrderedDict
+
+# reserved command number: ++101+seq:int+index:int++ sends chunks of an
+# earlier chunked answer again (several indices may follow the seq);
+# index -1 is the header line
+RESEND_COMMAND = 101
+HEADER_INDEX = -1
+
+ENCODING_ZLIB = 'z'
+ENCODING_RAW = 'b'
+
+
+def chunk_crc(text):
+    return binascii.crc_hqx(text.encode('ascii'), 0xffff)
+
+
+class ResponseChunker:
+    # Answers longer than threshold bytes are sent as a header line
+    #   Chunked<Kind>[seq]: <count> <encoding> <crc32> <length>
+    # followed by count lines
+    #   Chunk[seq] <index>/<count> <crc16>: <base64 data>
+    # The payload is zlib-compressed when that makes it shorter. The last
+    # keep answers stay in memory so single chunks, or the header, can be
+    # sent again.
+    def __init__(self, threshold=240, chunk_size=192, keep=8):
+        self.threshold = threshold
+        self.chunk_size = chunk_size
+        self.keep = keep
+        self.sent = OrderedDict()
+        self.lock = threading.Lock()
+
+    def split(self, kind, message, seq):
+        # returns the lines to write, or None if the message goes out as is
+        raw = message.encode('utf-8')
+        if len(raw) <= self.threshold:
+            return None
+        packed = zlib.compress(raw, 9)
+        if len(packed) < len(raw):
+            encoding, payload = ENCODING_ZLIB, packed
+        else:
+            encoding, payload = ENCODING_RAW, raw
+        data = base64.b64encode(payload).decode('ascii')
+        pieces = [data[i:i + self.chunk_size] for i in range(0, len(data), self.chunk_size)]
+        count = len(pieces)
+        chunks = [f"Chunk[{seq}] {index}/{count} {chunk_crc(piece):04x}: {piece}"
+                  for index, piece in enumerate(pieces)]
+        header = f"Chunked{kind}[{seq}]: {count} {encoding} {zlib.crc32(raw):08x} {len(raw)}"
+        with self.lock:
+            self.sent[seq] = [header] + chunks
+            while len(self.sent) > self.keep:
+                self.sent.popitem(last=False)
+        return [header] + chunks
+
+    def get(self, seq, index):
+        with self.lock:
+            lines = self.sent.get(seq)
+        if lines is None:
+            raise ValueError(f"No chunked answer kept for [{seq}]")
+        if not HEADER_INDEX <= index < len(lines) - 1:
+            raise ValueError(f"Chunk index {index} out of range {HEADER_INDEX}-{len(lines) - 2}")
+        return lines[index + 1]
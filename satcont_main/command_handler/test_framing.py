@@ -0,0 +1,38 @@
+#python3 -m pytest test_framing.py
+
+from framing import FrameDecoder, encode_binary_command, decode_binary_command
+
+# manage_file uploading a line that holds a text command
+EMBEDDED_ARGS = ['/home/sky/a.txt', 'x = "++2+sky:str++"', 'nstring', 'abc', 3]
+
+
+def feed_bytes(decoder, data):
+    frames = []
+    for index in range(len(data)):
+        frames += decoder.feed(data[index:index + 1], now=0)
+    return frames
+
+
+def test_text_inside_a_frame_arriving_byte_by_byte():
+    decoder = FrameDecoder()
+    frames = feed_bytes(decoder, encode_binary_command(5, EMBEDDED_ARGS))
+    assert [decode_binary_command(frame) for frame in frames] == [(5, EMBEDDED_ARGS)]
+    assert decoder.crc_errors == 0
+
+
+def test_damaged_body_is_skipped_whole():
+    frame = bytearray(encode_binary_command(5, EMBEDDED_ARGS))
+    frame[-3] ^= 0xff
+    decoder = FrameDecoder()
+    frames = feed_bytes(decoder, bytes(frame) + encode_binary_command(1, ['next']) + b'++2+sky:str++')
+    assert [decode_binary_command(frames[0]), frames[1]] == [(1, ['next']), '2+sky:str']
+    assert decoder.crc_errors == 1
+
+
+def test_damaged_length_resynchronises():
+    frame = bytearray(encode_binary_command(5, ['/home/sky/a.txt', 'x = 1', 'nstring', 'abc', 3]))
+    frame[2] ^= 0x10
+    decoder = FrameDecoder()
+    frames = feed_bytes(decoder, bytes(frame) + encode_binary_command(1, ['next']))
+    assert [decode_binary_command(frame) for frame in frames] == [(1, ['next'])]
+    assert decoder.crc_errors >= 1
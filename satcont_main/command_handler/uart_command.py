@@ -3,21 +3,21 @@ import threading
 import platform
 import time
 import multiprocessing
-import datetime
-import os
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from framing import FrameDecoder, decode_binary_command, BATCH_COMMAND
+from log_writer import log, set_log_level
+from command_schema import CommandSchema
+from response_chunks import ResponseChunker, RESEND_COMMAND
+from command_stats import CommandStats, STATS_COMMAND, peek_command_number
 
 # verbose
 verbose_logging = False
 
-def log(message, level='INFO'):
-    if not os.path.exists('logs'):   # mkdir
-        os.makedirs('logs')
-    log_file = os.path.join('logs', datetime.datetime.now().strftime('%Y-%m-%d') + '.log') # filename forming "YYYY-MM-DD.log"
-    timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')  # adding timestamp
-    log_message = f'[{timestamp}] [{level}] {message}'
-    with open(log_file, 'a') as f:  # write log
-        f.write(log_message + '\n')
-    print(log_message) # print log
+def set_verbose(enabled):
+    global verbose_logging
+    verbose_logging = enabled
+    set_log_level('DEBUG' if enabled else 'INFO')
 
 def get_full_port_name(port):
     os_type = platform.system()
@@ -28,99 +28,268 @@ def get_full_port_name(port):
     else:
         raise ValueError("Unsupported OS")
 
+
+# per sub-command status codes in a batch response
+STATUS_OK = '0'
+STATUS_FAILED = '1'
+STATUS_INVALID = '2'
+STATUS_UNKNOWN = '3'
+STATUS_SKIPPED = '-'
+
+def format_sequence(seq):
+    return "" if seq is None else f"[{seq}]"
+
 class UARTCommand:
-    def __init__(self, port, baudrate):
+    def __init__(self, port, baudrate, ser=None, command_timeout=10, read_timeout=1, max_workers=2, max_queue=16,
+                 chunk_threshold=240, chunk_size=192, stats_interval=300):
         full_port_name = get_full_port_name(port)
-        self.ser = serial.Serial(full_port_name, baudrate)
+        # read_timeout bounds a blocking read so the partial-command timeout can fire
+        self.ser = ser if ser is not None else serial.Serial(full_port_name, baudrate, timeout=read_timeout)
         self.commands = {}
-        log("UART initialized with port: {} and baudrate: {}".format(full_port_name, baudrate), 'DEBUG')
+        self.decoder = FrameDecoder(timeout=command_timeout)
+        # commands that release the port run here while the listener keeps reading
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='uart-worker')
+        self.max_queue = max_queue
+        self.queue_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.queued = 0
+        self.sequence = 0
+        # long answers are compressed and split into chunks the ground can ask for again
+        self.chunker = ResponseChunker(chunk_threshold, chunk_size)
+        # per-command counters and latencies, see command 102 and logs/stats.jsonl
+        self.stats = CommandStats(dump_interval=stats_interval)
+        log("UART initialized with port: {} and baudrate: {}", 'DEBUG', full_port_name, baudrate)
+        self.add_command(BATCH_COMMAND, self.run_batch)
+        self.add_command(RESEND_COMMAND, self.resend_chunks)
+        self.add_command(STATS_COMMAND, self.report_stats)
 
-    def add_command(self, command_number, function, release_port_during_execution=False):
+    def add_command(self, command_number, function, release_port_during_execution=False, max_concurrency=1,
+                    success_results=None):
         self.commands[command_number] = {
             "function": function,
-            "release_port_during_execution": release_port_during_execution
+            "schema": CommandSchema(function),  # argument count and types, checked before the call
+            "success_results": success_results,  # results counted as OK in a batch, None means any
+            "release_port_during_execution": release_port_during_execution,
+            "max_concurrency": max_concurrency,  # parallel runs of this command in the worker pool
+            "running": 0,
+            "backlog": collections.deque()
         }
-        log("Added command number: {} with function: {} and release_port_during_execution: {}".format(
-            command_number, function.__name__, release_port_during_execution), 'DEBUG')
+        log("Added command number: {} with function: {} and release_port_during_execution: {}", 'DEBUG',
+            command_number, function.__name__, release_port_during_execution)
 
     def parse_command(self, command):
-        log("Parsing command: {}".format(command), 'DEBUG')
+        log("Parsing command: {}", 'DEBUG', command)
         if verbose_logging:
-            log("Received command from UART: {}".format(command), 'DEBUG')
+            log("Received command from UART: {}", 'DEBUG', command)
+
+        if isinstance(command, bytes):  # binary frame, already CRC-checked by the decoder
+            command_number, parsed_args = decode_binary_command(command)
+            if command_number in self.commands:
+                self.commands[command_number]["schema"].check_args(parsed_args)
+            log("Parsed binary command number: {} with arguments: {}", 'DEBUG', command_number, parsed_args)
+            return command_number, parsed_args
 
         command = command.strip()
         if not command:
             log("Empty command received, ignoring", 'WARNING')
             return None, None
 
-        parts = command.strip("++").split('+')
-        if len(parts) < 2:
+        body = command.strip("++")
+        separator = body.find('+')
+        try:
+            command_number = int(body if separator < 0 else body[:separator])
+        except ValueError:
             raise ValueError("Invalid command format")
+        entry = self.commands.get(command_number)
+        if entry is None:
+            return command_number, []  # answered with "Unknown command"
 
-        command_number = int(parts[0])
-        args = parts[1:]
-        parsed_args = []
-
-        for arg in args:
-            if ':' not in arg:
-                raise ValueError("Invalid argument format, missing type specifier")
-            value, type_specifier = arg.split(':')
-            if type_specifier == 'str':
-                parsed_args.append(value)
-            elif type_specifier == 'int':
-                parsed_args.append(int(value))
-            elif type_specifier == 'bool':
-                parsed_args.append(value.lower() == 'true')
-            else:
-                raise ValueError("Unsupported type specifier")
-        log("Parsed command number: {} with arguments: {}".format(command_number, parsed_args), 'DEBUG')
+        parsed_args = entry["schema"].parse_text(body, separator)
+        log("Parsed command number: {} with arguments: {}", 'DEBUG', command_number, parsed_args)
         return command_number, parsed_args
 
+    def next_sequence(self):
+        self.sequence += 1
+        return self.sequence
+
     def execute_command(self, command):
+        # every frame gets a sequence ID that is echoed in its response
+        seq = self.next_sequence()
+        command_number = None
+        started = time.perf_counter()
         try:
-            log("Executing command: {}".format(command), 'DEBUG')
-            command_number, args = self.parse_command(command)
+            log("Executing command [{}]: {}", 'DEBUG', seq, command)
+            try:
+                command_number, args = self.parse_command(command)
+            except Exception:
+                command_number = peek_command_number(command)
+                self.stats.received(command_number, len(command), time.perf_counter() - started, parsed=False)
+                raise
+            self.stats.received(command_number, len(command), time.perf_counter() - started)
             if command_number in self.commands:
-                result = self.commands[command_number]["function"](*args)
-                log("Command executed successfully: {}".format(command_number), 'INFO')
-                self.send_response(result)
+                if self.commands[command_number]["release_port_during_execution"]:
+                    self.submit_command(seq, command_number, args)
+                else:
+                    self.run_command(seq, command_number, args)
             else:
-                self.send_error("Unknown command")
+                self.stats.responded(command_number, self.send_error("Unknown command", seq))
+        except Exception as e:
+            log("Error during command execution: {}", 'ERROR', e)
+            self.stats.responded(command_number, self.send_error(str(e), seq))
+
+    def run_command(self, seq, command_number, args):
+        started = time.perf_counter()
+        try:
+            result = self.commands[command_number]["function"](*args)
+            executed = time.perf_counter()
+            self.stats.executed(command_number, executed - started)
+            log("Command executed successfully: {} [{}]", 'INFO', command_number, seq)
+            size = self.send_response(result, seq)
+        except Exception as e:
+            executed = time.perf_counter()
+            self.stats.executed(command_number, executed - started, failed=True)
+            log("Error during command execution: {}", 'ERROR', e)
+            size = self.send_error(str(e), seq)
+        self.stats.responded(command_number, size, time.perf_counter() - executed)
+
+    def run_batch(self, stop_on_error: bool, *commands):
+        # Sub-commands (binary bodies or text commands without "++") run in
+        # order on the calling thread; the answer is one status code each.
+        statuses = []
+        failed = False
+        for command in commands:
+            if failed and stop_on_error:
+                statuses.append(STATUS_SKIPPED)
+                continue
+            status = self.run_batch_item(command)
+            failed = failed or status != STATUS_OK
+            statuses.append(status)
+        result = ",".join(statuses)
+        log("Batch of {} commands finished: {}", 'INFO', len(commands), result)
+        return result
+
+    def run_batch_item(self, command):
+        started = time.perf_counter()
+        try:
+            command_number, args = self.parse_command(command)
+        except Exception as e:
+            log("Invalid command in batch: {}", 'WARNING', e)
+            self.stats.received(peek_command_number(command), len(command), time.perf_counter() - started, parsed=False)
+            return STATUS_INVALID
+        self.stats.received(command_number, len(command), time.perf_counter() - started)
+        entry = self.commands.get(command_number)
+        if entry is None or command_number == BATCH_COMMAND:
+            return STATUS_UNKNOWN
+        started = time.perf_counter()
+        try:
+            result = entry["function"](*args)
         except Exception as e:
-            log("Error during command execution: {}".format(e), 'ERROR')
-            self.send_error(str(e))
+            log("Error during batch command {}: {}", 'ERROR', command_number, e)
+            self.stats.executed(command_number, time.perf_counter() - started, failed=True)
+            return STATUS_FAILED
+        self.stats.executed(command_number, time.perf_counter() - started)
+        if entry["success_results"] is not None and result not in entry["success_results"]:
+            log("Batch command {} returned: {}", 'WARNING', command_number, result)
+            return STATUS_FAILED
+        return STATUS_OK
+
+    def resend_chunks(self, seq: int, *indices):
+        chunks = [self.chunker.get(seq, int(index)) for index in indices]
+        self.write_lines(chunks)
+        return f"resent {len(chunks)}"
+
+    def report_stats(self, reset: bool = False):
+        summary = self.stats.summary()
+        if reset:
+            self.stats.dump()
+            self.stats.reset()
+        return summary
+
+    def submit_command(self, seq, command_number, args):
+        entry = self.commands[command_number]
+        with self.queue_lock:
+            if self.queued >= self.max_queue:
+                log("Command queue full, rejecting command {} [{}]", 'WARNING', command_number, seq)
+                self.send_error("Command queue full", seq)
+                return
+            self.queued += 1
+            log("Queued command {} [{}], queue depth: {}", 'DEBUG', command_number, seq, self.queued)
+            # acknowledge before a worker can answer, so the ground sees Queued first
+            self.stats.responded(command_number, self.write_line(f"Queued[{seq}]: {command_number}"))
+            if entry["running"] < entry["max_concurrency"]:
+                entry["running"] += 1
+                self.executor.submit(self.run_queued_command, seq, command_number, args)
+            else:
+                entry["backlog"].append((seq, args))
+
+    def run_queued_command(self, seq, command_number, args):
+        entry = self.commands[command_number]
+        while True:
+            with self.queue_lock:
+                self.queued -= 1
+            self.run_command(seq, command_number, args)
+            # keep the worker for the next waiting call of the same command
+            with self.queue_lock:
+                if not entry["backlog"]:
+                    entry["running"] -= 1
+                    return
+                seq, args = entry["backlog"].popleft()
+
+    def queue_depth(self):
+        with self.queue_lock:
+            return self.queued
+
+    def write_line(self, line):
+        # the listener and the workers share the port
+        data = (line + "\n").encode()
+        with self.write_lock:
+            self.ser.write(data)
+        return len(data)
+
+    def write_lines(self, lines):
+        # one write, so a worker cannot interleave its answer with the chunks
+        data = "".join(line + "\n" for line in lines).encode()
+        with self.write_lock:
+            self.ser.write(data)
+        return len(data)
+
+    def send_message(self, kind, message, seq):
+        message = str(message)
+        lines = self.chunker.split(kind, message, seq) if seq is not None else None
+        if lines is None:
+            return self.write_line(f"{kind}{format_sequence(seq)}: {message}")
+        log("Answer [{}] sent as {} chunk(s)", 'DEBUG', seq, len(lines) - 1)
+        return self.write_lines(lines)
+
+    def send_response(self, message, seq=None):
+        log("Sending response message: {}", 'INFO', message)
+        return self.send_message("Response", message, seq)
 
-    def send_response(self, message):
-        log("Sending response message: {}".format(message), 'INFO')
-        self.ser.write(f"Response: {message}\n".encode())
+    def send_error(self, message, seq=None):
+        log("Sending error message: {}", 'ERROR', message)
+        return self.send_message("Error", message, seq)
 
-    def send_error(self, message):
-        log("Sending error message: {}".format(message), 'ERROR')
-        self.ser.write(f"Error: {message}\n".encode())
+    def read_frames(self):
+        # drain everything already buffered by the driver, or block for one byte
+        data = self.ser.read(self.ser.in_waiting or 1)
+        crc_errors = self.decoder.crc_errors
+        frames = self.decoder.feed(data)
+        if self.decoder.crc_errors != crc_errors:
+            log("Dropped {} corrupted binary frame(s)", 'WARNING', self.decoder.crc_errors - crc_errors)
+        if self.decoder.expired():
+            log("Command timeout occurred, dropping {} buffered bytes", 'WARNING', self.decoder.pending())
+            self.decoder.reset()
+        return frames
 
     def listen(self):
         log("Listening for incoming commands", 'INFO')
-        current_command = ""
+        self.stats.start()
         while True:
-            command_start_time = time.time()
-            command_timeout = 10  # timeout
-            timeout_occurred = False
-            while time.time() - command_start_time < command_timeout:
-                try:
-                    char = self.ser.read().decode('utf-8', errors='ignore')  # ignore undecodable bytes
-                    if char:
-                        if (char == '+') and current_command and (current_command[-1] == '+'):
-                            self.execute_command(current_command)
-                            current_command = ""
-                            break 
-                        else:
-                            current_command += char
-                except serial.SerialTimeoutException:
-                    log("Timeout occurred while waiting for data", 'WARNING')
-                    timeout_occurred = True
-                    break 
-            if time.time() - command_start_time >= command_timeout:
-                log("Command timeout occurred", 'WARNING')
-                timeout_occurred = True
-            if timeout_occurred:
-                current_command = ""  # clear
+            try:
+                frames = self.read_frames()
+            except serial.SerialTimeoutException:
+                log("Timeout occurred while waiting for data", 'WARNING')
+                self.decoder.reset()
+                continue
+            for frame in frames:
+                self.execute_command(frame)
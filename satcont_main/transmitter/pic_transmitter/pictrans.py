@@ -5,21 +5,65 @@ import json
 import sys
 import os
 
+# pixcodec.py/pixentropy.py live next to pointillism.py
+CAPTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'camera', 'capture')
+sys.path.insert(0, CAPTURE_DIR)
+import pixcodec
+
 def read_json_file(json_path):
     with open(json_path, 'r', encoding='utf-8') as f:
         data = json.load(f)
     return data['converted_file']
 
-def transmit_file(port, baudrate, json_path):
+def transmit_progressive(ser, file_data):
+    # Грубый слой, затем плитки по убыванию важности; каждый пакет пишется
+    # отдельно, так что передачу можно прервать в любой момент
+    import pixprogressive
+    sent = 0
+    levels, level_count = pixcodec.parse_pix_info(file_data)
+    for packet in pixprogressive.encode_packets(levels, level_count=level_count):
+        ser.write(packet)
+        sent += len(packet)
+    print("Progressive data sent: {} bytes.".format(sent))
+
+def transmit_checked(ser, file_data):
+    # Кадр блоками строк, у каждого блока свой CRC32: наземная сторона
+    # перезапрашивает только испорченные строки (команда 8)
+    import pixcheck
+    data_to_send = pixcheck.encode_stream(*pixcodec.parse_pix_info(file_data))
+    ser.write(data_to_send)
+    print("Row-checked data sent: {} bytes.".format(len(data_to_send)))
+
+def transmit_file(port, baudrate, json_path, coded=False, progressive=False, checked=False):
     # Чтение содержимого JSON файла
     file_path = read_json_file(json_path)
 
-    # Чтение данных из файла с явным указанием кодировки UTF-8
-    with open(file_path, 'r', encoding='utf-8') as f:
+    # Чтение данных из файла
+    with open(file_path, 'rb') as f:
         file_data = f.read()
 
-    # Преобразование данных в байты и добавление маркеров начала и конца
-    data_to_send = b'++' + file_data.encode('utf-8') + b'++'
+    if progressive:
+        with serial.Serial(port, baudrate) as ser:
+            transmit_progressive(ser, file_data)
+        return
+
+    if checked:
+        with serial.Serial(port, baudrate) as ser:
+            transmit_checked(ser, file_data)
+        return
+
+    if coded:
+        # Сжатие кадра: RLE, Хаффман или zlib, что окажется короче
+        import pixentropy
+        data_to_send = pixentropy.encode_best(*pixcodec.parse_pix_info(file_data))
+        print("Coded {} -> {} bytes.".format(len(file_data), len(data_to_send)))
+    elif pixcodec.is_binary(file_data):
+        # Упакованный файл: байты могут совпасть с '++', маркеры не нужны,
+        # размер известен из заголовка
+        data_to_send = file_data
+    else:
+        # Текстовый файл: добавление маркеров начала и конца
+        data_to_send = b'++' + file_data + b'++'
 
     # Передача данных через UART
     with serial.Serial(port, baudrate) as ser:
@@ -27,8 +71,8 @@ def transmit_file(port, baudrate, json_path):
         print("Data sent.")
 
 if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python transmitter.py <port> <baudrate> <json_path>")
+    if len(sys.argv) not in (4, 5) or (len(sys.argv) == 5 and sys.argv[4] not in ("--coded", "--progressive", "--checked")):
+        print("Usage: python transmitter.py <port> <baudrate> <json_path> [--coded | --progressive | --checked]")
         sys.exit(1)
 
     port = sys.argv[1]
@@ -40,4 +84,5 @@ if __name__ == "__main__":
         print("Error: The file {} does not exist.".format(json_path))
         sys.exit(1)
 
-    transmit_file(port, baudrate, json_path)
+    mode = sys.argv[4] if len(sys.argv) == 5 else None
+    transmit_file(port, baudrate, json_path, mode == "--coded", mode == "--progressive", mode == "--checked")
@@ -3,6 +3,9 @@ import os
 import json
 import time
 import binascii
+import rsfec
+
+PACKET_SIZE = 240  # as in transmitter.py on the ground (LoRa E32 packet limit)
 
 def send_ready(port, baudrate):
     ser = serial.Serial('/dev/ttyS{}'.format(port), baudrate)
@@ -36,19 +39,75 @@ def receive_file(port, baudrate):
         ser.write(b'repeat\n')
         return None
 
+def receive_packets(port, baudrate, save_path):
+    # Counterpart of the ground transmitter.py: "SIZE:<bytes>[ FEC:<parity>]",
+    # then packets of PACKET_SIZE bytes, each answered with "ACK" (with FEC
+    # "ACK <bytes corrected>") or "NAK" to have it sent again. With FEC every
+    # packet is full (the last one zero-padded) and its first data byte is the
+    # packet number mod 256: a packet sent again because its ACK was lost is
+    # acknowledged again and dropped.
+    ser = serial.Serial('/dev/ttyS{}'.format(port), baudrate, timeout=2)
+    while True:
+        line = ser.readline().strip()
+        if line.startswith(b'SIZE:'):
+            break
+    fields = dict(field.split(b':', 1) for field in line.split())
+    size = int(fields[b'SIZE'])
+    parity = int(fields.get(b'FEC', 0))
+    if not 0 <= parity < PACKET_SIZE - 1:
+        raise ValueError("{} parity bytes leave no room for data in a packet".format(parity))
+
+    received = b''
+    number = 0  # packets received
+    resent = 0
+    repeated = 0
+    corrected = 0
+    while len(received) < size:
+        length = PACKET_SIZE if parity else min(PACKET_SIZE, size - len(received))
+        packet = ser.read(length)
+        try:
+            if len(packet) < length:
+                raise ValueError("Short packet")
+            data, fixed = rsfec.decode(packet, parity)
+            if parity and data[0] != number & 0xff and not (number and data[0] == (number - 1) & 0xff):
+                raise ValueError("Packet out of order")
+        except ValueError:
+            resent += 1
+            ser.reset_input_buffer()
+            ser.write(b'NAK\n')
+            continue
+        if parity and data[0] != number & 0xff:
+            repeated += 1
+            ser.write('ACK {}\n'.format(fixed).encode())
+            continue
+        received += data[1:size - len(received) + 1] if parity else data
+        number += 1
+        corrected += fixed
+        ser.write('ACK {}\n'.format(fixed).encode() if parity else b'ACK\n')
+
+    with open(save_path, 'wb') as f:
+        f.write(received)
+    print('{} bytes received, {} packets resent, {} repeated, {} bytes corrected by FEC.'.format(
+        size, resent, repeated, corrected))
+    return received
+
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description='Receive file over serial port from Windows.')
     parser.add_argument('port', type=int, help='Serial port number (e.g., for ttyS1, use 1)')
     parser.add_argument('baudrate', type=int, help='Baudrate of the serial connection')
+    parser.add_argument('--packets', type=str, help='Receive one file from transmitter.py (240-byte packets, optional FEC) into this path')
     args = parser.parse_args()
 
-    send_ready(args.port, args.baudrate)
-    file_content = receive_file(args.port, args.baudrate)
-    if file_content is not None:
-        with open('received_tree.json', 'wb') as f:
-            f.write(file_content)
-        print('File received successfully.')
+    if args.packets:
+        receive_packets(args.port, args.baudrate, args.packets)
     else:
-        print('Error receiving file.')
+        send_ready(args.port, args.baudrate)
+        file_content = receive_file(args.port, args.baudrate)
+        if file_content is not None:
+            with open('received_tree.json', 'wb') as f:
+                f.write(file_content)
+            print('File received successfully.')
+        else:
+            print('Error receiving file.')
@@ -0,0 +1,182 @@
+import numpy as np
+
+# Reed-Solomon code over GF(256) for the serial packets (transmitter.py on
+# the ground, reciever.py --packets on board). Each packet carries parity
+# bytes after its data; up to parity // 2 damaged bytes anywhere in the
+# packet are corrected, more than that is reported as an error and the
+# packet is sent again. Field polynomial 0x11d, generator roots 2^0..2^(parity-1).
+# Encoding and the clean-packet check run a byte-wide shift register on
+# Python ints; syndromes and the root search are done with NumPy, the rest
+# (Berlekamp-Massey, Forney) is plain Python on a few dozen coefficients.
+# A copy of this file lives in reciever/rsfec.py for the ground tools.
+PARITY = 16  # parity bytes per packet, corrects up to 8 bytes
+MAX_BLOCK = 255  # data + parity bytes
+
+PRIMITIVE = 0x11d
+EXP = [0] * 512
+LOG = [0] * 256
+value = 1
+for power in range(255):
+    EXP[power] = value
+    LOG[value] = power
+    value <<= 1
+    if value & 0x100:
+        value ^= PRIMITIVE
+for power in range(255, 512):
+    EXP[power] = EXP[power - 255]
+EXP_ARRAY = np.array(EXP[:255], dtype=np.uint8)
+LOG_ARRAY = np.array(LOG, dtype=np.int64)
+
+generators = {}  # parity -> (generator polynomial, shift register table)
+
+
+def mul(a, b):
+    if a == 0 or b == 0:
+        return 0
+    return EXP[LOG[a] + LOG[b]]
+
+
+def div(a, b):
+    if b == 0:
+        raise ZeroDivisionError()
+    if a == 0:
+        return 0
+    return EXP[(LOG[a] + 255 - LOG[b]) % 255]
+
+
+def poly_scale(poly, factor):
+    return [mul(coef, factor) for coef in poly]
+
+
+def poly_add(p, q):
+    result = [0] * max(len(p), len(q))
+    result[len(result) - len(p):] = p
+    for index, coef in enumerate(q):
+        result[index + len(result) - len(q)] ^= coef
+    return result
+
+
+def poly_mul(p, q):
+    result = [0] * (len(p) + len(q) - 1)
+    for j, b in enumerate(q):
+        for i, a in enumerate(p):
+            result[i + j] ^= mul(a, b)
+    return result
+
+
+def poly_eval(poly, x):
+    y = poly[0]
+    for coef in poly[1:]:
+        y = mul(y, x) ^ coef
+    return y
+
+
+def eval_at_powers(poly, powers):
+    # poly (highest coefficient first) at 2^power for every power, at once
+    poly = np.asarray(poly, dtype=np.int64)
+    degrees = np.arange(len(poly) - 1, -1, -1)
+    exponents = (LOG_ARRAY[poly][None, :] + np.outer(powers, degrees)) % 255
+    terms = np.where(poly[None, :] != 0, EXP_ARRAY[exponents], 0)
+    return np.bitwise_xor.reduce(terms, axis=1)
+
+
+def generator(parity):
+    # (generator polynomial, table of the feedback byte times the generator,
+    # each row packed into one int for the shift register)
+    if parity not in generators:
+        poly = [1]
+        for power in range(parity):
+            poly = poly_mul(poly, [1, EXP[power]])
+        table = [int.from_bytes(bytes(poly_scale(poly[1:], feedback)), 'big') for feedback in range(256)]
+        generators[parity] = (poly, table)
+    return generators[parity]
+
+
+def parity_of(data, parity):
+    # the remainder of data * x^parity by the generator
+    table = generator(parity)[1]
+    shift = 8 * (parity - 1)
+    mask = (1 << (8 * parity)) - 1
+    remainder = 0
+    for byte in data:
+        remainder = ((remainder << 8) & mask) ^ table[byte ^ (remainder >> shift)]
+    return remainder.to_bytes(parity, 'big')
+
+
+def encode(data, parity=PARITY):
+    # data + parity bytes; the block has to fit MAX_BLOCK bytes
+    if len(data) + parity > MAX_BLOCK:
+        raise ValueError("{} data bytes + {} parity bytes do not fit one block".format(len(data), parity))
+    if not parity:
+        return bytes(data)
+    return bytes(data) + parity_of(data, parity)
+
+
+def error_locator(syndromes, parity):
+    # Berlekamp-Massey; syndromes[0] is a zero placeholder
+    locator = [1]
+    old = [1]
+    for index in range(parity):
+        k = index + 1
+        delta = syndromes[k]
+        for j in range(1, len(locator)):
+            delta ^= mul(locator[-(j + 1)], syndromes[k - j])
+        old = old + [0]
+        if delta:
+            if len(old) > len(locator):
+                new = poly_scale(old, delta)
+                old = poly_scale(locator, div(1, delta))
+                locator = new
+            locator = poly_add(locator, poly_scale(old, delta))
+    while locator and locator[0] == 0:
+        del locator[0]
+    if (len(locator) - 1) * 2 > parity:
+        raise ValueError("Too many damaged bytes to correct")
+    return locator
+
+
+def error_positions(locator, length):
+    # Chien search: byte positions where the locator has a root
+    values = eval_at_powers(locator[::-1], np.arange(length))
+    positions = [length - 1 - power for power in np.flatnonzero(values == 0).tolist()]
+    if len(positions) != len(locator) - 1:
+        raise ValueError("Too many damaged bytes to correct")
+    return positions
+
+
+def correct(block, syndromes, positions):
+    # Forney: the error value at each position, xored into the block
+    coefficients = [len(block) - 1 - position for position in positions]
+    locator = [1]
+    for coefficient in coefficients:
+        locator = poly_mul(locator, [EXP[coefficient], 1])
+    product = poly_mul(syndromes[::-1], locator)
+    evaluator = product[len(product) - len(locator):]
+    points = [EXP[coefficient] for coefficient in coefficients]
+    for index, point in enumerate(points):
+        inverse = div(1, point)
+        denominator = 1
+        for other, other_point in enumerate(points):
+            if other != index:
+                denominator = mul(denominator, 1 ^ mul(inverse, other_point))
+        magnitude = div(mul(point, poly_eval(evaluator, inverse)), denominator)
+        block[positions[index]] ^= magnitude
+    return block
+
+
+def decode(block, parity=PARITY):
+    # returns (data, bytes corrected); ValueError when the packet is beyond repair
+    if not parity:
+        return bytes(block), 0
+    if len(block) <= parity or len(block) > MAX_BLOCK:
+        raise ValueError("Block of {} bytes cannot carry {} parity bytes".format(len(block), parity))
+    data = bytes(block[:-parity])
+    if parity_of(data, parity) == bytes(block[-parity:]):
+        return data, 0
+    syndromes = [0] + eval_at_powers(list(block), np.arange(parity)).tolist()
+    locator = error_locator(syndromes, parity)
+    positions = error_positions(locator, len(block))
+    repaired = correct(bytearray(block), syndromes, positions)
+    if parity_of(repaired[:-parity], parity) != bytes(repaired[-parity:]):
+        raise ValueError("Too many damaged bytes to correct")
+    return bytes(repaired[:-parity]), len(positions)